@@ -1,7 +1,11 @@
 from typing import Literal
 from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.cube import OpeningCube
 from chess_opening_analyser.openings.opening import Opening
+from chess_opening_analyser.openings.snapshot import TreeSnapshot
 from chess_opening_analyser.openings.transformers import Transformer
+from chess_opening_analyser.openings.tree import Tree
+from cli.analyse_openings import cube_path, run_analysis, tree_path
 from chess_opening_analyser.visualiser.visualiser import Visualiser
 
 import streamlit as st
@@ -9,6 +13,11 @@ import pandas as pd
 import re
 
 
+# the trees (and cubes) kept in the cache, beyond which the least recently used are evicted, e.g.
+# those of the snapshots replaced by an update
+MAX_CACHED_TREES = 8
+
+
 def color_value(val):
     r = 255 - int(75 * val)
     g = 200 + int(55 * val)
@@ -16,6 +25,50 @@ def color_value(val):
     return f"background-color: rgb({r},{g},{b})"
 
 
+def load_tree(player_id: str) -> Tree:
+    """
+    Loads the tree of the player, analysing their games first if it isn't cached
+
+    The tree is a read-only view of the memory-mapped snapshot, whose openings are materialised as
+    the pages access them (see `TreeSnapshot.to_lazy_tree`). It's cached as a resource, so a single
+    tree per player is shared by all the sessions, until the snapshot is replaced by an update.
+    """
+    if not tree_path(player_id).exists():
+        with st.spinner("Analysing games..."):
+            run_analysis(player_id, num_workers=8)
+    return _load_tree(player_id, tree_path(player_id).stat().st_mtime_ns)
+
+
+@st.cache_resource(show_spinner="Loading the tree...", max_entries=MAX_CACHED_TREES)
+def _load_tree(player_id: str, modified: int) -> Tree:
+    """The tree of the player's snapshot as modified at `modified`, which keys the cache"""
+    return TreeSnapshot.load(tree_path(player_id)).to_lazy_tree()
+
+
+def load_cube(player_id: str) -> OpeningCube:
+    """
+    Loads the cube of the tree of the player, shared by all the sessions
+
+    The pages slice their tables from the cube, so that changing a widget doesn't walk the tree. A
+    cube that wasn't cached with the tree, or is older than it, is built from it.
+    """
+    tree = load_tree(player_id)
+    path = cube_path(player_id)
+    if (
+        not path.exists()
+        or path.stat().st_mtime_ns < tree_path(player_id).stat().st_mtime_ns
+    ):
+        with st.spinner("Aggregating openings..."):
+            OpeningCube.of(tree).save(path)
+    return _load_cube(player_id, path.stat().st_mtime_ns)
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_CACHED_TREES)
+def _load_cube(player_id: str, modified: int) -> OpeningCube:
+    """The cube of the player as modified at `modified`, which keys the cache"""
+    return OpeningCube.load(cube_path(player_id))
+
+
 def timeline_page(player_id: str):
     """Creates the timeline page with the heatmap of opening ratios"""
     col1, col2 = st.columns(2)
@@ -33,8 +86,7 @@ def timeline_page(player_id: str):
 
     assert resample_interval is not None
 
-    df = Transformer.tree_to_timeline(
-        st.session_state.trees[player_id],
+    df = load_cube(player_id).timeline(
         resample_interval=resample_interval,
         occurrence_threshold=occurrence_threshold,
     )
@@ -54,9 +106,7 @@ def timeline_page(player_id: str):
 
 def opening_strength_page(player_id: str):
     """Creates the opening strength page with the table of opening strengths"""
-    df = Transformer.tree_to_opening_strength(
-        st.session_state.trees[player_id], unique_names=True
-    )
+    df = load_cube(player_id).opening_strength(unique_names=True)
 
     col1, col2 = st.columns(2)
 
@@ -92,9 +142,7 @@ def opening_strength_page(player_id: str):
 
 def single_opening_page(player_id):
     """Creates the single opening page"""
-    df = Transformer.tree_to_opening_strength(
-        st.session_state.trees[player_id], unique_names=False
-    )
+    df = load_cube(player_id).opening_strength(unique_names=False)
 
     opening_families = sorted(
         set(
@@ -172,28 +220,10 @@ def _single_opening_visuals(
             "following_game_scores",
         ]
 
-        move_df = pd.DataFrame(
-            {
-                **{
-                    sc: getattr(opening, sc)
-                    for sc in score_cols + ["dates", "following_moves"]
-                },
-                "occurrence": 1,
-            },
-        )
-
         if next_move_mode == "DataFrame":
-            move_df.drop("dates", axis=1, inplace=True)
-            move_df = (
-                move_df.groupby("following_moves")
-                .agg(
-                    {
-                        **{sc: "mean" for sc in score_cols},
-                        "occurrence": "sum",
-                    }
-                )
-                .sort_values(by="occurrence", ascending=False)  # type: ignore
-            )
+            move_df = pd.DataFrame.from_dict(
+                opening.occurrences.by_move(), orient="index"
+            ).sort_values(by="occurrence", ascending=False)
 
             st.table(
                 move_df.style.applymap(
@@ -201,12 +231,24 @@ def _single_opening_visuals(
                     subset=score_cols,
                 )
             )
+        elif not opening.results:
+            st.write("The scores of each game aren't kept in aggregated trees.")
         else:
+            move_df = pd.DataFrame(
+                {
+                    **{
+                        sc: getattr(opening, sc)
+                        for sc in score_cols + ["dates", "following_moves"]
+                    },
+                    "occurrence": 1,
+                },
+            )
             move_df = move_df.explode("dates")
             fig = Visualiser.scatter_from_next_moves(move_df)
             st.pyplot(fig)
 
-    filtered_tree = st.session_state.trees[player_id].filter_by_opening(opening.fen)
+    tree = st.session_state.trees[player_id]
+    filtered_tree = tree.filter_by_opening(tree.key(opening))
 
     fig = Visualiser.sankey(**Transformer.tree_to_sankey(filtered_tree))
     st.plotly_chart(fig, use_container_width=True)
@@ -1,6 +1,6 @@
 import streamlit as st
-from cli.analyse_openings import run_analysis
 from app.app_helpers import (
+    load_tree,
     timeline_page,
     opening_strength_page,
     single_opening_page,
@@ -15,9 +15,8 @@ if "trees" not in st.session_state:
     st.session_state.trees = {}
 
 if player_id:
-    if player_id not in st.session_state.trees:
-        with st.spinner("Analysing games..."):
-            st.session_state.trees[player_id] = run_analysis(player_id, num_workers=8)
+    # a reference to the tree shared by the sessions, not a copy of it
+    st.session_state.trees[player_id] = load_tree(player_id)
 
     if st.session_state.trees:
         option = st.selectbox(
@@ -0,0 +1,41 @@
+"""Benchmark of the per-worker cost of loading the ECO DB from JSON and from the binary index"""
+from chess_opening_analyser.opening_directory import EcoDB
+
+import click
+import subprocess
+import sys
+
+LOAD = (
+    "import time;"
+    "from chess_opening_analyser.opening_directory import EcoDB;"
+    "rss = lambda: int(open('/proc/self/statm').read().split()[1]) * 4;"
+    "before = rss(); start = time.perf_counter(); db = EcoDB({path!r}); db.lookup('');"
+    "print(time.perf_counter() - start, rss() - before)"
+)
+
+
+def measure(path: str) -> tuple[float, int]:
+    """Loads the DB in a fresh interpreter, returning the load time and the RSS growth in KB"""
+    out = subprocess.run(
+        [sys.executable, "-c", LOAD.format(path=path)],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.split()
+    return float(out[0]), int(out[1])
+
+
+@click.command()
+@click.option("--db-path", default="eco/openings.json", help="Path to the JSON ECO DB")
+def main(db_path: str):
+    index_path = EcoDB.compiled(db_path)
+
+    for label, path in [("json", db_path), ("binary", str(index_path))]:
+        seconds, rss = measure(path)
+        click.echo(
+            f"{label:>6}: {seconds * 1e3:8.2f} ms load, {rss / 1024:8.1f} MB RSS growth"
+        )
+
+
+if __name__ == "__main__":
+    main()
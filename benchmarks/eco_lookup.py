@@ -0,0 +1,48 @@
+"""Micro-benchmark of `EcoDB.lookup` against the previous full DataFrame scan"""
+from chess_opening_analyser.opening_directory import EcoDB
+
+import click
+import pandas as pd
+import random
+import timeit
+
+
+def scan_lookup(openings: pd.DataFrame, fen: str) -> dict:
+    """The previous implementation of `EcoDB.lookup`, scanning the whole DataFrame"""
+    rows = openings[openings.fen == fen]
+    if rows.shape[0] > 0:
+        row = rows.to_dict(orient="records")[0]
+        row["num_moves"] = len(row.get("moves", "").split(" "))
+        row["index"] = rows.index.tolist()[0]
+        return row
+    return {}
+
+
+@click.command()
+@click.option("--db-path", default="eco/openings.json", help="Path to the ECO DB")
+@click.option("--num-lookups", default=2000, help="Number of lookups to time", type=int)
+@click.option(
+    "--hit-ratio", default=0.2, help="Share of lookups hitting the DB", type=float
+)
+def main(db_path: str, num_lookups: int, hit_ratio: float):
+    openings = pd.read_json(db_path)
+    eco_db = EcoDB(db_path)
+
+    random.seed(0)
+    fens = [
+        random.choice(openings.fen)
+        if random.random() < hit_ratio
+        else "8/8/8/8/8/8/8/8 w - -"
+        for _ in range(num_lookups)
+    ]
+
+    scan = timeit.timeit(lambda: [scan_lookup(openings, f) for f in fens], number=1)
+    index = timeit.timeit(lambda: [eco_db.lookup(f) for f in fens], number=1)
+
+    click.echo(f"scan:  {scan / num_lookups * 1e6:10.2f} us/lookup")
+    click.echo(f"index: {index / num_lookups * 1e6:10.2f} us/lookup")
+    click.echo(f"speedup: {scan / index:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark of the games/second of the engine pool against a process pool of synchronous engines"""
+from benchmarks.process_games import load_corpus
+from chess_opening_analyser.engine.pool import EnginePool
+from chess_opening_analyser.engine.stockfish import Stockfish
+from chess_opening_analyser.games.processor import GameProcessor
+from chess_opening_analyser.openings.tree import Tree
+from chess_opening_analyser.opening_directory import EcoDB
+from dotenv import load_dotenv, find_dotenv
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Optional
+
+import click
+import os
+import time
+
+
+def simple_engine_slice(
+    games: list[str], stockfish_path: str, eco_db_path: Path, player_id: str, depth: int
+) -> None:
+    """The previous worker: one `SimpleEngine`, blocked on for every position"""
+    stockfish = Stockfish(stockfish_path, analysis_depth=depth)
+    processor = GameProcessor(Tree(), stockfish, EcoDB(eco_db_path), player_id)
+    for game in games:
+        processor.process_game(game)
+    stockfish.quit()
+
+
+def engine_pool_slice(
+    games: list[str],
+    stockfish_path: str,
+    eco_db_path: Path,
+    player_id: str,
+    depth: int,
+    size: int,
+) -> None:
+    """A worker queueing the positions of all the games to a pool of engines, then building the tree"""
+    pool = EnginePool(stockfish_path, size=size, analysis_depth=depth)
+    processor = GameProcessor(Tree(), pool, EcoDB(eco_db_path), player_id)
+    processor.submit_games(games)
+    for game in games:
+        processor.process_game(game)
+    pool.quit()
+
+
+@click.command()
+@click.option(
+    "--corpus", default=None, help="Path to a .pgn file, or a JSON list of PGNs"
+)
+@click.option("--num-games", default=200, help="Number of games to process", type=int)
+@click.option("--player-id", default="matyasj", help="Player whose games are processed")
+@click.option("--stockfish-path", default=None, help="Defaults to $STOCKFISH_DIR")
+@click.option("--engines", default=4, help="Number of Stockfish processes", type=int)
+@click.option("--depth", default=10, help="Depth of the analysis", type=int)
+def main(
+    corpus: Optional[str],
+    num_games: int,
+    player_id: str,
+    stockfish_path: Optional[str],
+    engines: int,
+    depth: int,
+):
+    load_dotenv(find_dotenv())
+    stockfish_path = stockfish_path or os.environ["STOCKFISH_DIR"]
+    # without a corpus the test game is repeated, which mostly measures the in-memory caches
+    games = load_corpus(corpus, num_games)
+    eco_db_path = EcoDB.compiled("eco/openings.json")
+
+    start = time.perf_counter()
+    with Pool(processes=engines) as pool:
+        pool.starmap(
+            simple_engine_slice,
+            [
+                (games[i::engines], stockfish_path, eco_db_path, player_id, depth)
+                for i in range(engines)
+            ],
+        )
+    elapsed = time.perf_counter() - start
+    click.echo(f"{engines} x SimpleEngine workers: {len(games) / elapsed:8.2f} games/s")
+
+    start = time.perf_counter()
+    engine_pool_slice(games, stockfish_path, eco_db_path, player_id, depth, engines)
+    elapsed = time.perf_counter() - start
+    click.echo(f"EnginePool of {engines} engines: {len(games) / elapsed:8.2f} games/s")
+
+
+if __name__ == "__main__":
+    main()
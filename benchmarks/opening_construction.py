@@ -0,0 +1,60 @@
+"""Benchmark of the per-node cost of constructing openings, validated by pydantic against unvalidated"""
+from benchmarks.tree_merge import worker_tree
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.opening_directory import EcoDB
+from chess_opening_analyser.openings.opening import Opening
+from datetime import datetime
+from typing import Any, Callable
+
+import click
+import json
+import pandas as pd
+import time
+
+
+def legacy_from_json(opening: dict[str, Any]) -> Opening:
+    """The previous construction in `Tree.from_json`: parsing each date, and validating the opening"""
+    return Opening(
+        **{
+            **opening,
+            "dates": [datetime.fromisoformat(d) for d in opening.get("dates", [])],
+            "colour": [PlayerColour(c) for c in opening.get("colour", [])],
+        }
+    )
+
+
+def per_node(construct: Callable[[Any], Opening], records: list) -> float:
+    """Mean cost of constructing an opening per record, in µs"""
+    start = time.perf_counter()
+    for record in records:
+        construct(record)
+    return (time.perf_counter() - start) / len(records) * 1e6
+
+
+@click.command()
+@click.option("--db-path", default="eco/openings.json", help="Path to the ECO DB")
+@click.option("--num-nodes", default=2000, help="Number of openings dumped", type=int)
+@click.option("--occurrences", default=16, help="Games per dumped opening", type=int)
+def main(db_path: str, num_nodes: int, occurrences: int):
+    eco_db = EcoDB(db_path)
+    eco_records = [eco_db.lookup(fen) for fen in pd.read_json(db_path).fen]
+
+    tree = worker_tree(num_nodes, occurrences, seed=0)
+    dumps = json.loads(
+        json.dumps(
+            [o.model_dump(exclude={"aggregates"}) for o in tree.nodes.values()],
+            default=lambda x: x.isoformat() if isinstance(x, datetime) else x,
+        )
+    )
+
+    for label, construct, records in [
+        ("ECO record, validated", lambda r: Opening(**r), eco_records),
+        ("ECO record, unvalidated", lambda r: Opening.unvalidated(**r), eco_records),
+        ("JSON dump, validated", legacy_from_json, dumps),
+        ("JSON dump, unvalidated", Opening.from_dump, dumps),
+    ]:
+        click.echo(f"{label:>24}: {per_node(construct, records):7.1f} µs per node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark of the views of the app pages, sliced from the cube against transformed from the tree"""
+from benchmarks.tree_parents import synthetic_tree
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.cube import OpeningCube
+from chess_opening_analyser.openings.transformers import Transformer
+from chess_opening_analyser.openings.tree import Tree
+from datetime import datetime, timedelta
+from typing import Callable
+
+import click
+import random
+import time
+
+
+def played_tree(num_nodes: int, occurrences: int) -> Tree:
+    """A synthetic tree with `occurrences` games per opening, played over five years"""
+    rng = random.Random(0)
+    tree = synthetic_tree(num_nodes, fan_out=3, seed=0)
+    for opening in tree.nodes.values():
+        for _ in range(occurrences):
+            opening.update_opening(
+                rng.choice([PlayerColour.W, PlayerColour.B]),
+                datetime(2019, 1, 1) + timedelta(minutes=rng.randrange(5 * 525600)),
+                rng.choice([0.0, 0.5, 1.0]),
+                "e2e4",
+                rng.random(),
+                "e2e4",
+            )
+            opening.add_score_in_n_moves(rng.random())
+    return tree
+
+
+def timed(view: Callable[[], object]) -> float:
+    """Time taken by the view, in ms"""
+    start = time.perf_counter()
+    view()
+    return (time.perf_counter() - start) * 1e3
+
+
+@click.command()
+@click.option("--num-nodes", default=2000, help="Number of openings", type=int)
+@click.option("--occurrences", default=16, help="Games per opening", type=int)
+def main(num_nodes: int, occurrences: int):
+    tree = played_tree(num_nodes, occurrences)
+
+    start = time.perf_counter()
+    cube = OpeningCube.of(tree)
+    click.echo(f"cube built in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    for label, from_tree, from_cube in [
+        (
+            "timeline (M)",
+            lambda: Transformer.tree_to_timeline(tree, "M", 5),
+            lambda: cube.timeline("M", 5),
+        ),
+        (
+            "opening strength",
+            lambda: Transformer.tree_to_opening_strength(tree, unique_names=True),
+            lambda: cube.opening_strength(unique_names=True),
+        ),
+    ]:
+        click.echo(
+            f"{label:>16}: {timed(from_tree):8.1f} ms from the tree, "
+            f"{timed(from_cube):6.1f} ms from the cube"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark of the memory held by the occurrences of openings, as lists against the columnar store"""
+from chess import Move
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.occurrences import Occurrences
+from datetime import datetime, timedelta
+
+import click
+import random
+import time
+import tracemalloc
+
+MOVES = ["e2e4", "d2d4", "g1f3", "c2c4", "e7e5", "c7c5", "g8f6", "d7d5"]
+
+
+def random_occurrences(num_occurrences: int) -> list[tuple]:
+    rng = random.Random(0)
+    start = datetime(2015, 1, 1)
+    return [
+        (
+            rng.choice([PlayerColour.W, PlayerColour.B]),
+            start + timedelta(seconds=rng.randrange(10**9)),
+            rng.choice([0.0, 0.5, 1.0]),
+            rng.choice(MOVES),
+            rng.random(),
+            rng.random(),
+        )
+        for _ in range(num_occurrences)
+    ]
+
+
+def as_lists(occurrences: list[tuple]) -> dict[str, list]:
+    """The previous representation: a list of Python objects per attribute"""
+    lists: dict[str, list] = {
+        "colour": [],
+        "dates": [],
+        "results": [],
+        "following_moves": [],
+        "following_game_scores": [],
+        "score_in_n_moves": [],
+    }
+    for colour, date, result, move, score, score_in_n_moves in occurrences:
+        lists["colour"].append(colour)
+        # the values are parsed per game, so each of them is a separate object
+        lists["dates"].append(date.replace())
+        lists["results"].append(result * 1.0)
+        lists["following_moves"].append(Move.from_uci(move).uci())
+        lists["following_game_scores"].append(score * 1.0)
+        lists["score_in_n_moves"].append(score_in_n_moves * 1.0)
+    return lists
+
+
+def as_store(occurrences: list[tuple]) -> Occurrences:
+    store = Occurrences()
+    for colour, date, result, move, score, score_in_n_moves in occurrences:
+        store.append(colour, date, result, move, score)
+        store.append_score_in_n_moves(score_in_n_moves)
+    return store
+
+
+@click.command()
+@click.option(
+    "--num-occurrences", default=10**6, help="Number of occurrences", type=int
+)
+def main(num_occurrences: int):
+    occurrences = random_occurrences(num_occurrences)
+
+    for label, build in [("lists", as_lists), ("columns", as_store)]:
+        start = time.perf_counter()
+        build(occurrences)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        built = build(occurrences)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        click.echo(
+            f"{label:>7}: {size / num_occurrences:6.1f} B/occurrence, built in {elapsed:.2f} s"
+        )
+        del built
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark of the per-game latency of `GameProcessor.process_game` against the previous walks"""
+from chess_opening_analyser.engine import Engine, Evaluation
+from chess_opening_analyser.games.processor import (
+    GameProcessor,
+    _EndOfOpenings,
+    _GameWalk,
+)
+from chess_opening_analyser.openings.opening import Opening
+from chess_opening_analyser.openings.tree import Tree
+from chess_opening_analyser.opening_directory import EcoDB
+from chess.pgn import read_game
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Optional
+
+import click
+import io
+import json
+import re
+import time
+
+
+class ConstantEngine(Engine):
+    """Stands in for Stockfish, so that only parsing and tree building are measured"""
+
+    def submit(self, board, key) -> Future:
+        future: Future[Evaluation] = Future()
+        future.set_result(Evaluation(0, 1000, 0, ""))
+        return future
+
+
+def legacy_process_game(processor: GameProcessor, game_pgn: str) -> None:
+    """The previous walk: the whole game is parsed, and replayed from the root for every position"""
+    game = read_game(io.StringIO(game_pgn))
+    assert game is not None
+    if game.headers.get("Variant", None) in processor.FORBIDDEN_VARIANTS:
+        return
+
+    colour = processor._get_player_colour(game.headers)
+    game_metadata = processor._game_metadata(game)
+    head, empty_moves, keys, scores = processor.tree.root, 0, [], []
+    moves = list(game.mainline())
+
+    for move in moves:
+        if empty_moves > processor.MOVE_DELAY:
+            break
+        key = processor._fen_parser(move.board().fen())
+        keys.append(key)
+        openings_data = processor.eco_db.lookup(key)
+        engine_analysis = processor.engine.get_best_move_for_board(None, colour, key)
+        scores.append(engine_analysis["score"])
+        if openings_data:
+            empty_moves = 0
+            opening = Opening(**openings_data)
+            num_moves = openings_data["num_moves"]
+            opening.update_opening(
+                **game_metadata,  # type: ignore
+                colour=colour,
+                following_move=moves[num_moves].uci()
+                if num_moves < len(moves)
+                else None,
+                **engine_analysis,
+            )
+            processor.tree.add_opening(opening, head=head, player_colour=colour)
+            head = opening
+        else:
+            empty_moves += 1
+
+    processor._update_next_move_scores(keys, scores, empty_moves, game_metadata)
+
+
+def read_game_process_game(processor: GameProcessor, game_pgn: str) -> None:
+    """The walk driven by python-chess's `read_game`, which tokenises the whole movetext"""
+    walk = _GameWalk(processor)
+    try:
+        read_game(io.StringIO(game_pgn), Visitor=lambda: walk)
+    except _EndOfOpenings:
+        pass
+    walk.end()
+    walk.finish()
+
+
+def load_corpus(path: Optional[str], num_games: int) -> list[str]:
+    """Loads the games from a `.pgn` file or a JSON list of PGNs (as cached by the retriever)"""
+    if path is None:
+        from tests.games.data_loader import load_game
+
+        return [load_game()] * num_games
+    if Path(path).suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)[:num_games]
+    with open(path, "r", encoding="utf-8") as f:
+        return re.split(r"\n\n(?=\[Event )", f.read())[:num_games]
+
+
+@click.command()
+@click.option(
+    "--corpus", default=None, help="Path to a .pgn file, or a JSON list of PGNs"
+)
+@click.option("--num-games", default=1000, help="Number of games to process", type=int)
+@click.option("--player-id", default="matyasj", help="Player whose games are processed")
+def main(corpus: Optional[str], num_games: int, player_id: str):
+    games = load_corpus(corpus, num_games)
+    eco_db = EcoDB(EcoDB.compiled("eco/openings.json"))
+
+    for label, process in [
+        ("replay", legacy_process_game),
+        ("read_game", read_game_process_game),
+        ("scan_game", GameProcessor.process_game),
+    ]:
+        processor = GameProcessor(Tree(), ConstantEngine(), eco_db, player_id)
+        start = time.perf_counter()
+        for game in games:
+            process(processor, game)
+        elapsed = time.perf_counter() - start
+        click.echo(f"{label:>9}: {elapsed / len(games) * 1e3:8.3f} ms/game")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark of the static round-robin split of the games against the dynamic dispatch of batches"""
+from benchmarks.process_games import ConstantEngine, load_corpus
+from chess_opening_analyser.games.processor import GameProcessor
+from chess_opening_analyser.openings.tree import Tree
+from chess_opening_analyser.opening_directory import EcoDB
+from cli.analyse_openings import batched, imap_unordered_bounded
+from multiprocessing import Pool
+from typing import Optional
+
+import click
+import random
+import time
+
+
+def process_slice(games: list[tuple[str, float]], eco_db_path: str) -> int:
+    """Processes the games, each of them also sleeping for its cost to stand in for the engine"""
+    processor = GameProcessor(Tree(), ConstantEngine(), EcoDB(eco_db_path), "matyasj")
+    for game, cost in games:
+        processor.process_game(game)
+        time.sleep(cost)
+    return len(games)
+
+
+def skewed_costs(
+    num_games: int, mean_cost: float, tail: float, seed: int = 0
+) -> list[float]:
+    """Pareto distributed costs, as with long games or positions missing from the engine cache"""
+    rng = random.Random(seed)
+    costs = [rng.paretovariate(tail) for _ in range(num_games)]
+    scale = mean_cost * num_games / sum(costs)
+    return [cost * scale for cost in costs]
+
+
+@click.command()
+@click.option(
+    "--corpus", default=None, help="Path to a .pgn file, or a JSON list of PGNs"
+)
+@click.option("--num-games", default=1000, help="Number of games to process", type=int)
+@click.option("--num-workers", default=4, help="Number of workers", type=int)
+@click.option(
+    "--mean-cost", default=0.02, help="Mean engine latency per game in s", type=float
+)
+@click.option(
+    "--tail",
+    default=1.2,
+    help="Shape of the Pareto costs, lower is more skewed",
+    type=float,
+)
+@click.option(
+    "--batch-sizes", default="8,64,256", help="Comma-separated batch sizes", type=str
+)
+def main(
+    corpus: Optional[str],
+    num_games: int,
+    num_workers: int,
+    mean_cost: float,
+    tail: float,
+    batch_sizes: str,
+):
+    games = load_corpus(corpus, num_games)
+    games = list(zip(games, skewed_costs(len(games), mean_cost, tail)))
+    eco_db_path = EcoDB.compiled("eco/openings.json")
+
+    with Pool(processes=num_workers) as pool:
+        start = time.perf_counter()
+        pool.starmap(
+            process_slice,
+            [(games[i::num_workers], eco_db_path) for i in range(num_workers)],
+        )
+        elapsed = time.perf_counter() - start
+        click.echo(f"{'static':>12}: {len(games) / elapsed:8.1f} games/s")
+
+        for batch_size in map(int, batch_sizes.split(",")):
+            start = time.perf_counter()
+            for _ in imap_unordered_bounded(
+                pool,
+                process_slice,
+                ((batch, eco_db_path) for batch in batched(games, batch_size)),
+                2 * num_workers,
+            ):
+                pass
+            elapsed = time.perf_counter() - start
+            click.echo(
+                f"{f'dynamic/{batch_size}':>12}: {len(games) / elapsed:8.1f} games/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark of merging the trees of the workers, against the previous pairwise reduction"""
+from benchmarks.tree_parents import synthetic_tree
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.tree import Tree
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import reduce
+
+import click
+import random
+import time
+
+
+def worker_tree(num_nodes: int, occurrences: int, seed: int) -> Tree:
+    """A synthetic tree with `occurrences` games per opening, as built by a worker"""
+    rng = random.Random(seed)
+    tree = synthetic_tree(num_nodes, fan_out=3, seed=seed)
+    for opening in tree.nodes.values():
+        for _ in range(occurrences):
+            opening.update_opening(
+                rng.choice([PlayerColour.W, PlayerColour.B]),
+                datetime(2023, 1, 1),
+                rng.choice([0.0, 0.5, 1.0]),
+                "e2e4",
+                rng.random(),
+                "e2e4",
+            )
+    return tree
+
+
+def legacy_add(tree_1: Tree, tree_2: Tree) -> Tree:
+    """The previous `Tree.__add__`: new dicts of all the nodes and edges, mutating the left openings"""
+    tree = Tree(tree_1.position_key)
+    tree.nodes = {}
+    for key in tree_1.nodes.keys() | tree_2.nodes.keys():
+        if key in tree_1.nodes and key in tree_2.nodes:
+            tree_1.nodes[key] += tree_2.nodes[key]
+        tree.nodes[key] = tree_1.nodes.get(key) or tree_2.nodes[key]
+    edges = {}
+    for key in tree_1.edges.keys() | tree_2.edges.keys():
+        edges[key] = defaultdict(Counter)
+        for colour in [PlayerColour.W, PlayerColour.B]:
+            edges[key][colour] = tree_1.edges.get(key, {}).get(
+                colour, Counter()
+            ) + tree_2.edges.get(key, {}).get(colour, Counter())
+    tree.edges = edges
+    return tree
+
+
+@click.command()
+@click.option("--num-trees", default=32, help="Number of trees to merge", type=int)
+@click.option("--num-nodes", default=2000, help="Number of openings per tree", type=int)
+@click.option("--occurrences", default=4, help="Games per opening per tree", type=int)
+def main(num_trees: int, num_nodes: int, occurrences: int):
+    for label, merge in [
+        ("reduce(legacy)", lambda trees: reduce(legacy_add, trees)),
+        ("reduce(+)", lambda trees: reduce(lambda x, y: x + y, trees)),
+        ("merge_many", Tree.merge_many),
+    ]:
+        trees = [worker_tree(num_nodes, occurrences, seed) for seed in range(num_trees)]
+        start = time.perf_counter()
+        merged = merge(trees)
+        elapsed = time.perf_counter() - start
+        click.echo(
+            f"{label:>14}: {elapsed * 1e3:8.1f} ms, "
+            f"{sum(o.occurrence for o in merged.nodes.values())} occurrences"
+        )
+
+
+if __name__ == "__main__":
+    main()
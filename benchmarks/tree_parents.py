@@ -0,0 +1,73 @@
+"""
+Benchmark of `Tree.parents` on a synthetic tree, against scanning all the edges, and of the single
+opening view's subgraph extraction (`Tree.filter_by_opening` and the Sankey transform)
+"""
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.opening import Opening
+from chess_opening_analyser.openings.tree import Tree
+from chess_opening_analyser.openings.transformers import Transformer
+from functools import reduce
+from typing import Optional
+
+import click
+import random
+import time
+
+
+def synthetic_tree(num_nodes: int, fan_out: int, seed: int = 0) -> Tree:
+    """A tree of `num_nodes` openings, each following up to `fan_out` earlier ones"""
+    rng = random.Random(seed)
+    tree = Tree()
+    openings = [tree.root]
+    for i in range(num_nodes):
+        opening = Opening(
+            fen=f"opening {i}", eco="A00", name=f"Opening {i}", num_moves=1, index=i
+        )
+        for head in rng.sample(openings, min(len(openings), fan_out)):
+            colour = rng.choice([PlayerColour.W, PlayerColour.B])
+            tree.add_opening(opening, head=head, player_colour=colour)
+        openings.append(opening)
+    return tree
+
+
+def scan_parents(tree: Tree, key: str, colour: Optional[PlayerColour] = None) -> list:
+    """The previous lookup, scanning all the edges for the ones pointing to the opening"""
+    parents = []
+    for parent, child_counter in tree.edges.items():
+        if colour is None:
+            children = reduce(lambda a, b: a + b, child_counter.values())
+        else:
+            children = child_counter[colour]
+        if key in children:
+            parents.append(tree.nodes[parent])
+    return parents
+
+
+@click.command()
+@click.option(
+    "--num-nodes", default=5000, help="Number of openings in the tree", type=int
+)
+@click.option(
+    "--fan-out", default=3, help="Number of parents of each opening", type=int
+)
+@click.option("--lookups", default=200, help="Number of parent lookups", type=int)
+def main(num_nodes: int, fan_out: int, lookups: int):
+    tree = synthetic_tree(num_nodes, fan_out)
+    keys = random.Random(1).sample(list(tree.nodes), lookups)
+
+    for label, parents in [("scan", scan_parents), ("index", Tree.parents)]:
+        start = time.perf_counter()
+        for key in keys:
+            parents(tree, key)
+        elapsed = time.perf_counter() - start
+        click.echo(f"{label:>5}: {elapsed / lookups * 1e6:10.1f} us/lookup")
+
+    start = time.perf_counter()
+    for key in keys[:10]:
+        Transformer.tree_to_sankey(tree.filter_by_opening(key))
+    elapsed = time.perf_counter() - start
+    click.echo(f"filter_by_opening + sankey: {elapsed / 10 * 1e3:8.2f} ms/opening")
+
+
+if __name__ == "__main__":
+    main()
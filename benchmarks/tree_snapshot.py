@@ -0,0 +1,49 @@
+"""Benchmark of loading a cached tree from its snapshot, against its JSON"""
+from benchmarks.tree_merge import worker_tree
+from chess_opening_analyser.openings.snapshot import TreeSnapshot
+from chess_opening_analyser.openings.tree import Tree
+from pathlib import Path
+
+import click
+import os
+import tempfile
+import time
+
+
+@click.command()
+@click.option("--num-trees", default=8, help="Number of worker trees merged", type=int)
+@click.option("--num-nodes", default=5000, help="Number of openings per tree", type=int)
+@click.option("--occurrences", default=4, help="Games per opening per tree", type=int)
+def main(num_trees: int, num_nodes: int, occurrences: int):
+    tree = Tree.merge_many(
+        worker_tree(num_nodes, occurrences, seed) for seed in range(num_trees)
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = Path(directory) / "tree.json"
+        tree.to_json(str(json_path))
+        paths = {"json": json_path}
+        for compress in [False, True]:
+            paths[f"snapshot{'(zlib)' if compress else ''}"] = path = (
+                Path(directory) / f"tree-{compress}.snapshot"
+            )
+            TreeSnapshot.of(tree).save(path, compress)
+
+        for label, path in paths.items():
+            start = time.perf_counter()
+            if path == json_path:
+                Tree.from_json(str(path))
+                opened = time.perf_counter()
+            else:
+                snapshot = TreeSnapshot.load(path)
+                opened = time.perf_counter()
+                snapshot.to_tree()
+            elapsed = time.perf_counter() - start
+            click.echo(
+                f"{label:>16}: {os.path.getsize(path) / 1e6:6.1f} MB, "
+                f"opened in {(opened - start) * 1e3:7.1f} ms, "
+                f"loaded in {elapsed * 1e3:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
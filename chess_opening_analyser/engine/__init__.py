@@ -0,0 +1,72 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import NamedTuple
+
+from chess import Board
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings import PositionKey
+
+
+class Evaluation(NamedTuple):
+    """
+    Evaluation of a position, independent of the colour of the player
+
+    The expectation of the result is given as wins, draws and losses per mille from White's perspective.
+    """
+
+    wins: int
+    draws: int
+    losses: int
+    best_move: str
+
+    @classmethod
+    def from_result(cls, result: str) -> "Evaluation":
+        """Pseudo evaluation of a finished game from its result"""
+        if result == "1-0":
+            return cls(1000, 0, 0, "")
+        if result == "0-1":
+            return cls(0, 0, 1000, "")
+        return cls(0, 1000, 0, "")
+
+    def probability(self, colour_played: PlayerColour) -> float:
+        """Expected score of the player with the given colour"""
+        if colour_played == PlayerColour.W:
+            return self.wins / 1000 + self.draws / 2000
+        return self.losses / 1000 + self.draws / 2000
+
+    def for_colour(self, colour_played: PlayerColour) -> dict[str, float | str]:
+        """The evaluation from the perspective of the player, as used by the processor"""
+        return {"score": self.probability(colour_played), "best_move": self.best_move}
+
+
+class Engine(ABC):
+    """
+    Chess engine evaluating positions for the processor
+
+    Positions are submitted for evaluation and come back as futures, so that an engine can evaluate
+    them in the background while the caller keeps parsing games.
+    """
+
+    @abstractmethod
+    def submit(self, board: Board, key: PositionKey) -> "Future[Evaluation]":
+        """
+        Submits the position on the board for evaluation
+
+        Args:
+            board (Board): the board at the position; it is not kept, so the caller may keep pushing moves
+            key (PositionKey): the key of the position, e.g. its FEN or Zobrist hash, to cache the evaluation by
+        """
+        raise NotImplementedError
+
+    def evaluate(self, board: Board, key: PositionKey) -> Evaluation:
+        """Evaluates the position on the board, waiting for the result"""
+        return self.submit(board, key).result()
+
+    def get_best_move_for_board(
+        self, board: Board, colour_played: PlayerColour, key: PositionKey
+    ) -> dict[str, float | str]:
+        """Gets the best next move for the position on the board, and its score for the player"""
+        return self.evaluate(board, key).for_colour(colour_played)
+
+    def quit(self) -> None:
+        """Stops the engine"""
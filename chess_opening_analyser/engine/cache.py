@@ -0,0 +1,91 @@
+from pathlib import Path
+from typing import Optional
+
+import sqlite3
+
+
+class EvaluationCache:
+    """
+    Persistent store of engine evaluations, shared across runs and worker processes
+
+    Evaluations are keyed by (normalised FEN, depth, engine version) and stored as the win/draw/loss
+    expectation (per mille) from White's perspective with the best move, so that they are independent
+    of the colour the player had. The store is an SQLite DB in WAL mode, which allows the workers to
+    read concurrently while one of them writes.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS evaluations (
+                fen TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                engine TEXT NOT NULL,
+                wins INTEGER NOT NULL,
+                draws INTEGER NOT NULL,
+                losses INTEGER NOT NULL,
+                best_move TEXT NOT NULL,
+                PRIMARY KEY (fen, depth, engine)
+            ) WITHOUT ROWID
+            """
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, fen: str, depth: int, engine: str
+    ) -> Optional[tuple[int, int, int, str]]:
+        """
+        Gets the evaluation of the position, if it has been stored
+
+        Returns:
+            Optional[tuple[int, int, int, str]]: (wins, draws, losses, best_move), from White's perspective
+        """
+        row = self.connection.execute(
+            "SELECT wins, draws, losses, best_move FROM evaluations "
+            "WHERE fen = ? AND depth = ? AND engine = ?",
+            (fen, depth, engine),
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return row
+
+    def put(
+        self,
+        fen: str,
+        depth: int,
+        engine: str,
+        wins: int,
+        draws: int,
+        losses: int,
+        best_move: str,
+    ) -> None:
+        """Stores the evaluation of the position, from White's perspective"""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (fen, depth, engine, wins, draws, losses, best_move),
+        )
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Hit/miss statistics of this connection"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
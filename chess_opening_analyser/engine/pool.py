@@ -0,0 +1,142 @@
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional
+from chess import Board, engine
+from chess_opening_analyser.engine import Engine, Evaluation
+from chess_opening_analyser.engine.cache import EvaluationCache
+from chess_opening_analyser.openings import PositionKey
+
+import asyncio
+import threading
+
+
+class EnginePool(Engine):
+    """
+    Pool of Stockfish processes analysing the submitted positions in the background
+
+    The engines are driven through `chess.engine`'s asyncio API on an event loop running in its own
+    thread. Submitted positions are put on a queue that each engine takes from as soon as it is idle,
+    so the caller only blocks when it needs an evaluation that isn't ready yet.
+    Positions already submitted (or evaluated) are not queued again.
+    """
+
+    CACHE_SIZE = 2**14
+
+    def __init__(
+        self,
+        stockfish_path: str | list[str],
+        size: int = 2,
+        analysis_depth: int = 10,
+        threads: int = 1,
+        hash_mb: int = 16,
+        cache: Optional[EvaluationCache] = None,
+    ):
+        """
+        Args:
+            stockfish_path (str | list[str]): path to the Stockfish binary, or the command to run it
+            size (int, optional): number of engine processes. Defaults to 2.
+            analysis_depth (int, optional): depth of the analysis. Defaults to 10.
+            threads (int, optional): search threads of each engine. Defaults to 1.
+            hash_mb (int, optional): size of the hash table of each engine in MB. Defaults to 16.
+            cache (Optional[EvaluationCache], optional): persistent store of evaluations, shared
+                across runs and processes. Defaults to None.
+        """
+        self.depth = analysis_depth
+        self.cache = cache
+        self._futures: dict[PositionKey, Future[Evaluation]] = {}
+        # evaluations done by the engines, to be stored in the cache from the caller's thread
+        self._evaluated: deque[tuple[str, Evaluation]] = deque()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._run(self._start(stockfish_path, size, threads, hash_mb))
+
+    def _run(self, coroutine):
+        """Runs the coroutine on the pool's event loop, waiting for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _start(
+        self, stockfish_path: str | list[str], size: int, threads: int, hash_mb: int
+    ) -> None:
+        """Starts the engines, and a worker feeding each of them from the queue"""
+        self._queue: asyncio.Queue[tuple[Board, Future[Evaluation]]] = asyncio.Queue()
+        self._engines: list[engine.UciProtocol] = []
+        for _ in range(size):
+            _, protocol = await engine.popen_uci(stockfish_path)
+            await protocol.configure({"Threads": threads, "Hash": hash_mb})
+            self._engines.append(protocol)
+
+        self.version = self._engines[0].id.get("name", "")
+        self._workers = [
+            asyncio.create_task(self._work(protocol)) for protocol in self._engines
+        ]
+
+    async def _work(self, protocol: engine.UciProtocol) -> None:
+        """Analyses the queued positions with one engine, resolving their futures"""
+        while True:
+            board, future = await self._queue.get()
+            try:
+                analysis = await protocol.analyse(board, engine.Limit(depth=self.depth))
+                assert "score" in analysis, "Stockfish analysis did not return a score"
+                assert "pv" in analysis, "Stockfish analysis did not return a pv"
+
+                wdl = analysis["score"].white().wdl()
+                evaluation = Evaluation(
+                    wdl.wins, wdl.draws, wdl.losses, analysis["pv"][0].uci()
+                )
+                self._evaluated.append((board.epd(), evaluation))
+                future.set_result(evaluation)
+            except Exception as error:
+                future.set_exception(error)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, board: Board, key: PositionKey) -> "Future[Evaluation]":
+        """Queues the position for evaluation, unless it has been submitted before"""
+        self._store_evaluated()
+
+        future = self._futures.get(key)
+        if future is not None:
+            return future
+
+        if len(self._futures) >= self.CACHE_SIZE:
+            self._futures.pop(next(iter(self._futures)))
+        future = self._futures[key] = Future()
+
+        if board.is_game_over():
+            future.set_result(Evaluation.from_result(board.result()))
+            return future
+
+        if self.cache is not None:
+            cached = self.cache.get(board.epd(), self.depth, self.version)
+            if cached is not None:
+                future.set_result(Evaluation(*cached))
+                return future
+
+        self._loop.call_soon_threadsafe(
+            self._queue.put_nowait, (board.copy(stack=False), future)
+        )
+        return future
+
+    def _store_evaluated(self) -> None:
+        """Stores the evaluations done by the engines since the last call in the persistent cache"""
+        while self._evaluated:
+            fen, evaluation = self._evaluated.popleft()
+            if self.cache is not None:
+                self.cache.put(fen, self.depth, self.version, *evaluation)
+
+    async def _stop(self) -> None:
+        """Waits for the queued positions, then stops the workers and the engines"""
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        for protocol in self._engines:
+            await protocol.quit()
+
+    def quit(self) -> None:
+        self._run(self._stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._store_evaluated()
@@ -0,0 +1,47 @@
+from collections import Counter
+from concurrent.futures import Future
+from typing import Mapping
+from chess import Board
+from chess_opening_analyser.engine import Engine, Evaluation
+from chess_opening_analyser.openings import PositionKey
+
+
+class PositionCollector(Engine):
+    """
+    Stands in for an engine to collect the positions submitted for evaluation, without evaluating them
+
+    Walking games with the collector gives the distinct positions the walk needs evaluated, and how
+    often each is reached, so that they can be analysed once each before the tree is built.
+    The futures returned are never resolved.
+    """
+
+    def __init__(self):
+        self.counts: Counter[PositionKey] = Counter()
+        self.positions: dict[PositionKey, str] = {}
+
+    def submit(self, board: Board, key: PositionKey) -> "Future[Evaluation]":
+        self.counts[key] += 1
+        if key not in self.positions:
+            self.positions[key] = board.epd()
+        return Future()
+
+    def update(self, other: "PositionCollector") -> None:
+        """Adds the positions collected by another collector, e.g. of another worker"""
+        self.counts.update(other.counts)
+        self.positions.update(other.positions)
+
+    def by_frequency(self) -> list[tuple[PositionKey, str]]:
+        """The collected (key, EPD) pairs, the most frequent position first"""
+        return [(key, self.positions[key]) for key, _ in self.counts.most_common()]
+
+
+class PrecomputedEngine(Engine):
+    """Engine answering from evaluations computed beforehand, keyed by position"""
+
+    def __init__(self, evaluations: Mapping[PositionKey, Evaluation]):
+        self.evaluations = evaluations
+
+    def submit(self, board: Board, key: PositionKey) -> "Future[Evaluation]":
+        future: Future[Evaluation] = Future()
+        future.set_result(self.evaluations[key])
+        return future
@@ -1,14 +1,34 @@
-from functools import lru_cache
+from concurrent.futures import Future
+from typing import Optional
 from chess import Board, engine
+from chess_opening_analyser.engine import Engine, Evaluation
+from chess_opening_analyser.engine.cache import EvaluationCache
 from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings import PositionKey
 
 
-class Stockfish:
-    def __init__(self, stockfish_path: str, analysis_depth=10):
+class Stockfish(Engine):
+    CACHE_SIZE = 2**14
+
+    def __init__(
+        self,
+        stockfish_path: str,
+        analysis_depth=10,
+        cache: Optional[EvaluationCache] = None,
+    ):
+        """
+        Args:
+            stockfish_path (str): path to the Stockfish binary
+            analysis_depth (int, optional): depth of the analysis. Defaults to 10.
+            cache (Optional[EvaluationCache], optional): persistent store of evaluations, shared
+                across runs and processes. Defaults to None.
+        """
         self.engine = engine.SimpleEngine.popen_uci(stockfish_path)
         self.depth = analysis_depth
+        self.version = self.engine.id.get("name", "")
+        self.cache = cache
+        self._cache: dict[PositionKey, Evaluation] = {}
 
-    @lru_cache(maxsize=2**14)
     def get_best_move(
         self, fen: str, colour_played: PlayerColour
     ) -> dict[str, float | str]:
@@ -22,39 +42,52 @@ class Stockfish:
             dict: {"score": chess.engine.Score, "best_move": str}: the best next move and corresponding score
         """
         board = Board(fen=fen)
+        return self.evaluate(board, board.epd()).for_colour(colour_played)
+
+    def submit(self, board: Board, key: PositionKey) -> "Future[Evaluation]":
+        """Evaluates the position synchronously, returning the evaluation as a completed future"""
+        future: Future[Evaluation] = Future()
+        future.set_result(self.evaluate(board, key))
+        return future
+
+    def evaluate(self, board: Board, key: PositionKey) -> Evaluation:
+        """
+        Evaluates the position on the board, cached by the key of the position
+
+        The evaluation doesn't depend on the colour of the player, so a position reached in games
+        with either colour is only analysed once.
+        """
+        evaluation = self._cache.get(key)
+        if evaluation is None:
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            evaluation = self._cache[key] = self._evaluate(board)
+        return evaluation
+
+    def _evaluate(self, board: Board) -> Evaluation:
+        """Evaluates the position with the engine, or takes the evaluation from the persistent cache"""
         if board.is_game_over():
-            return {
-                "score": self._pseudo_probability(
-                    board.result(), colour_played=colour_played
-                ),
-                "best_move": "",
-            }
+            return Evaluation.from_result(board.result())
+
+        fen = board.epd()
+        if self.cache is not None:
+            cached = self.cache.get(fen, self.depth, self.version)
+            if cached is not None:
+                return Evaluation(*cached)
+
         stockfish_analysis = self.engine.analyse(board, engine.Limit(depth=self.depth))
         assert (
             "score" in stockfish_analysis
         ), "Stockfish analysis did not return a score"
         assert "pv" in stockfish_analysis, "Stockfish analysis did not return a pv"
-        return {
-            "score": self._get_probability(stockfish_analysis["score"], colour_played),
-            "best_move": stockfish_analysis["pv"][0].uci(),
-        }
-
-    @staticmethod
-    def _pseudo_probability(result: str, colour_played: PlayerColour) -> float:
-        if result == "1-0":
-            return 1.0 if colour_played == PlayerColour.W else 0.0
-        if result == "0-1":
-            return 0.0 if colour_played == PlayerColour.W else 1.0
-        return 0.5
-
-    @staticmethod
-    def _get_probability(info: engine.PovScore, colour_played: PlayerColour) -> float:
-        if colour_played == PlayerColour.W:
-            score = info.white()
-        else:
-            score = info.black()
-
-        return score.wdl().wins / 1000 + score.wdl().draws / 2000
+
+        wdl = stockfish_analysis["score"].white().wdl()
+        evaluation = Evaluation(
+            wdl.wins, wdl.draws, wdl.losses, stockfish_analysis["pv"][0].uci()
+        )
+        if self.cache is not None:
+            self.cache.put(fen, self.depth, self.version, *evaluation)
+        return evaluation
 
     def quit(self):
         self.engine.quit()
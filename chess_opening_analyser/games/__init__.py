@@ -1,9 +1,18 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 import json
+import os
+from chess.pgn import HeadersBuilder
 from tqdm import tqdm
 from enum import Enum
-from typing import Optional
+from itertools import chain
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from chess_opening_analyser.games.pgn import scan_game
+from chess_opening_analyser.logger import logger
 
 
 class PlayerColour(str, Enum):
@@ -11,34 +20,191 @@ class PlayerColour(str, Enum):
     B = "Black"
 
 
+class HighWaterMark(NamedTuple):
+    """
+    The end of the latest game analysed for a player, from which the analysis can be updated
+
+    Games are ordered by their end time, the link telling apart the games that ended in the same second.
+    Games without a (complete) date have no end, and are left out of the mark and of the updates.
+    """
+
+    end_time: datetime
+    link: str = ""
+
+    @staticmethod
+    def game_end(game: str) -> Optional[tuple[datetime, str]]:
+        """The end time and link of the game in PGN format, from its headers, None if it has no date"""
+        headers = scan_game(game, HeadersBuilder())
+        end_date = headers.get("EndDate", headers.get("Date", "????.??.??"))
+        end_time = headers.get("EndTime", "00:00:00")
+        try:
+            end = datetime.strptime(f"{end_date} {end_time}", "%Y.%m.%d %H:%M:%S")
+        except ValueError:
+            return None
+        return end, headers.get("Link", "")
+
+    @classmethod
+    def of(
+        cls, games: Iterable[str], previous: Optional["HighWaterMark"] = None
+    ) -> Optional["HighWaterMark"]:
+        """The mark after the dated games (and the previous mark), None if there are neither"""
+        ends = (cls(*end) for end in map(cls.game_end, games) if end)
+        return max(chain(ends, [previous] if previous else []), default=None)
+
+    def precedes(self, game: str) -> bool:
+        """Whether the game in PGN format ended after the mark, i.e. it hasn't been analysed yet"""
+        end = self.game_end(game)
+        return end is not None and end > (self.end_time, self.link)
+
+    def to_json(self, path: str | Path) -> None:
+        with open(path, "w") as f:
+            json.dump({"end_time": self.end_time.isoformat(), "link": self.link}, f)
+
+    @classmethod
+    def from_json(cls, path: str | Path) -> "HighWaterMark":
+        with open(path, "r") as f:
+            json_dict = json.load(f)
+        return cls(datetime.fromisoformat(json_dict["end_time"]), json_dict["link"])
+
+
 class GameRetriever(ABC):
+    """
+    Retrieves the games of a player, caching them per monthly archive
+
+    The games of each month are cached in `CACHE_DIR/games/{player_id}/{YYYY-MM}.json`. A month that
+    was over when it was cached is complete, and is never retrieved again; the current month is
+    retrieved each time, so the retrieval and the cache I/O scale with the new games.
+
+    The months are retrieved concurrently, by up to `MAX_WORKERS` threads.
+    """
+
     CACHE_DIR = Path("chess_opening_analyser/cache")
+    MAX_WORKERS = 8
 
     def __init__(self):
         self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
     @abstractmethod
-    def _get_games(
-        self, player_id: str, months: Optional[list[str]] = None
-    ) -> list[str]:
-        """Returns a single game from the platform in PGN format"""
+    def _get_months(self, player_id: str) -> list[str]:
+        """Returns the months the player has games in, as `YYYY/MM` in chronological order"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _get_games_of_month(
+        self, player_id: str, month: str, validators: dict[str, str]
+    ) -> tuple[Optional[list[str]], dict[str, str]]:
+        """
+        Returns the games of the player in the month (`YYYY/MM`) in PGN format
+
+        Args:
+            player_id (str): the player
+            month (str): the month, as `YYYY/MM`
+            validators (dict[str, str]): the validators of the cached games of the month (e.g. their
+                ETag), empty if they aren't cached
+
+        Returns:
+            tuple[Optional[list[str]], dict[str, str]]: the games, None if the cached games are still
+                valid, and the validators of the games
+        """
         raise NotImplementedError
 
-    def _load_from_cache(self, player_id: str) -> list[str]:
-        with open(self.CACHE_DIR / f"{player_id}.json", "r", encoding="utf-8") as f:
-            games = json.load(f)
+    def _month_path(self, player_id: str, month: str) -> Path:
+        return self.CACHE_DIR / "games" / player_id / f"{month.replace('/', '-')}.json"
+
+    def _get_month(self, player_id: str, month: str, caching=True) -> list[str]:
+        """
+        Returns the games of the month, from the cache if the month was complete when cached
+
+        The cache is written to a temporary file moved in its place, so it's never truncated, and a
+        cached month that can't be read (e.g. truncated by an earlier version) is retrieved again.
+        """
+        path = self._month_path(player_id, month)
+        cached = {"games": [], "validators": {}}
+        if caching and path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+            except json.JSONDecodeError:
+                logger.warning(
+                    f"Retrieving the unreadable cached games of {path} again"
+                )
+            else:
+                if cached["complete"]:
+                    return cached["games"]
+
+        games, validators = self._get_games_of_month(
+            player_id, month, cached.get("validators", {})
+        )
+        if games is None:
+            games = cached["games"]
+        if caching:
+            complete = month < datetime.now(timezone.utc).strftime("%Y/%m")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"complete": complete, "games": games, "validators": validators},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(temporary_path, path)
         return games
 
-    def _cache_games(self, player_id: str, games: list[str]):
-        with open(self.CACHE_DIR / f"{player_id}.json", "w", encoding="utf-8") as f:
-            json.dump(games, f, ensure_ascii=False, indent=4)
+    def _iter_games_in_months(
+        self, player_id: str, months: list[str], caching=True
+    ) -> Iterator[str]:
+        """
+        Yields the games of the months in order
+
+        The months are retrieved at most `MAX_WORKERS` ahead of the one being consumed, so only
+        that many months of games are held at a time.
+        """
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            pending: deque[Future[list[str]]] = deque()
+            for month in tqdm(months):
+                pending.append(
+                    executor.submit(self._get_month, player_id, month, caching)
+                )
+                if len(pending) >= self.MAX_WORKERS:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def _get_games(
+        self, player_id: str, months: Optional[list[str]] = None, caching=False
+    ) -> list[str]:
+        """Returns the games of the player in PGN format, only from the given months if any"""
+        archived_months = self._get_months(player_id)
+
+        if months:
+            archived_months = [month for month in archived_months if month in months]
+
+        return list(self._iter_games_in_months(player_id, archived_months, caching))
+
+    def iter_games(self, player_id: str, caching=True) -> Iterator[str]:
+        """Yields all the games for the given player_id in the PGN format, month by month"""
+        yield from self._iter_games_in_months(
+            player_id, self._get_months(player_id), caching
+        )
 
     def get_all_games(self, player_id: str, caching=True) -> list[str]:
         """Gets all the games for the given player_id in the PGN format"""
-        if Path(self.CACHE_DIR / f"{player_id}.json").exists() and caching:
-            games = self._load_from_cache(player_id)
-        else:
-            games = self._get_games(player_id)
-            if caching:
-                self._cache_games(player_id, games)
-        return games
+        return list(self.iter_games(player_id, caching))
+
+    def iter_new_games(
+        self, player_id: str, mark: HighWaterMark, caching=True
+    ) -> Iterator[str]:
+        """Yields the games of the player that ended after the high-water mark, in the PGN format"""
+        since_month = mark.end_time.strftime("%Y/%m")
+        months = [
+            month for month in self._get_months(player_id) if month >= since_month
+        ]
+        for game in self._iter_games_in_months(player_id, months, caching):
+            if mark.precedes(game):
+                yield game
+
+    def get_new_games(
+        self, player_id: str, mark: HighWaterMark, caching=True
+    ) -> list[str]:
+        """Gets the games of the player that ended after the high-water mark, in the PGN format"""
+        return list(self.iter_new_games(player_id, mark, caching))
@@ -1,44 +1,86 @@
 import requests
 from chess_opening_analyser.games import GameRetriever
-from itertools import chain
+from requests.adapters import HTTPAdapter
 from typing import Optional
-from tqdm import tqdm
+from urllib3.util import Retry
 
 
 class ChessCom(GameRetriever):
-    """Chess.com game retriever responsible for retrieving games from chess.com"""
+    """
+    Chess.com game retriever responsible for retrieving games from chess.com
+
+    The requests share a session, whose connections are pooled (one per worker) and kept alive.
+    Requests that are rate limited (429) or fail on the server (5xx) are retried with an
+    exponential backoff, and the archives are requested conditionally on their ETag and
+    Last-Modified validators, so that unchanged ones aren't downloaded again.
+    """
 
     GAMES_EXT = "games/archives"
     ARCHIVE_URL = "https://api.chess.com/pub/player"
+    RETRY = Retry(
+        total=5,
+        connect=1,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+    )
+    # the request headers conditional on the validators of the response headers
+    CONDITIONAL_HEADERS = {
+        "ETag": "If-None-Match",
+        "Last-Modified": "If-Modified-Since",
+    }
 
-    def _get_games(
-        self, player_id: str, months: Optional[list[str]] = None
-    ) -> list[str]:
-        if months is None:
-            months = []
+    def __init__(self):
+        super().__init__()
+        adapter = HTTPAdapter(pool_maxsize=self.MAX_WORKERS, max_retries=self.RETRY)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-        monthly_urls = self._get_monthly_archive(player_id)
+    def _get(
+        self, url: str, player_id: str, headers: Optional[dict[str, str]] = None
+    ) -> requests.Response:
+        return self.session.get(
+            url,
+            headers={
+                "User-Agent": f"username: {player_id}",  # this is needed to avoid a 403 error
+                **(headers or {}),
+            },
+        )
 
-        if months:
-            monthly_urls = [url for url in monthly_urls if url[-7:] in months]
+    def _get_months(self, player_id: str) -> list[str]:
+        return [url[-7:] for url in self._get_monthly_archive(player_id)]
 
-        return list(
-            chain.from_iterable(
-                self._get_games_in_month(url, player_id) for url in tqdm(monthly_urls)
-            )
+    def _get_games_of_month(
+        self, player_id: str, month: str, validators: dict[str, str]
+    ) -> tuple[Optional[list[str]], dict[str, str]]:
+        return self._get_games_in_month(
+            f"{self.ARCHIVE_URL}/{player_id}/games/{month}", player_id, validators
         )
 
     def _get_monthly_archive(self, player_id: str) -> list[str]:
-        monthly_urls = requests.get(
-            f"{self.ARCHIVE_URL}/{player_id}/{self.GAMES_EXT}",
-            headers={"User-Agent": f"username: {player_id}"},
-        )  # this is needed to avoid a 403 error
+        monthly_urls = self._get(
+            f"{self.ARCHIVE_URL}/{player_id}/{self.GAMES_EXT}", player_id
+        )
+        monthly_urls.raise_for_status()
         return monthly_urls.json().get("archives", [])
 
-    @staticmethod
-    def _get_games_in_month(url: str, player_id: str) -> list[str]:
-        monthly_archive = requests.get(
-            url, headers={"User-Agent": f"username: {player_id}"}
-        ).json()
+    def _get_games_in_month(
+        self, url: str, player_id: str, validators: dict[str, str]
+    ) -> tuple[Optional[list[str]], dict[str, str]]:
+        response = self._get(
+            url,
+            player_id,
+            {self.CONDITIONAL_HEADERS[k]: v for k, v in validators.items()},
+        )
+        if response.status_code == 304:
+            return None, validators
+        response.raise_for_status()
+
+        monthly_archive = response.json()
         games = [game.get("pgn", "") for game in monthly_archive.get("games", [])]
-        return [game for game in games if game != ""]
+        return [game for game in games if game != ""], {
+            k: response.headers[k]
+            for k in self.CONDITIONAL_HEADERS
+            if k in response.headers
+        }
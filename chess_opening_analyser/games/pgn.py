@@ -0,0 +1,97 @@
+from typing import TypeVar
+
+from chess import Board
+from chess.pgn import SKIP, BaseVisitor
+
+import re
+
+ResultT = TypeVar("ResultT")
+
+HEADER_REGEX = re.compile(r'\[([A-Za-z0-9][A-Za-z0-9_+#=:-]*)\s+"(.*)"\]\s*$')
+MOVE_NUMBER_REGEX = re.compile(r"^\d+\.+")
+TOKEN_REGEX = re.compile(
+    r"""
+    \{[^}]*\}?          # comment, possibly spanning lines
+    | ;[^\n]*           # rest-of-line comment
+    | [()]              # start or end of a variation
+    | \$\d+             # NAG
+    | [^\s(){};$]+      # move number, SAN or result
+    """,
+    re.VERBOSE,
+)
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+
+def scan_game(game_pgn: str, visitor: BaseVisitor[ResultT]) -> ResultT:
+    """
+    Scans a single game in PGN format, driving the visitor like `chess.pgn.read_game` would
+
+    This is a lightweight alternative to `read_game` for games that are already in memory. Only the
+    headers and the SAN tokens of the mainline are handed to the visitor: comments, NAGs and
+    variations are skipped without being parsed. The movetext is tokenised lazily, so a visitor that
+    raises to stop the walk (e.g. once it is past the openings) never pays for the rest of the game.
+
+    Args:
+        game_pgn (str): the game in PGN format
+        visitor (BaseVisitor): the visitor to drive; returning SKIP from `end_headers` skips the movetext
+
+    Returns:
+        ResultT: the result of the visitor
+    """
+    visitor.begin_game()
+    visitor.begin_headers()
+
+    text = game_pgn.lstrip()
+    headers = {}
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        end = len(text) if end == -1 else end
+        match = HEADER_REGEX.match(text, start, end)
+        if match is None:
+            break
+        headers[match.group(1)] = match.group(2).replace('\\"', '"')
+        visitor.visit_header(match.group(1), headers[match.group(1)])
+        start = end + 1
+
+    if visitor.end_headers() is SKIP:
+        visitor.end_game()
+        return visitor.result()
+
+    board = Board(headers.get("FEN", Board.starting_fen))
+    visitor.visit_board(board)
+
+    variation_depth = 0
+    for match in TOKEN_REGEX.finditer(text, start):
+        token = match.group(0)
+
+        if token[0] in "{;$":
+            continue
+        if token == "(":
+            variation_depth += 1
+            continue
+        if token == ")":
+            variation_depth = max(variation_depth - 1, 0)
+            continue
+        if variation_depth:
+            continue
+        if token in RESULTS:
+            visitor.visit_result(token)
+            break
+
+        san = MOVE_NUMBER_REGEX.sub("", token).rstrip("!?")
+        if not san:
+            continue
+
+        try:
+            move = visitor.parse_san(board, san)
+        except ValueError as error:
+            visitor.handle_error(error)
+            break
+
+        visitor.visit_move(board, move)
+        board.push(move)
+        visitor.visit_board(board)
+
+    visitor.end_game()
+    return visitor.result()
@@ -1,16 +1,22 @@
-from typing import Optional
+from collections import Counter
+from concurrent.futures import Future
+from typing import Iterable, Optional
+from chess_opening_analyser.engine import Engine, Evaluation
+from chess_opening_analyser.openings import PositionKey
 from chess_opening_analyser.openings.opening import Opening
 from chess_opening_analyser.openings.tree import Tree
-from chess_opening_analyser.engine.stockfish import Stockfish
 from chess_opening_analyser.opening_directory import EcoDB
 from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.games.pgn import scan_game
 from chess_opening_analyser.logger import logger
 
 import io
 
 from itertools import zip_longest
 from datetime import datetime
-from chess.pgn import Game, read_game, ChildNode
+from chess import Board, Move
+from chess.polyglot import zobrist_hash
+from chess.pgn import SKIP, BaseVisitor, Game, Headers, SkipType, read_game
 
 
 class GameProcessor:
@@ -25,80 +31,83 @@ class GameProcessor:
         "King of the Hill",
     ]
 
-    def __init__(self, tree: Tree, stockfish: Stockfish, eco_db: EcoDB, user: str):
+    def __init__(self, tree: Tree, stockfish: Engine, eco_db: EcoDB, user: str):
         self.tree = tree
         self.engine = stockfish
         self.user = user
         self.eco_db = eco_db
         # TODO the above ones should be moved out of the processor
+        # games walked, and engine calls made/avoided
+        self.stats: Counter[str] = Counter()
 
     def process_game(self, game_pgn: str) -> None:
-        """Processes a single game, adding the openings to the tree"""
-        game = self._read_game(game_pgn)
-
-        if game.headers.get("Variant", None) in self.FORBIDDEN_VARIANTS:
-            return
-
-        colour = self._get_player_colour(game)
-
-        head = self.tree.root
-        game_metadata = self._game_metadata(game)
-        empty_moves = 0
-        fens = []
-        scores = []
-
-        moves = list(game.mainline())
-
-        for move in moves:
-            if empty_moves > self.MOVE_DELAY:
-                break
-
-            fen = self._fen_parser(move.board().fen())
-            fens.append(fen)
+        """
+        Processes a single game, adding the openings to the tree
 
-            openings_data = self.eco_db.lookup(fen)
-            engine_analysis = self.engine.get_best_move(fen, colour)
-            scores.append(engine_analysis["score"])
+        The game is walked while it is scanned, and scanning stops as soon as the walk is more than
+        `MOVE_DELAY` moves past the last known opening, so the rest of the movetext is never read.
+        """
+        self._walk(game_pgn).finish()
 
-            if openings_data:
-                empty_moves = 0
-                opening = Opening(**openings_data)
+    def submit_games(self, games: Iterable[str]) -> None:
+        """
+        Walks the games, submitting their positions to the engine without adding them to the tree
 
-                opening.update_opening(
-                    **game_metadata,  #  type: ignore
-                    colour=colour,
-                    following_move=self._next_move(openings_data["num_moves"], moves),
-                    **engine_analysis,  #  type: ignore
-                )
+        Used with a `PositionCollector` to gather the positions to analyse ahead of building the tree.
+        """
+        for game_pgn in games:
+            self._walk(game_pgn)
 
-                self.tree.add_opening(opening, head=head, player_colour=colour)
-                head = opening
-            else:
-                empty_moves += 1
+    def _walk(self, game_pgn: str) -> "_GameWalk":
+        """Walks the game up to the end of its openings, submitting its positions to the engine"""
+        walk = _GameWalk(self)
+        try:
+            scan_game(game_pgn, walk)
+        except _EndOfOpenings:
+            pass
+        walk.end()
+        self.stats.update(
+            games=1, engine_calls=len(walk.keys) - walk.skipped, skipped=walk.skipped
+        )
+        return walk
 
-        self._update_next_move_scores(fens, scores, empty_moves, game_metadata)
+    @property
+    def skipped_per_game(self) -> float:
+        """Mean number of engine calls avoided per game walked, see `_GameWalk.visit_board`"""
+        return (
+            self.stats["skipped"] / self.stats["games"] if self.stats["games"] else 0.0
+        )
 
-    def _get_player_colour(self, game: Game) -> PlayerColour:
+    def _get_player_colour(self, headers: Headers) -> PlayerColour:
         """Gets the colour of the player in the game"""
-        return PlayerColour.W if game.headers["White"] == self.user else PlayerColour.B
+        return PlayerColour.W if headers["White"] == self.user else PlayerColour.B
+
+    def _position_key(self, board: Board) -> PositionKey:
+        """Returns the key of the position on the board, as used by the tree"""
+        if self.tree.position_key == "zobrist":
+            return zobrist_hash(board)
+        return self._fen_parser(board.fen())
 
     def _update_next_move_scores(
         self,
-        fens: list[str],
-        scores: list[float],
+        keys: list[PositionKey],
+        scores: list[Optional[float]],
         empty_moves: int,
         game_metadata: dict[str, datetime | float],
     ) -> None:
-        """Updates the `score_in_n_moves` attribute of the nodes in the tree using the move delay"""
+        """
+        Updates the `score_in_n_moves` attribute of the nodes in the tree using the move delay
+
+        Only the scores `MOVE_DELAY - 1` plies after a node are used, the others can be None.
+        """
         fillvalue = game_metadata["result"] if empty_moves <= self.MOVE_DELAY else -1.0
         assert isinstance(fillvalue, float), "The fillvalue should be a float"
 
-        for fen, score_in_n_moves in zip_longest(
-            fens, scores[self.MOVE_DELAY - 1 :], fillvalue=fillvalue
+        for key, score_in_n_moves in zip_longest(
+            keys, scores[self.MOVE_DELAY - 1 :], fillvalue=fillvalue
         ):
-            if fen in self.tree.nodes.keys():
-                assert isinstance(fen, str), "The FEN should be a string"
-                self.tree.nodes[fen].score_in_n_moves.append(score_in_n_moves)
+            if key in self.tree.nodes.keys():
+                self.tree.nodes[key].add_score_in_n_moves(score_in_n_moves)
 
     @staticmethod
     def _fen_parser(fen: str) -> str:
@@ -110,13 +119,6 @@ class GameProcessor:
         board, turn, castling, en_passant, _, _ = fen.split()
         return f"{board} {turn} {castling} {en_passant}"
 
-    @staticmethod
-    def _next_move(move_num: int, moves: list[ChildNode]) -> Optional[str]:
-        """Gets the following move on the board"""
-        if move_num < len(moves):
-            return moves[move_num].uci()
-        return None
-
     @staticmethod
     def _read_game(game_pgn: str) -> Game:
         """Reads a game from a string"""
@@ -125,11 +127,15 @@ class GameProcessor:
         return game
 
     def _game_metadata(self, game: Game) -> dict[str, datetime | float]:
+        """Extracts the metadata from the game, see `_headers_metadata`"""
+        return self._headers_metadata(game.headers)
+
+    def _headers_metadata(self, headers: Headers) -> dict[str, datetime | float]:
         """
-        Extracts the metadata from the game
+        Extracts the metadata from the headers of a game
 
         Args:
-            game (Game): the game to extract the metadata from
+            headers (Headers): the headers of the game to extract the metadata from
 
         Returns:
             dict[str, datetime | float]: the metadata in the format of:
@@ -139,8 +145,8 @@ class GameProcessor:
             }
         """
         return {
-            "result": self._extract_result(game.headers["Termination"]),
-            "date": datetime.strptime(game.headers["Date"], "%Y.%m.%d"),
+            "result": self._extract_result(headers["Termination"]),
+            "date": datetime.strptime(headers["Date"], "%Y.%m.%d"),
         }
 
     def _extract_result(self, termination: str) -> float:
@@ -151,3 +157,125 @@ class GameProcessor:
             return 0.5
         else:
             return 0.0
+
+
+class _EndOfOpenings(Exception):
+    """Raised by `_GameWalk` to stop parsing a game once it is past the openings"""
+
+
+class _GameWalk(BaseVisitor[None]):
+    """
+    Visitor walking the mainline of a single game for the `GameProcessor`, as the game is scanned
+
+    The positions are read off the scanner's own board, so no game tree is built. The positions whose
+    evaluation is used are submitted to the engine as they are reached, and the openings are only added
+    to the tree by `finish`, once their following move is known and the evaluations are in.
+    """
+
+    def __init__(self, processor: GameProcessor):
+        self.processor = processor
+        self.headers = Headers()
+        self.empty_moves = 0
+        self.keys: list[PositionKey] = []
+        # whether the position of each ply is a node of the tree
+        self.nodes: list[bool] = []
+        self.evaluations: list[Optional[Future[Evaluation]]] = []
+        self.skipped = 0
+        self.pending: Optional[tuple[Opening, Future[Evaluation]]] = None
+        self.openings: list[tuple[Opening, Future[Evaluation], Optional[str]]] = []
+        self.game_metadata: Optional[dict[str, datetime | float]] = None
+
+    def begin_headers(self) -> Headers:
+        return self.headers
+
+    def visit_header(self, tagname: str, tagvalue: str) -> None:
+        self.headers[tagname] = tagvalue
+
+    def end_headers(self) -> Optional[SkipType]:
+        if self.headers.get("Variant", None) in self.processor.FORBIDDEN_VARIANTS:
+            return SKIP
+        self.colour = self.processor._get_player_colour(self.headers)
+        self.game_metadata = self.processor._headers_metadata(self.headers)
+
+    def begin_variation(self) -> SkipType:
+        return SKIP
+
+    def handle_error(self, error: Exception) -> None:
+        logger.warning(f"Stopped reading game at an illegal move: {error}")
+        raise _EndOfOpenings from error
+
+    def visit_move(self, board: Board, move: Move) -> None:
+        self._close_pending(following_move=move.uci())
+        if self.empty_moves > self.processor.MOVE_DELAY:
+            raise _EndOfOpenings
+
+    def visit_board(self, board: Board) -> None:
+        if len(board.move_stack) <= len(self.keys):
+            return  # the starting position
+
+        key = self.processor._position_key(board)
+        self.keys.append(key)
+
+        openings_data = self.processor.eco_db.lookup(key)
+        self.nodes.append(bool(openings_data) or key == self.processor.tree.root_key)
+
+        # the evaluation of a ply is only used if it's a node (for its own score and best move), or
+        # if it's `MOVE_DELAY - 1` plies after one (for the node's `score_in_n_moves`)
+        delay = self.processor.MOVE_DELAY - 1
+        ply = len(self.keys) - 1
+        if self.nodes[ply] or (ply >= delay and self.nodes[ply - delay]):
+            evaluation = self.processor.engine.submit(board, key)
+        else:
+            evaluation = None
+            self.skipped += 1
+        self.evaluations.append(evaluation)
+
+        if openings_data:
+            self.empty_moves = 0
+            opening = Opening.unvalidated(
+                **openings_data, zobrist=key if isinstance(key, int) else None
+            )
+            self.pending = (opening, evaluation)  # type: ignore
+        else:
+            self.empty_moves += 1
+
+    def _close_pending(self, following_move: Optional[str]) -> None:
+        """Records the following move of the opening waiting for it"""
+        if self.pending is not None:
+            self.openings.append((*self.pending, following_move))
+            self.pending = None
+
+    def end(self) -> None:
+        """Ends the walk, the last opening being the last position of the game if it's pending"""
+        self._close_pending(following_move=None)
+
+    def finish(self) -> None:
+        """Adds the openings, and the scores `MOVE_DELAY` moves later, to the tree"""
+        if self.game_metadata is None:
+            return  # skipped game
+
+        head = self.processor.tree.root
+        for opening, evaluation, following_move in self.openings:
+            opening.update_opening(
+                **self.game_metadata,  #  type: ignore
+                colour=self.colour,
+                following_move=following_move,
+                **evaluation.result().for_colour(self.colour),  #  type: ignore
+            )
+            self.processor.tree.add_opening(
+                opening, head=head, player_colour=self.colour
+            )
+            head = opening
+
+        scores = [
+            evaluation.result().probability(self.colour)
+            if evaluation is not None
+            else None
+            for evaluation in self.evaluations
+        ]
+        self.processor._update_next_move_scores(
+            self.keys, scores, self.empty_moves, self.game_metadata
+        )
+
+    def result(self) -> None:
+        pass
@@ -1,36 +1,111 @@
+from functools import cached_property
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from chess_opening_analyser.openings import PositionKey, fen_to_key
+from chess_opening_analyser.opening_directory.binary import BinaryIndex
+
 import pandas as pd
 
 
 class EcoDB:
     """Database of eco openings"""
 
-    def __init__(self, db_path: str):
-        self.openings = pd.read_json(db_path)
+    _MISS: Mapping[str, Any] = MappingProxyType({})
+
+    def __init__(self, db_path: str | Path):
+        """
+        Loads the DB from the JSON source, or memory-maps it if `db_path` is a compiled index
+
+        Args:
+            db_path (str | Path): path to the JSON DB, or to its `.bin` index built by `compile`
+        """
+        if Path(db_path).suffix == ".bin":
+            self.index: Mapping[str, Mapping[str, Any]] = BinaryIndex(db_path)
+        else:
+            self.index = self._build_index(pd.read_json(db_path))
+
+    @classmethod
+    def compile(cls, db_path: str | Path, index_path: str | Path) -> None:
+        """Compiles the JSON DB into the binary index that can be memory-mapped by the workers"""
+        BinaryIndex.compile(cls._build_index(pd.read_json(db_path)), index_path)
 
-    def lookup(self, fen: str) -> dict:
+    @classmethod
+    def compiled(cls, db_path: str | Path) -> Path:
+        """Returns the path of the binary index next to the JSON DB, (re)compiling it if stale"""
+        index_path = Path(db_path).with_suffix(".bin")
+        if (
+            not index_path.exists()
+            or index_path.stat().st_mtime < Path(db_path).stat().st_mtime
+        ):
+            cls.compile(db_path, index_path)
+        return index_path
+
+    @staticmethod
+    def _normalise_fen(fen: str) -> str:
+        """Drops the halfmove clock and fullmove number from the FEN, if present"""
+        return " ".join(fen.split()[:4])
+
+    @classmethod
+    def _build_index(cls, openings: pd.DataFrame) -> dict[str, Mapping[str, Any]]:
         """
-        Looks up the fen in the database, and returns the ECO, name, moves and number of moves
+        Builds the lookup index from normalised FEN to the pre-materialised row
+
+        The first row wins when a FEN occurs multiple times, matching the order of the DB.
+        """
+        index = {}
+        for i, eco, name, fen, moves in zip(
+            openings.index.tolist(),
+            openings["eco"],
+            openings["name"],
+            openings["fen"],
+            openings["moves"],
+        ):
+            key = cls._normalise_fen(fen)
+            if key in index:
+                continue
+            index[key] = MappingProxyType(
+                {
+                    "eco": eco,
+                    "name": name,
+                    "fen": key,
+                    "moves": moves,
+                    "num_moves": len(moves.split(" ")),
+                    "index": i,  # index from the DB, for uniqueness later in the UI
+                }
+            )
+        return index
+
+    @cached_property
+    def zobrist_index(self) -> dict[int, Mapping[str, Any]]:
+        """Index of the JSON DB by the Zobrist key of the positions, built on first use"""
+        return {fen_to_key(fen, "zobrist"): row for fen, row in self.index.items()}  # type: ignore
+
+    def lookup(self, key: PositionKey) -> Mapping[str, Any]:
+        """
+        Looks up the position in the database, and returns the ECO, name, moves and number of moves
+
+        The returned mapping is shared between lookups and read-only; a miss returns a shared
+        empty mapping.
 
         Args:
-            fen (str): fen encoding of the board
+            key (PositionKey): normalised fen encoding of the board (without the move counters),
+                or the Zobrist key of the position
 
         Returns:
-            row (dict): in the format of:
+            row (Mapping): in the format of:
             {
                 "eco": str,
                 "name": str,
                 "fen": str,
                 "moves": str,
                 "num_moves": int,
+                "index": int,
             }
         """
-        rows = self.openings[self.openings.fen == fen]
-        if rows.shape[0] > 0:
-            row = rows.to_dict(orient="records")[0]
-            row["num_moves"] = len(row.get("moves", "").split(" "))
-            row["index"] = rows.index.tolist()[
-                0
-            ]  # index from the DB, for uniqueness later in the UI
-            return row
-        else:
-            return {}
+        if isinstance(key, str):
+            return self.index.get(key, self._MISS)
+        if isinstance(self.index, BinaryIndex):
+            return self.index.get_zobrist(key, self._MISS)
+        return self.zobrist_index.get(key, self._MISS)
@@ -0,0 +1,161 @@
+from bisect import bisect_left
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, Optional
+
+from chess_opening_analyser.openings import fen_to_key
+
+import hashlib
+import mmap
+import os
+import struct
+
+
+class BinaryIndex(Mapping[str, Mapping[str, Any]]):
+    """
+    Read-only, memory-mapped index of the ECO DB compiled by `BinaryIndex.compile`
+
+    The file is laid out as (all little-endian):
+        - header: magic, version and number of records
+        - keys: the sorted 64-bit hashes of the normalised FENs
+        - records: per key, the DB index, number of moves, and the offset and length of its strings
+        - zobrist keys: the sorted 64-bit Zobrist hashes of the positions
+        - zobrist records: per Zobrist key, the position of its record
+        - string table: the `eco`, `name`, `fen` and `moves` of each record, separated by `SEPARATOR`
+
+    The pages are mapped read-only, so worker processes share them through the page cache instead
+    of each parsing the JSON DB. Only records that are hit get decoded, and they are kept for reuse.
+    """
+
+    MAGIC = b"ECOD"
+    VERSION = 2
+    HEADER = struct.Struct("<4sHI")
+    KEY = struct.Struct("<Q")
+    RECORD = struct.Struct("<iHII")
+    POSITION = struct.Struct("<I")
+    SEPARATOR = "\x1f"
+
+    def __init__(self, path: str | Path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{path} is not a version {self.VERSION} ECO DB index")
+
+        keys_start = self.HEADER.size
+        records_start = keys_start + count * self.KEY.size
+        zobrist_start = records_start + count * self.RECORD.size
+        positions_start = zobrist_start + count * self.KEY.size
+        self._strings_start = positions_start + count * self.POSITION.size
+
+        view = memoryview(self._mmap)
+        self._keys = view[keys_start:records_start].cast("Q")
+        self._zobrist_keys = view[zobrist_start:positions_start].cast("Q")
+        self._zobrist_positions = view[positions_start : self._strings_start].cast("I")
+        self._records_start = records_start
+        self._decoded: dict[int, Mapping[str, Any]] = {}
+
+    @staticmethod
+    def hash_fen(fen: str) -> int:
+        """Stable 64-bit hash of the FEN, independent of the interpreter's hash seed"""
+        return int.from_bytes(
+            hashlib.blake2b(fen.encode(), digest_size=8).digest(), "little"
+        )
+
+    @classmethod
+    def compile(cls, index: Mapping[str, Mapping[str, Any]], path: str | Path) -> None:
+        """Writes the index of normalised FEN to record into the binary format at `path`"""
+        entries = sorted(
+            ((cls.hash_fen(fen), record) for fen, record in index.items()),
+            key=lambda entry: entry[0],
+        )
+        keys = [key for key, _ in entries]
+        assert len(set(keys)) == len(keys), "FEN hashes should be unique"
+
+        zobrist = sorted(
+            (fen_to_key(record["fen"], "zobrist"), i)
+            for i, (_, record) in enumerate(entries)
+        )
+        assert len(set(z for z, _ in zobrist)) == len(
+            zobrist
+        ), "Zobrist keys should be unique"
+
+        strings = bytearray()
+        records = bytearray()
+        for _, record in entries:
+            encoded = cls.SEPARATOR.join(
+                [record["eco"], record["name"], record["fen"], record["moves"]]
+            ).encode()
+            records += cls.RECORD.pack(
+                record["index"], record["num_moves"], len(strings), len(encoded)
+            )
+            strings += encoded
+
+        # written next to the path and then moved in its place, so that a reader (or a crash) never
+        # sees a truncated index, the temporary file being per process for concurrent compilations
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(entries)))
+            f.write(b"".join(cls.KEY.pack(key) for key in keys))
+            f.write(records)
+            f.write(b"".join(cls.KEY.pack(key) for key, _ in zobrist))
+            f.write(b"".join(cls.POSITION.pack(i) for _, i in zobrist))
+            f.write(strings)
+        os.replace(temporary_path, path)
+
+    def _position(self, fen: str) -> Optional[int]:
+        """Position of the FEN's record in the index, or None if it isn't in the DB"""
+        key = self.hash_fen(fen)
+        i = bisect_left(self._keys, key)  # type: ignore
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return None
+
+    def get_zobrist(self, key: int, default: Any = None) -> Any:
+        """Looks up the record by the Zobrist key of its position"""
+        i = bisect_left(self._zobrist_keys, key)  # type: ignore
+        if i < len(self._zobrist_keys) and self._zobrist_keys[i] == key:
+            return self._decode(self._zobrist_positions[i])
+        return default
+
+    def _decode(self, i: int) -> Mapping[str, Any]:
+        """Decodes the i-th record from the mapped file"""
+        if i not in self._decoded:
+            index, num_moves, offset, length = self.RECORD.unpack_from(
+                self._mmap, self._records_start + i * self.RECORD.size
+            )
+            start = self._strings_start + offset
+            eco, name, fen, moves = (
+                self._mmap[start : start + length].decode().split(self.SEPARATOR)
+            )
+            self._decoded[i] = MappingProxyType(
+                {
+                    "eco": eco,
+                    "name": name,
+                    "fen": fen,
+                    "moves": moves,
+                    "num_moves": num_moves,
+                    "index": index,
+                }
+            )
+        return self._decoded[i]
+
+    def get(self, fen: str, default: Any = None) -> Any:
+        i = self._position(fen)
+        if i is None:
+            return default
+        record = self._decode(i)
+        return record if record["fen"] == fen else default
+
+    def __getitem__(self, fen: str) -> Mapping[str, Any]:
+        record = self.get(fen)
+        if record is None:
+            raise KeyError(fen)
+        return record
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._decode(i)["fen"] for i in range(len(self)))
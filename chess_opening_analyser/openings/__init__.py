@@ -0,0 +1,20 @@
+from typing import Literal
+
+from chess import Board
+from chess.polyglot import zobrist_hash
+
+PositionKey = str | int
+KeyMode = Literal["fen", "zobrist"]
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+
+
+def fen_to_key(fen: str, mode: KeyMode) -> PositionKey:
+    """
+    Returns the key of the position in the given FEN
+
+    The key is either the FEN itself, or the 64-bit polyglot Zobrist hash of the position.
+    """
+    if mode == "zobrist":
+        return zobrist_hash(Board(fen))
+    return fen
@@ -0,0 +1,283 @@
+from collections import Counter, deque
+from datetime import date, datetime
+from typing import Any, Optional
+
+import copy
+import numpy as np
+
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.occurrences import (
+    COLOURS,
+    ColourOccurrences,
+    Occurrences,
+    decode_move,
+    encode_move,
+)
+
+# columns of the running sums, per colour
+COUNT, RESULTS, SCORES, SCORE_IN_N_MOVES, SCORE_IN_N_MOVES_COUNT = range(5)
+
+
+class Aggregates:
+    """
+    Running aggregates of the occurrences of an opening, kept in place of the occurrences
+
+    Per colour, and per following move within a colour, the number of occurrences and the sums of
+    the results, following game scores and scores in n moves are kept, with the number of games per
+    day for the timeline. Merging adds up the sums, so the size of a node doesn't grow with the
+    number of games, and the means are O(1).
+
+    The raw results and scores aren't kept, so their columns are empty; the colours, dates (at day
+    resolution) and following moves are reconstructed from the counts, in no particular order.
+    """
+
+    def __init__(self):
+        self._colours = tuple(range(len(COLOURS)))
+        self._totals = np.zeros((len(COLOURS), 5))
+        self._moves: dict[int, np.ndarray] = {}
+        self._days: list[Counter[int]] = [Counter() for _ in COLOURS]
+        # (colour, move) of the occurrences waiting for their score in n moves
+        self._pending: deque[tuple[int, int]] = deque()
+
+    @classmethod
+    def of(
+        cls, occurrences: "Occurrences | ColourOccurrences | Aggregates"
+    ) -> "Aggregates":
+        """Aggregates the occurrences"""
+        aggregates = cls()
+        aggregates.extend(occurrences)
+        return aggregates
+
+    def _sums(self, colour: int, move: int) -> list[np.ndarray]:
+        """The rows of sums an occurrence adds to: the totals and the move's, for the colour"""
+        moves = self._moves.setdefault(move, np.zeros((len(COLOURS), 5)))
+        return [self._totals[colour], moves[colour]]
+
+    def _add(
+        self,
+        colour: int,
+        day: int,
+        result: float,
+        move: int,
+        score: float,
+        score_in_n_moves: Optional[float] = None,
+    ) -> None:
+        for sums in self._sums(colour, move):
+            sums[COUNT] += 1
+            sums[RESULTS] += result
+            sums[SCORES] += score
+            if score_in_n_moves is not None:
+                sums[SCORE_IN_N_MOVES] += score_in_n_moves
+                sums[SCORE_IN_N_MOVES_COUNT] += 1
+        self._days[colour][day] += 1
+        if score_in_n_moves is None:
+            self._pending.append((colour, move))
+
+    def __len__(self) -> int:
+        return int(self._totals[self._colours, COUNT].sum())
+
+    def append(
+        self,
+        colour: PlayerColour,
+        date: datetime,
+        result: float,
+        following_move: Optional[str],
+        score: float,
+    ) -> None:
+        """Adds an occurrence"""
+        self._add(
+            COLOURS.index(colour),
+            date.toordinal(),
+            result,
+            encode_move(following_move),
+            score,
+        )
+
+    def append_score_in_n_moves(self, score: float) -> None:
+        """Adds the score in n moves of the earliest occurrence still waiting for it"""
+        if not self._pending:
+            return  # e.g. the root, which has no occurrences of its own
+        colour, move = self._pending.popleft()
+        for sums in self._sums(colour, move):
+            sums[SCORE_IN_N_MOVES] += score
+            sums[SCORE_IN_N_MOVES_COUNT] += 1
+
+    def extend(self, other: "Occurrences | ColourOccurrences | Aggregates") -> None:
+        """Adds the other occurrences, aggregating them if raw, or the sums of their colours"""
+        if isinstance(other, Aggregates):
+            colours = list(other._colours)
+            self._totals[colours] += other._totals[colours]
+            for move, sums in other._moves.items():
+                self._moves.setdefault(move, np.zeros((len(COLOURS), 5)))
+                self._moves[move][colours] += sums[colours]
+            for colour in colours:
+                self._days[colour].update(other._days[colour])
+            self._pending.extend(p for p in other._pending if p[0] in colours)
+            return
+
+        # the scores in n moves have been recorded for a prefix of the rows
+        score_in_n_moves = other.score_in_n_moves.tolist()
+        score_in_n_moves += [None] * (len(other) - len(score_in_n_moves))
+        for colour, day, result, move, score, score_in_n in zip(
+            other.colour.tolist(),
+            other.dates.astype("datetime64[D]").tolist(),
+            other.results.tolist(),
+            other.move_codes.tolist(),
+            other.following_game_scores.tolist(),
+            score_in_n_moves,
+        ):
+            self._add(colour, day.toordinal(), result, move, score, score_in_n)
+
+    def copy(self) -> "Aggregates":
+        """Aggregates with copies of the sums of these ones, only of its colours for a partition"""
+        return Aggregates.of(self)
+
+    @property
+    def is_partition(self) -> bool:
+        """Whether these are a view of the sums of other aggregates, see `partition`"""
+        return len(self._colours) < len(COLOURS)
+
+    def partition(self, colour: PlayerColour) -> "Aggregates":
+        """View of the aggregates of the colour, sharing the sums of these aggregates"""
+        partition = copy.copy(self)
+        partition._colours = (COLOURS.index(colour),)
+        return partition
+
+    def _counts(self, sums: np.ndarray) -> np.ndarray:
+        return sums[self._colours, COUNT].astype(np.int64)
+
+    @property
+    def colour(self) -> np.ndarray:
+        return np.repeat(
+            np.array(self._colours, dtype=np.int8), self._counts(self._totals)
+        )
+
+    @property
+    def dates(self) -> np.ndarray:
+        days = Counter()
+        for colour in self._colours:
+            days.update(self._days[colour])
+        ordered = sorted(days)
+        return np.repeat(
+            np.array([date.fromordinal(d) for d in ordered], dtype="datetime64[us]"),
+            [days[d] for d in ordered],
+        )
+
+    @property
+    def results(self) -> np.ndarray:
+        return np.empty(0, dtype=np.float32)
+
+    @property
+    def following_game_scores(self) -> np.ndarray:
+        return np.empty(0)
+
+    @property
+    def score_in_n_moves(self) -> np.ndarray:
+        return np.empty(0)
+
+    @property
+    def move_codes(self) -> np.ndarray:
+        return np.repeat(
+            np.array(list(self._moves), dtype=np.int16),
+            [self._counts(sums).sum() for sums in self._moves.values()],
+        )
+
+    @property
+    def following_moves(self) -> list[Optional[str]]:
+        return [decode_move(code) for code in self.move_codes.tolist()]
+
+    @property
+    def occurrence(self) -> int:
+        return len(self)
+
+    def _mean(self, sums: np.ndarray, column: int, count: int = COUNT) -> float:
+        total, n = sums[self._colours, column].sum(), sums[self._colours, count].sum()
+        return float(total / n) if n else np.nan
+
+    @property
+    def mean_results(self) -> float:
+        return self._mean(self._totals, RESULTS)
+
+    @property
+    def mean_following_game_scores(self) -> float:
+        return self._mean(self._totals, SCORES)
+
+    @property
+    def mean_score_in_n_moves(self) -> float:
+        return self._mean(self._totals, SCORE_IN_N_MOVES, SCORE_IN_N_MOVES_COUNT)
+
+    def by_move(self) -> dict[str, dict[str, float]]:
+        """Aggregates per following move, see `Statistics.by_move`"""
+        return {
+            decode_move(move): {  # type: ignore
+                "results": self._mean(sums, RESULTS),
+                "score_in_n_moves": self._mean(
+                    sums, SCORE_IN_N_MOVES, SCORE_IN_N_MOVES_COUNT
+                ),
+                "following_game_scores": self._mean(sums, SCORES),
+                "occurrence": int(self._counts(sums).sum()),
+            }
+            for move, sums in self._moves.items()
+            if decode_move(move) is not None and self._counts(sums).sum()
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """The aggregates in a JSON serialisable format, see `from_dict`"""
+        return {
+            "totals": self._totals.tolist(),
+            "moves": {str(move): sums.tolist() for move, sums in self._moves.items()},
+            "days": [{str(day): n for day, n in days.items()} for days in self._days],
+            "pending": list(self._pending),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Aggregates":
+        aggregates = cls()
+        aggregates._totals = np.array(data["totals"], dtype=np.float64)
+        aggregates._moves = {
+            int(move): np.array(sums, dtype=np.float64)
+            for move, sums in data["moves"].items()
+        }
+        aggregates._days = [
+            Counter({int(day): n for day, n in days.items()}) for days in data["days"]
+        ]
+        aggregates._pending = deque(tuple(p) for p in data["pending"])
+        return aggregates
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """The aggregates as arrays, for the columnar snapshots of the tree, see `from_arrays`"""
+        days = [
+            (c, day, n)
+            for c, counts in enumerate(self._days)
+            for day, n in counts.items()
+        ]
+        return {
+            "colours": np.isin(np.arange(len(COLOURS)), self._colours),
+            "totals": self._totals,
+            "move_codes": np.array(list(self._moves), dtype=np.int16),
+            "move_sums": np.array(list(self._moves.values())).reshape(
+                -1, len(COLOURS), 5
+            ),
+            "day_colours": np.array([c for c, _, _ in days], dtype=np.int8),
+            "day_ordinals": np.array([day for _, day, _ in days], dtype=np.int32),
+            "day_counts": np.array([n for _, _, n in days], dtype=np.int64),
+            "pending": np.array(list(self._pending), dtype=np.int16).reshape(-1, 2),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> "Aggregates":
+        aggregates = cls()
+        aggregates._colours = tuple(np.flatnonzero(arrays["colours"]).tolist())
+        aggregates._totals = np.array(arrays["totals"], dtype=np.float64)
+        aggregates._moves = {
+            move: np.array(sums, dtype=np.float64)
+            for move, sums in zip(arrays["move_codes"].tolist(), arrays["move_sums"])
+        }
+        for colour, day, n in zip(
+            arrays["day_colours"].tolist(),
+            arrays["day_ordinals"].tolist(),
+            arrays["day_counts"].tolist(),
+        ):
+            aggregates._days[colour][day] = n
+        aggregates._pending = deque(map(tuple, arrays["pending"].tolist()))
+        return aggregates
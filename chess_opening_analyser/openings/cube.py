@@ -0,0 +1,203 @@
+from pathlib import Path
+from typing import Literal
+
+from chess_opening_analyser.openings.occurrences import COLOURS
+from chess_opening_analyser.openings.transformers import Transformer
+from chess_opening_analyser.openings.tree import Tree
+
+import numpy as np
+import os
+import pandas as pd
+
+
+def _padded(values: np.ndarray, size: int) -> np.ndarray:
+    """The values as float64, padded with NaN to the size (e.g. the recorded scores in n moves)"""
+    padded = np.full(size, np.nan)
+    padded[: len(values)] = values
+    return padded
+
+
+class OpeningCube:
+    """
+    Precomputed aggregates of the openings of a tree, for the pages of the app
+
+    The cube has a row per opening (its name and index in the ECO DB), number of moves, colour and
+    period, with the number of occurrences and the means of the results and scores. The periods are
+    the weeks, months and years (by their `interval`, labelled by their last day as in
+    `pd.DataFrame.resample`), and all time (the `"all"` interval, with no period). Per period, the
+    means of an aggregated tree are NaN, as their sums aren't kept per day.
+
+    It's built once from the tree, with `of`, so that the views of `Transformer` are slices of it
+    instead of walks of the tree.
+    """
+
+    INTERVALS = ["W", "M", "Y"]
+    DIMENSIONS = ["name", "index", "move", "colour"]
+    MEASURES = [
+        "occurrence",
+        "mean_following_game_scores",
+        "mean_results",
+        "mean_score_in_n_moves",
+    ]
+    COLUMNS = ["interval", "period", *DIMENSIONS, *MEASURES]
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self._intervals = {
+            interval: frame.reset_index(drop=True)
+            for interval, frame in data.groupby("interval", sort=False)
+        }
+
+    @classmethod
+    def of(cls, tree: Tree) -> "OpeningCube":
+        """Builds the cube of the tree"""
+        totals, partitions = [], []
+        for node in tree.nodes.values():
+            for c in COLOURS:
+                occurrences = node.occurrences.partition(c)
+                if not len(occurrences):
+                    continue
+                dimensions = (node.name, node.index, node.num_moves, c.value)
+                totals.append(
+                    (
+                        "all",
+                        pd.NaT,
+                        *dimensions,
+                        len(occurrences),
+                        occurrences.mean_following_game_scores,
+                        occurrences.mean_results,
+                        occurrences.mean_score_in_n_moves,
+                    )
+                )
+                partitions.append((dimensions, occurrences))
+
+        lengths = [len(occurrences) for _, occurrences in partitions]
+        games = pd.DataFrame(
+            {
+                **{
+                    dimension: np.repeat(
+                        [dimensions[i] for dimensions, _ in partitions], lengths
+                    )
+                    for i, dimension in enumerate(cls.DIMENSIONS)
+                },
+                **{
+                    attribute: np.concatenate(
+                        [
+                            _padded(getattr(occurrences, attribute), len(occurrences))
+                            for _, occurrences in partitions
+                        ]
+                        or [np.empty(0)]
+                    )
+                    for attribute in [
+                        "following_game_scores",
+                        "results",
+                        "score_in_n_moves",
+                    ]
+                },
+                "dates": pd.to_datetime(
+                    np.concatenate(
+                        [occurrences.dates for _, occurrences in partitions]
+                        or [np.empty(0, dtype="datetime64[us]")]
+                    )
+                ),
+            }
+        )
+
+        frames = [pd.DataFrame(totals, columns=cls.COLUMNS)]
+        for interval in cls.INTERVALS:
+            games["period"] = (
+                games["dates"].dt.to_period(interval).dt.end_time.dt.normalize()
+            )
+            frame = (
+                games.groupby(cls.DIMENSIONS + ["period"], sort=False)
+                .agg(
+                    occurrence=("dates", "size"),
+                    mean_following_game_scores=("following_game_scores", "mean"),
+                    mean_results=("results", "mean"),
+                    mean_score_in_n_moves=("score_in_n_moves", "mean"),
+                )
+                .reset_index()
+            )
+            frame["interval"] = interval
+            frames.append(frame[cls.COLUMNS])
+
+        return cls(cls._typed(pd.concat(frames, ignore_index=True)))
+
+    @classmethod
+    def _typed(cls, data: pd.DataFrame) -> pd.DataFrame:
+        return data.astype(
+            {
+                "interval": str,
+                "period": "datetime64[ns]",
+                "name": str,
+                "index": np.int64,
+                "move": np.int64,
+                "colour": str,
+                "occurrence": np.int64,
+                **{measure: np.float64 for measure in cls.MEASURES[1:]},
+            }
+        )
+
+    def opening_strength(self, unique_names: bool) -> pd.DataFrame:
+        """The strength of each opening over all time, see `Transformer.tree_to_opening_strength`"""
+        totals = self._intervals.get("all", self.data)
+        names = totals["name"]
+        if unique_names:
+            names = names + " [" + totals["index"].astype(str) + "]"
+        return totals[self.MEASURES].set_axis(
+            pd.MultiIndex.from_arrays(
+                [names, totals["move"], totals["colour"]],
+                names=Transformer.INDEX_NAMES,
+            )
+        )
+
+    def timeline(
+        self,
+        resample_interval: Literal["W", "M", "Y"] = "M",
+        occurrence_threshold: int = 0,
+    ) -> pd.DataFrame:
+        """The occurrences of the openings per period, see `Transformer.tree_to_timeline`"""
+        periods = self._intervals.get(resample_interval)
+        if periods is None:
+            return pd.DataFrame()
+
+        counts = periods.groupby(["name", "move", "colour", "period"])[
+            "occurrence"
+        ].sum()
+        timeline = counts.unstack("period", fill_value=0).astype(np.float64)
+
+        # as resampled per opening, the periods span from the first to the last of any opening
+        grid = pd.date_range(
+            periods["period"].min(), periods["period"].max(), freq=resample_interval
+        )
+        spans = counts.reset_index().groupby(["name", "move", "colour"])["period"]
+        span = np.zeros(len(grid) + 1, dtype=np.int64)
+        np.add.at(span, grid.searchsorted(spans.min()), 1)
+        np.add.at(span, grid.searchsorted(spans.max()) + 1, -1)
+        timeline = timeline.reindex(
+            columns=grid[np.cumsum(span[:-1]) > 0], fill_value=0.0
+        )
+        timeline.columns.name = "dates"
+
+        return timeline[timeline.max(axis=1) > occurrence_threshold]
+
+    def save(self, path: str | Path) -> None:
+        """Saves the cube as the arrays of its columns, next to `path` and then moved in its place"""
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                **{
+                    column: self.data[column].to_numpy(
+                        dtype=str if self.data[column].dtype == object else None
+                    )
+                    for column in self.COLUMNS
+                },
+            )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "OpeningCube":
+        with np.load(path, allow_pickle=False) as arrays:
+            data = pd.DataFrame({column: arrays[column] for column in cls.COLUMNS})
+        return cls(cls._typed(data))
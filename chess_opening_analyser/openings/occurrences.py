@@ -0,0 +1,380 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import numpy as np
+
+from chess import Move
+from chess_opening_analyser.games import PlayerColour
+
+COLOURS = [PlayerColour.W, PlayerColour.B]
+NO_MOVE = -1
+
+
+@lru_cache(maxsize=None)
+def encode_move(move: Optional[str]) -> int:
+    """Encodes the UCI move into a 16-bit code, `NO_MOVE` standing for None"""
+    if move is None:
+        return NO_MOVE
+    parsed = Move.from_uci(move)
+    return parsed.from_square | parsed.to_square << 6 | (parsed.promotion or 0) << 12
+
+
+@lru_cache(maxsize=None)
+def decode_move(code: int) -> Optional[str]:
+    """Decodes the move code from `encode_move` into the UCI move"""
+    if code == NO_MOVE:
+        return None
+    return Move(code & 63, code >> 6 & 63, promotion=code >> 12 or None).uci()
+
+
+class Column:
+    """Typed array with spare capacity, grown geometrically so that appends are amortised O(1)"""
+
+    def __init__(self, dtype, values: Optional[Iterable] = None):
+        self._data = (
+            np.empty(0, dtype=dtype)
+            if values is None
+            else np.array(values, dtype=dtype)
+        )
+        self._size = len(self._data)
+
+    @property
+    def values(self) -> np.ndarray:
+        """The values of the column, as a view of the underlying array"""
+        return self._data[: self._size]
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self._data):
+            data = np.empty(max(size, 2 * len(self._data)), dtype=self._data.dtype)
+            data[: self._size] = self.values
+            self._data = data
+
+    def append(self, value) -> None:
+        self._reserve(self._size + 1)
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        self._reserve(self._size + len(values))
+        self._data[self._size : self._size + len(values)] = values
+        self._size += len(values)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getstate__(self) -> dict:
+        return {"_data": self.values.copy(), "_size": self._size}
+
+    def copy(self) -> "Column":
+        return Column(self._data.dtype, self.values)
+
+
+def mean(values: np.ndarray) -> float:
+    """Mean of the values in double precision, NaN if there are none"""
+    return float(np.mean(values, dtype=np.float64)) if len(values) else np.nan
+
+
+class Statistics:
+    """Aggregates of the occurrences, computed from their columns"""
+
+    results: np.ndarray
+    following_game_scores: np.ndarray
+    score_in_n_moves: np.ndarray
+    move_codes: np.ndarray
+
+    @property
+    def mean_results(self) -> float:
+        return mean(self.results)
+
+    @property
+    def mean_following_game_scores(self) -> float:
+        return mean(self.following_game_scores)
+
+    @property
+    def mean_score_in_n_moves(self) -> float:
+        return mean(self.score_in_n_moves)
+
+    def by_move(self) -> dict[str, dict[str, float]]:
+        """
+        Aggregates of the occurrences per following move, the games that ended at the opening excluded
+
+        Returns:
+            dict[str, dict[str, float]]: in the format of:
+            {
+                move: {
+                    "results": float,
+                    "score_in_n_moves": float,
+                    "following_game_scores": float,
+                    "occurrence": int,
+                }
+            }
+        """
+        codes = self.move_codes
+        results, scores = self.results, self.following_game_scores
+        score_in_n_moves = self.score_in_n_moves
+        aligned_codes = codes[: len(score_in_n_moves)]
+        return {
+            decode_move(code): {  # type: ignore
+                "results": mean(results[codes == code]),
+                "score_in_n_moves": mean(score_in_n_moves[aligned_codes == code]),
+                "following_game_scores": mean(scores[codes == code]),
+                "occurrence": int(np.count_nonzero(codes == code)),
+            }
+            for code in np.unique(codes[codes != NO_MOVE]).tolist()
+        }
+
+
+class Occurrences(Statistics):
+    """
+    Columnar store of the games an opening occurred in, one row per occurrence
+
+    Each attribute of the occurrences is a typed NumPy column: the colour as int8 (the index in
+    `COLOURS`), the date as datetime64, the result as float32, the following move as an int16 code
+    (see `encode_move`), and the engine scores as float64. This keeps an occurrence to a few dozen
+    bytes instead of a boxed Python object per attribute, and lets aggregations work on masks.
+
+    `score_in_n_moves` is appended separately (once the game has been walked `MOVE_DELAY` plies
+    further), so it is kept as its own column, aligned with the rows it has been recorded for.
+
+    The rows of each colour are indexed as they are inserted, so that the occurrences of a colour
+    are available as a `ColourOccurrences` view in O(1), without copying the columns.
+    """
+
+    def __init__(
+        self,
+        colour: Iterable[PlayerColour] = (),
+        dates: Iterable[datetime] = (),
+        results: Iterable[float] = (),
+        following_moves: Iterable[Optional[str]] = (),
+        following_game_scores: Iterable[float] = (),
+        score_in_n_moves: Iterable[float] = (),
+    ):
+        self._colour = Column(np.int8, [COLOURS.index(c) for c in colour])
+        self._dates = Column("datetime64[us]", list(dates))
+        self._results = Column(np.float32, list(results))
+        self._following_moves = Column(
+            np.int16, [encode_move(m) for m in following_moves]
+        )
+        self._following_game_scores = Column(np.float64, list(following_game_scores))
+        self._score_in_n_moves = Column(np.float64, list(score_in_n_moves))
+        self._index_rows()
+        assert (
+            len(self._colour)
+            == len(self._dates)
+            == len(self._results)
+            == len(self._following_moves)
+            == len(self._following_game_scores)
+        ), "The occurrences should have a value for each attribute"
+
+    def _index_rows(self) -> None:
+        """Rebuilds the index of the rows of each colour"""
+        colour = self.colour
+        self._rows = [
+            Column(np.int32, np.flatnonzero(colour == i) if len(colour) else None)
+            for i in range(len(COLOURS))
+        ]
+
+    def __len__(self) -> int:
+        return len(self._colour)
+
+    @property
+    def colour(self) -> np.ndarray:
+        """Index of the colour in `COLOURS` per occurrence"""
+        return self._colour.values
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates.values
+
+    @property
+    def results(self) -> np.ndarray:
+        return self._results.values
+
+    @property
+    def move_codes(self) -> np.ndarray:
+        """Codes of the following moves, see `encode_move`"""
+        return self._following_moves.values
+
+    @property
+    def following_moves(self) -> list[Optional[str]]:
+        return [decode_move(code) for code in self.move_codes.tolist()]
+
+    @property
+    def following_game_scores(self) -> np.ndarray:
+        return self._following_game_scores.values
+
+    @property
+    def score_in_n_moves(self) -> np.ndarray:
+        return self._score_in_n_moves.values
+
+    @property
+    def occurrence(self) -> int:
+        return len(self)
+
+    def append(
+        self,
+        colour: PlayerColour,
+        date: datetime,
+        result: float,
+        following_move: Optional[str],
+        score: float,
+    ) -> None:
+        """Appends an occurrence"""
+        self._rows[COLOURS.index(colour)].append(len(self))
+        self._colour.append(COLOURS.index(colour))
+        self._dates.append(date)
+        self._results.append(result)
+        self._following_moves.append(encode_move(following_move))
+        self._following_game_scores.append(score)
+
+    def append_score_in_n_moves(self, score: float) -> None:
+        self._score_in_n_moves.append(score)
+
+    def extend(self, other: "Occurrences") -> None:
+        """Appends the occurrences of the other store"""
+        for i, rows in enumerate(self._rows):
+            rows.extend(np.flatnonzero(other.colour == i) + len(self))
+        self._colour.extend(other.colour)
+        self._dates.extend(other.dates)
+        self._results.extend(other.results)
+        self._following_moves.extend(other.move_codes)
+        self._following_game_scores.extend(other.following_game_scores)
+        self._score_in_n_moves.extend(other.score_in_n_moves)
+
+    def partition(self, colour: PlayerColour) -> "ColourOccurrences":
+        """View of the occurrences played with the colour, sharing the columns of this store"""
+        return ColourOccurrences(self, colour)
+
+    def copy(self) -> "Occurrences":
+        """A new store with copies of the columns of this one"""
+        copied = Occurrences()
+        copied._colour = self._colour.copy()
+        copied._dates = self._dates.copy()
+        copied._results = self._results.copy()
+        copied._following_moves = self._following_moves.copy()
+        copied._following_game_scores = self._following_game_scores.copy()
+        copied._score_in_n_moves = self._score_in_n_moves.copy()
+        copied._rows = [rows.copy() for rows in self._rows]
+        return copied
+
+    def colour_mask(self, colour: PlayerColour) -> np.ndarray:
+        """Boolean mask of the occurrences played with the colour"""
+        return self.colour == COLOURS.index(colour)
+
+    @classmethod
+    def from_columns(
+        cls,
+        colour: np.ndarray,
+        dates: np.ndarray,
+        results: np.ndarray,
+        move_codes: np.ndarray,
+        following_game_scores: np.ndarray,
+        score_in_n_moves: np.ndarray,
+    ) -> "Occurrences":
+        """A new store with copies of the columns, as read from the properties of a store"""
+        occurrences = cls.__new__(cls)
+        occurrences._colour = Column(np.int8, colour)
+        occurrences._dates = Column("datetime64[us]", dates)
+        occurrences._results = Column(np.float32, results)
+        occurrences._following_moves = Column(np.int16, move_codes)
+        occurrences._following_game_scores = Column(np.float64, following_game_scores)
+        occurrences._score_in_n_moves = Column(np.float64, score_in_n_moves)
+        occurrences._index_rows()
+        return occurrences
+
+    def select(self, mask: np.ndarray) -> "Occurrences":
+        """A new store with the occurrences selected by the boolean mask"""
+        scores = self.score_in_n_moves[: len(mask)]
+        return Occurrences.from_columns(
+            self.colour[mask],
+            self.dates[mask],
+            self.results[mask],
+            self.move_codes[mask],
+            self.following_game_scores[mask],
+            scores[mask[: len(scores)]],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the values held, in bytes"""
+        return sum(
+            column.values.nbytes
+            for column in [
+                self._colour,
+                self._dates,
+                self._results,
+                self._following_moves,
+                self._following_game_scores,
+                self._score_in_n_moves,
+            ]
+        )
+
+
+class ColourOccurrences(Statistics):
+    """
+    Read-only view of the occurrences of an `Occurrences` store played with one colour
+
+    The view only holds the store and the colour: the rows of the colour are looked up in the
+    store's index, and its attributes gathered from the shared columns, when they are read.
+    """
+
+    def __init__(self, occurrences: Occurrences, colour: PlayerColour):
+        self._occurrences = occurrences
+        self._colour = COLOURS.index(colour)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Indices of the rows of the colour in the store"""
+        return self._occurrences._rows[self._colour].values
+
+    def __len__(self) -> int:
+        return len(self._occurrences._rows[self._colour])
+
+    @property
+    def colour(self) -> np.ndarray:
+        return np.full(len(self), self._colour, dtype=np.int8)
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._occurrences.dates[self.rows]
+
+    @property
+    def results(self) -> np.ndarray:
+        return self._occurrences.results[self.rows]
+
+    @property
+    def move_codes(self) -> np.ndarray:
+        return self._occurrences.move_codes[self.rows]
+
+    @property
+    def following_moves(self) -> list[Optional[str]]:
+        return [decode_move(code) for code in self.move_codes.tolist()]
+
+    @property
+    def following_game_scores(self) -> np.ndarray:
+        return self._occurrences.following_game_scores[self.rows]
+
+    @property
+    def score_in_n_moves(self) -> np.ndarray:
+        scores = self._occurrences.score_in_n_moves
+        rows = self.rows
+        return scores[rows[rows < len(scores)]]
+
+    @property
+    def occurrence(self) -> int:
+        return len(self)
+
+    def partition(self, colour: PlayerColour) -> "ColourOccurrences":
+        if COLOURS.index(colour) == self._colour:
+            return self
+        return ColourOccurrences(Occurrences(), colour)
+
+    def colour_mask(self, colour: PlayerColour) -> np.ndarray:
+        return np.full(len(self), COLOURS.index(colour) == self._colour)
+
+    def copy(self) -> Occurrences:
+        """A new store with the occurrences of the view"""
+        return self._occurrences.select(
+            self._occurrences.colour_mask(COLOURS[self._colour])
+        )
@@ -1,26 +1,160 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Iterable, Optional
+from pydantic import BaseModel, PrivateAttr, computed_field
 from datetime import datetime
 
-import numpy as np
-
 from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.aggregates import Aggregates
+from chess_opening_analyser.openings.occurrences import (
+    COLOURS,
+    ColourOccurrences,
+    Occurrences,
+)
 
 
 class Opening(BaseModel):
+    """
+    Opening of the ECO DB, with the games it occurred in
+
+    The occurrences are held in a columnar `Occurrences` store. They are exposed as the lists of
+    their attributes (`colour`, `dates`, `results`, ...), which are materialised on access.
+
+    In an aggregated opening (see `aggregated`), only the running `Aggregates` of the occurrences
+    are kept, so the per-game results and scores are empty, and the means are read from the sums.
+    """
+
     fen: str
     eco: str
     name: str
     index: int
     num_moves: int
-    colour: list[PlayerColour] = []
-    dates: list[datetime] = []
-    results: list[float] = []
-    occurrence: int = 0
-    following_moves: list[Optional[str]] = []
-    following_game_scores: list[float] = []
-    score_in_n_moves: list[float] = []
     best_next_move: str = ""
+    zobrist: Optional[int] = None
+    _occurrences: Occurrences | ColourOccurrences | Aggregates = PrivateAttr()
+
+    def __init__(
+        self,
+        colour: Iterable[PlayerColour] = (),
+        dates: Iterable[datetime] = (),
+        results: Iterable[float] = (),
+        occurrence: Optional[int] = None,  # derived from the occurrences
+        following_moves: Iterable[Optional[str]] = (),
+        following_game_scores: Iterable[float] = (),
+        score_in_n_moves: Iterable[float] = (),
+        aggregates: Optional[dict[str, Any]] = None,
+        **data,
+    ):
+        super().__init__(**data)
+        if aggregates is not None:
+            self._occurrences = Aggregates.from_dict(aggregates)
+            return
+        self._occurrences = Occurrences(
+            colour,
+            dates,
+            results,
+            following_moves,
+            following_game_scores,
+            score_in_n_moves,
+        )
+
+    @classmethod
+    def unvalidated(
+        cls,
+        occurrences: Optional[Occurrences | ColourOccurrences | Aggregates] = None,
+        **fields,
+    ) -> "Opening":
+        """
+        Builds the opening from fields that are known to be valid, skipping the pydantic validation
+
+        This is the construction path of the hot loops, for the fields of the ECO DB, of a snapshot,
+        or of a dump. The fields aren't coerced, so they should already have the types of the model,
+        and the fields that aren't in the model (e.g. the `moves` of the ECO DB) are ignored.
+
+        It sets the same state as `model_construct`, which is slower than validating the few scalar
+        fields of an opening, as it handles the aliases and defaults of each field in Python.
+        """
+        values = {
+            name: fields[name] if name in fields else field.get_default()
+            for name, field in cls.model_fields.items()
+        }
+        opening = cls.__new__(cls)
+        object.__setattr__(opening, "__dict__", values)
+        object.__setattr__(opening, "__pydantic_fields_set__", values.keys() & fields)
+        object.__setattr__(opening, "__pydantic_extra__", None)
+        object.__setattr__(
+            opening,
+            "__pydantic_private__",
+            {"_occurrences": Occurrences() if occurrences is None else occurrences},
+        )
+        return opening
+
+    @classmethod
+    def from_dump(cls, data: dict[str, Any]) -> "Opening":
+        """
+        Loads the opening from its `model_dump`, or its JSON, without validating it
+
+        The dates can be ISO strings and the colours the values of `PlayerColour`, as they are parsed
+        by the columns of the occurrences.
+        """
+        if data.get("aggregates") is not None:
+            occurrences = Aggregates.from_dict(data["aggregates"])
+        else:
+            occurrences = Occurrences(
+                colour=data.get("colour", ()),
+                dates=data.get("dates", ()),
+                results=data.get("results", ()),
+                following_moves=data.get("following_moves", ()),
+                following_game_scores=data.get("following_game_scores", ()),
+                score_in_n_moves=data.get("score_in_n_moves", ()),
+            )
+        return cls.unvalidated(
+            occurrences, **{k: v for k, v in data.items() if k in cls.model_fields}
+        )
+
+    @property
+    def occurrences(self) -> Occurrences | ColourOccurrences | Aggregates:
+        return self._occurrences
+
+    @computed_field
+    @property
+    def aggregates(self) -> Optional[dict[str, Any]]:
+        if isinstance(self._occurrences, Aggregates):
+            return self._occurrences.to_dict()
+        return None
+
+    @computed_field
+    @property
+    def colour(self) -> tuple[PlayerColour, ...]:
+        return tuple(COLOURS[c] for c in self._occurrences.colour.tolist())
+
+    @computed_field
+    @property
+    def dates(self) -> tuple[datetime, ...]:
+        return tuple(self._occurrences.dates.tolist())
+
+    @computed_field
+    @property
+    def results(self) -> tuple[float, ...]:
+        return tuple(self._occurrences.results.tolist())
+
+    @computed_field
+    @property
+    def occurrence(self) -> int:
+        return len(self._occurrences)
+
+    @computed_field
+    @property
+    def following_moves(self) -> tuple[Optional[str], ...]:
+        return tuple(self._occurrences.following_moves)
+
+    @computed_field
+    @property
+    def following_game_scores(self) -> tuple[float, ...]:
+        return tuple(self._occurrences.following_game_scores.tolist())
+
+    @computed_field
+    @property
+    def score_in_n_moves(self) -> tuple[float, ...]:
+        return tuple(self._occurrences.score_in_n_moves.tolist())
 
     def __hash__(self):
         return hash(self.fen)
@@ -29,51 +163,75 @@ class Opening(BaseModel):
         return self.fen == other.fen
 
     def __repr__(self):
-        return f"{self.eco} ({self.name}, {np.average(self.following_game_scores):.2f}, {np.average(self.results):.2f})"
+        return f"{self.eco} ({self.name}, {self._occurrences.mean_following_game_scores:.2f}, {self._occurrences.mean_results:.2f})"
 
     def __str__(self):
         return self.__repr__()
 
     def __add__(self, other: Optional["Opening"]) -> "Opening":
+        """The sum of the openings, as a new opening which doesn't share the occurrences of either"""
+        opening = self.copy()
+        opening += other
+        return opening
+
+    def __radd__(self, other: Optional["Opening"]) -> "Opening":
+        """This allows None + Opening to use Opening's __add__"""
+        return self.__add__(other)
+
+    def __iadd__(self, other: Optional["Opening"]) -> "Opening":
+        """Adds the occurrences of the other opening to this one in place"""
         if other is None:
             return self
-        self.dates += other.dates
-        self.results += other.results
-        self.occurrence += other.occurrence
-        self.following_moves = self.following_moves + other.following_moves
-        self.following_game_scores += other.following_game_scores
-        self.colour += other.colour
-        self.score_in_n_moves += other.score_in_n_moves
+        if isinstance(other._occurrences, Aggregates) and not isinstance(
+            self._occurrences, Aggregates
+        ):
+            self._occurrences = Aggregates.of(self._occurrences)
+        self._writable_occurrences().extend(other._occurrences)
         # TODO Stockfish is non-deterministic when running on multiple cores
         # assert self.best_next_move == other.best_next_move, "The best next move should be the same for the same FEN"
         return self
 
-    def __radd__(self, other: Optional["Opening"]) -> "Opening":
-        """This allows None + Opening to use Opening's __add__"""
-        return self.__add__(other)
+    def _writable_occurrences(self) -> Occurrences | Aggregates:
+        """The occurrences to write to, copying those of a partition out of the store it shares"""
+        if isinstance(self._occurrences, ColourOccurrences) or (
+            isinstance(self._occurrences, Aggregates) and self._occurrences.is_partition
+        ):
+            self._occurrences = self._occurrences.copy()
+        return self._occurrences
+
+    def _with_occurrences(
+        self, occurrences: Occurrences | ColourOccurrences | Aggregates
+    ) -> "Opening":
+        """Shallow copy of the opening, holding the given occurrences in place of its own"""
+        opening = super().__copy__()
+        opening._occurrences = occurrences
+        return opening
+
+    def __copy__(self) -> "Opening":
+        """Copy of the opening with a copy of its occurrences, also used by `model_copy`"""
+        return self._with_occurrences(self._occurrences.copy())
+
+    def copy(self) -> "Opening":
+        """Copy of the opening with a copy of its occurrences"""
+        return self.__copy__()
 
     def partition_by_colour(self, colour: PlayerColour) -> Optional["Opening"]:
-        """Partitions the opening by colour"""
-        indices = [i for i, c in enumerate(self.colour) if c == colour]
+        """
+        Partitions the opening by colour
 
-        if not indices:
+        The partition is a view sharing the occurrences of this opening, so it's O(1). Its
+        occurrences are copied out of the shared store on their first write.
+        """
+        occurrences = self._occurrences.partition(colour)
+
+        if not len(occurrences):
             return None
 
-        return Opening(
-            fen=self.fen,
-            eco=self.eco,
-            name=self.name,
-            index=self.index,
-            num_moves=self.num_moves,
-            colour=[self.colour[i] for i in indices],
-            dates=[self.dates[i] for i in indices],
-            results=[self.results[i] for i in indices],
-            occurrence=len(indices),
-            following_moves=[self.following_moves[i] for i in indices],
-            following_game_scores=[self.following_game_scores[i] for i in indices],
-            score_in_n_moves=[self.score_in_n_moves[i] for i in indices],
-            best_next_move=self.best_next_move,
-        )
+        return self._with_occurrences(occurrences)
+
+    def aggregated(self) -> "Opening":
+        """Copy of the opening keeping the running aggregates of its occurrences in their place"""
+        return self._with_occurrences(Aggregates.of(self._occurrences))
 
     def update_opening(
         self,
@@ -84,10 +242,9 @@ class Opening(BaseModel):
         score: float,
         best_move: str,
     ):
-        self.following_moves.append(following_move)
-        self.colour.append(colour)
-        self.dates.append(date)
-        self.results.append(result)
-        self.occurrence += 1
-        self.following_game_scores.append(score)
+        self._writable_occurrences().append(colour, date, result, following_move, score)
         self.best_next_move = best_move
+
+    def add_score_in_n_moves(self, score: float) -> None:
+        """Records the score `MOVE_DELAY` moves after the opening, see `GameProcessor`"""
+        self._writable_occurrences().append_score_in_n_moves(score)
@@ -0,0 +1,363 @@
+from collections import Counter, defaultdict
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional
+
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings import KeyMode, PositionKey
+from chess_opening_analyser.openings.aggregates import Aggregates
+from chess_opening_analyser.openings.occurrences import COLOURS, Occurrences
+from chess_opening_analyser.openings.opening import Opening
+from chess_opening_analyser.openings.tree import Tree, initialiser
+
+import json
+import mmap
+import numpy as np
+import os
+import struct
+import zlib
+
+
+class TreeSnapshot:
+    """
+    Columnar binary snapshot of a `Tree`, written by `save` and read back by `load`
+
+    The file is laid out as (all little-endian):
+        - header: magic, version and the size of the table of contents
+        - table of contents: JSON of the position key, the aggregate mode, whether the arrays are
+          compressed, and the dtype, shape, offset and size of each array
+        - arrays: the raw bytes of each array (zlib compressed if `compress`), `ALIGNMENT` aligned
+
+    Per node, in the order of `Tree.nodes`, the scalar fields of the opening are arrays, the strings
+    (FENs, ECO codes, names and moves) being indices in a table of the unique strings. The
+    occurrences of all the nodes are concatenated into one array per column, the nodes' rows
+    delimited by an array of offsets (and likewise for the aggregates, and the children of the
+    edges). Loading is then a few reads of whole arrays, without parsing dates or validating lists.
+
+    The keys of the nodes come first in `keys`, followed by any key only found in the edges.
+    """
+
+    MAGIC = b"COAT"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHI")
+    ALIGNMENT = 64
+
+    # the arrays of variable length per node, by the name of their offsets, in each mode
+    GROUPS = {
+        False: {
+            "occurrence_offsets": [
+                "colour",
+                "dates",
+                "results",
+                "move_codes",
+                "following_game_scores",
+            ],
+            "score_offsets": ["score_in_n_moves"],
+        },
+        True: {
+            "move_offsets": ["move_codes", "move_sums"],
+            "day_offsets": ["day_colours", "day_ordinals", "day_counts"],
+            "pending_offsets": ["pending"],
+        },
+    }
+    # the arrays of fixed size per node of the aggregate mode
+    AGGREGATE_FIELDS = ["colours", "totals"]
+
+    def __init__(
+        self, position_key: KeyMode, aggregate: bool, arrays: dict[str, np.ndarray]
+    ):
+        self.position_key: KeyMode = position_key
+        self.aggregate = aggregate
+        self.arrays = arrays
+
+        blob = arrays["strings"].tobytes()
+        offsets = arrays["string_offsets"].tolist()
+        self.strings = [blob[a:b].decode() for a, b in zip(offsets, offsets[1:])]
+        if position_key == "zobrist":
+            self.keys: list[PositionKey] = arrays["keys"].tolist()
+        else:
+            self.keys = [self.strings[i] for i in arrays["keys"].tolist()]
+
+    def __len__(self) -> int:
+        """Number of nodes"""
+        return len(self.arrays["index"])
+
+    @staticmethod
+    def _offsets(lengths: Iterable[int]) -> np.ndarray:
+        return np.concatenate([[0], np.cumsum(list(lengths), dtype=np.int64)])
+
+    @classmethod
+    def of(cls, tree: Tree) -> "TreeSnapshot":
+        """Snapshot of the tree"""
+        openings = list(tree.nodes.values())
+        keys = list(
+            dict.fromkeys(
+                chain(
+                    tree.nodes,
+                    chain.from_iterable(
+                        chain([parent], *targets.values())
+                        for parent, targets in tree.edges.items()
+                    ),
+                )
+            )
+        )
+        positions = {key: i for i, key in enumerate(keys)}
+
+        strings: dict[str, int] = {}
+
+        def string_indices(values: Iterable[str]) -> np.ndarray:
+            return np.array(
+                [strings.setdefault(v, len(strings)) for v in values], dtype=np.int32
+            )
+
+        arrays = {
+            "keys": np.array(keys, dtype=np.uint64)
+            if tree.position_key == "zobrist"
+            else string_indices(keys),  # type: ignore
+            "index": np.array([o.index for o in openings], dtype=np.int32),
+            "num_moves": np.array([o.num_moves for o in openings], dtype=np.int32),
+            "zobrist": np.array([o.zobrist or 0 for o in openings], dtype=np.uint64),
+            "has_zobrist": np.array([o.zobrist is not None for o in openings]),
+        }
+        for field in ["fen", "eco", "name", "best_next_move"]:
+            arrays[field] = string_indices(getattr(o, field) for o in openings)
+
+        if tree.aggregate:
+            columns = [o.occurrences.to_arrays() for o in openings]  # type: ignore
+            for field in cls.AGGREGATE_FIELDS:
+                arrays[field] = np.stack([c[field] for c in columns])
+        else:
+            columns = [
+                {
+                    "colour": o.occurrences.colour,
+                    "dates": o.occurrences.dates,
+                    "results": o.occurrences.results,
+                    "move_codes": o.occurrences.move_codes,
+                    "following_game_scores": o.occurrences.following_game_scores,
+                    "score_in_n_moves": o.occurrences.score_in_n_moves,
+                }
+                for o in openings
+            ]
+        for offsets, fields in cls.GROUPS[tree.aggregate].items():
+            arrays[offsets] = cls._offsets(len(c[fields[0]]) for c in columns)
+            for field in fields:
+                arrays[field] = np.concatenate([c[field] for c in columns])
+
+        targets = [
+            (positions[parent], COLOURS.index(colour), children)
+            for parent, by_colour in tree.edges.items()
+            for colour, children in by_colour.items()
+        ]
+        arrays["edge_parents"] = np.array([p for p, _, _ in targets], dtype=np.int32)
+        arrays["edge_colours"] = np.array([c for _, c, _ in targets], dtype=np.int8)
+        arrays["edge_offsets"] = cls._offsets(len(t) for _, _, t in targets)
+        arrays["edge_children"] = np.array(
+            [positions[child] for _, _, t in targets for child in t], dtype=np.int32
+        )
+        arrays["edge_counts"] = np.array(
+            [n for _, _, t in targets for n in t.values()], dtype=np.int64
+        )
+
+        encoded = [s.encode() for s in strings]
+        arrays["strings"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        arrays["string_offsets"] = cls._offsets(len(s) for s in encoded)
+
+        return cls(tree.position_key, tree.aggregate, arrays)
+
+    def _node_arrays(self, i: int) -> dict[str, np.ndarray]:
+        """The arrays of the occurrences (or the aggregates) of the i-th node"""
+        node_arrays = {
+            field: self.arrays[field][i]
+            for field in (self.AGGREGATE_FIELDS if self.aggregate else [])
+        }
+        for offsets, fields in self.GROUPS[self.aggregate].items():
+            start, end = self.arrays[offsets][i : i + 2].tolist()
+            for field in fields:
+                node_arrays[field] = self.arrays[field][start:end]
+        return node_arrays
+
+    def opening(self, i: int) -> Opening:
+        """Materialises the opening of the i-th node, with copies of its arrays"""
+        arrays = self.arrays
+        node_arrays = self._node_arrays(i)
+        if self.aggregate:
+            occurrences = Aggregates.from_arrays(node_arrays)
+        else:
+            occurrences = Occurrences.from_columns(**node_arrays)
+        return Opening.unvalidated(
+            occurrences,
+            fen=self.strings[arrays["fen"][i]],
+            eco=self.strings[arrays["eco"][i]],
+            name=self.strings[arrays["name"][i]],
+            index=int(arrays["index"][i]),
+            num_moves=int(arrays["num_moves"][i]),
+            best_next_move=self.strings[arrays["best_next_move"][i]],
+            zobrist=int(arrays["zobrist"][i]) if arrays["has_zobrist"][i] else None,
+        )
+
+    def find(self, name: str, num_moves: int) -> Optional[int]:
+        """Position of the first node with the name and number of moves, read from their arrays"""
+        try:
+            name_id = self.strings.index(name)
+        except ValueError:
+            return None
+        matches = np.flatnonzero(
+            (self.arrays["name"] == name_id) & (self.arrays["num_moves"] == num_moves)
+        )
+        return int(matches[0]) if len(matches) else None
+
+    def edges(self) -> dict[PositionKey, dict[PlayerColour, Counter]]:
+        """The edges of the tree, in their order in the tree"""
+        edges: dict[PositionKey, dict[PlayerColour, Counter]] = defaultdict(initialiser)
+        children = [self.keys[c] for c in self.arrays["edge_children"].tolist()]
+        counts = self.arrays["edge_counts"].tolist()
+        offsets = self.arrays["edge_offsets"].tolist()
+        for parent, colour, start, end in zip(
+            self.arrays["edge_parents"].tolist(),
+            self.arrays["edge_colours"].tolist(),
+            offsets,
+            offsets[1:],
+        ):
+            edges[self.keys[parent]][COLOURS[colour]] = Counter(
+                dict(zip(children[start:end], counts[start:end]))
+            )
+        return edges
+
+    def to_tree(self) -> Tree:
+        """Materialises the whole tree"""
+        tree = Tree(self.position_key, self.aggregate)
+        tree.nodes = {self.keys[i]: self.opening(i) for i in range(len(self))}
+        tree.edges = self.edges()
+        return tree
+
+    def to_lazy_tree(self) -> Tree:
+        """
+        Read-only tree of the snapshot, whose openings are materialised as they are accessed
+
+        The nodes are a `LazyNodes` mapping, so the tree can't be added to, and the openings it
+        returns are shared by all its readers, so they shouldn't be mutated.
+        """
+        tree = Tree(self.position_key, self.aggregate)
+        tree.nodes = LazyNodes(self)  # type: ignore
+        tree.edges = self.edges()
+        return tree
+
+    @classmethod
+    def _aligned(cls, offset: int) -> int:
+        return -(-offset // cls.ALIGNMENT) * cls.ALIGNMENT
+
+    def save(self, path: str | Path, compress: bool = False) -> None:
+        """
+        Writes the snapshot to `path`, compressing each array with zlib if `compress`
+
+        The file is written next to `path` and then moved in its place, so a snapshot that is
+        memory-mapped from `path` is never truncated under its readers.
+        """
+        contents, blobs, offset = {}, [], 0
+        for name, array in self.arrays.items():
+            blob = np.ascontiguousarray(array).tobytes()
+            if compress:
+                blob = zlib.compress(blob)
+            offset = self._aligned(offset)
+            contents[name] = [array.dtype.str, list(array.shape), offset, len(blob)]
+            blobs.append((offset, blob))
+            offset += len(blob)
+
+        table = json.dumps(
+            {
+                "position_key": self.position_key,
+                "aggregate": self.aggregate,
+                "compressed": compress,
+                "arrays": contents,
+            }
+        ).encode()
+        data_start = self._aligned(self.HEADER.size + len(table))
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(table)))
+            f.write(table)
+            for offset, blob in blobs:
+                f.seek(data_start + offset)
+                f.write(blob)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TreeSnapshot":
+        """
+        Reads the snapshot at `path`
+
+        The file is memory-mapped read-only, and the arrays of an uncompressed snapshot are views of
+        the mapped pages, so they are only read from disk as they are accessed.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, table_size = cls.HEADER.unpack_from(buffer, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} tree snapshot")
+        table = json.loads(buffer[cls.HEADER.size : cls.HEADER.size + table_size])
+        data_start = cls._aligned(cls.HEADER.size + table_size)
+
+        arrays = {}
+        for name, (dtype, shape, offset, size) in table["arrays"].items():
+            start = data_start + offset
+            if not size:
+                array = np.empty(0, dtype=dtype)
+            elif table["compressed"]:
+                array = np.frombuffer(
+                    zlib.decompress(buffer[start : start + size]), dtype=dtype
+                )
+            else:
+                array = np.frombuffer(
+                    buffer,
+                    dtype=dtype,
+                    count=size // np.dtype(dtype).itemsize,
+                    offset=start,
+                )
+            arrays[name] = array.reshape(shape)
+
+        return cls(table["position_key"], table["aggregate"], arrays)
+
+
+class LazyNodes(Mapping[PositionKey, Opening]):
+    """
+    Read-only mapping of the keys of the nodes of a snapshot to their openings
+
+    An opening is materialised from the arrays of the snapshot the first time it's looked up, and
+    kept for the following lookups. The arrays of an uncompressed snapshot are views of its mapped
+    pages, so the nodes that are never looked up are never read, and the pages that are read are
+    shared through the page cache by all the processes mapping the snapshot.
+    """
+
+    def __init__(self, snapshot: TreeSnapshot):
+        self._snapshot = snapshot
+        self._positions = {
+            key: i for i, key in enumerate(snapshot.keys[: len(snapshot)])
+        }
+        self._openings: dict[int, Opening] = {}
+
+    def __getitem__(self, key: PositionKey) -> Opening:
+        i = self._positions[key]
+        if i not in self._openings:
+            self._openings[i] = self._snapshot.opening(i)
+        return self._openings[i]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._positions
+
+    def __iter__(self) -> Iterator[PositionKey]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def find(self, name: str, num_moves: int) -> Optional[PositionKey]:
+        """Key of the first node with the name and number of moves, without materialising any"""
+        i = self._snapshot.find(name, num_moves)
+        return None if i is None else self._snapshot.keys[i]
+
+    @property
+    def materialised(self) -> int:
+        """Number of openings materialised so far"""
+        return len(self._openings)
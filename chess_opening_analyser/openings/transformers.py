@@ -1,8 +1,7 @@
 from typing import Literal
 from functools import reduce
 
-import numpy as np
-from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.occurrences import COLOURS
 from chess_opening_analyser.openings.opening import Opening
 from chess_opening_analyser.openings.tree import Tree
 
@@ -19,16 +18,16 @@ class Transformer:
     @classmethod
     def tree_to_sankey(cls, tree: Tree, prune_below_count: int = 0) -> dict[str, dict]:
         """Transforms the tree into a dictionary format that facilitates the creation of a Sankey diagram"""
-        index_lookup = list(tree.nodes.keys())
+        index_lookup = {key: i for i, key in enumerate(tree.nodes)}
         labels = [
             op.name.split(":")[0]
-            for op in tree.nodes.values()
-            if op.fen != tree.root.fen
+            for key, op in tree.nodes.items()
+            if key != tree.root_key
         ]
         hovertext = [
             op.name.split(":")[-1]
-            for op in tree.nodes.values()
-            if op.fen != tree.root.fen
+            for key, op in tree.nodes.items()
+            if key != tree.root_key
         ]
 
         nodes = {
@@ -38,14 +37,14 @@ class Transformer:
 
         source, target, value = [], [], []
         for s, colour_counter in tree.edges.items():
-            if s == tree.root.fen:
+            if s == tree.root_key:
                 continue
             t_counter = reduce(lambda a, b: a + b, colour_counter.values())
             for t, v in t_counter.items():
                 if v < prune_below_count:
                     continue
-                source.append(index_lookup.index(s))
-                target.append(index_lookup.index(t))
+                source.append(index_lookup[s])
+                target.append(index_lookup[t])
                 value.append(v)
 
         links = {
@@ -98,14 +97,14 @@ class Transformer:
         - mean win rate
         - mean score in 5 moves
         """
-        score_columns = ["following_game_scores", "results", "score_in_n_moves"]
+        score_columns = [
+            "mean_following_game_scores",
+            "mean_results",
+            "mean_score_in_n_moves",
+        ]
 
+        # the means are aggregated per node, see `Statistics` and `Aggregates`
         df = cls._tree_to_df(tree, ["occurrence"] + score_columns, unique_names)
-
-        for col in score_columns:
-            df[f"mean_{col}"] = df[col].apply(np.mean)
-
-        df.drop(score_columns, axis=1, inplace=True)
         df.set_index("name", inplace=True)
         df.index = cls._create_multi_index(df)
 
@@ -133,10 +132,10 @@ class Transformer:
 
         rows = []
         for node in all_nodes:
-            for c in [PlayerColour.W, PlayerColour.B]:
-                c_opening = node.partition_by_colour(c)
+            for c in COLOURS:
+                c_occurrences = node.occurrences.partition(c)
 
-                if c_opening is None:
+                if not len(c_occurrences):
                     continue
 
                 # NOTE: index is pulled across to insure uniqueness at this stage
@@ -149,7 +148,7 @@ class Transformer:
                 rows.append(
                     (
                         f"{name}{cls.SEPARATOR}{node.num_moves}{cls.SEPARATOR}{c.value}",
-                        *(getattr(c_opening, a) for a in attributes),
+                        *(getattr(c_occurrences, a) for a in attributes),
                     )
                 )
 
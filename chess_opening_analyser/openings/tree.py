@@ -1,8 +1,15 @@
 from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings import (
+    KeyMode,
+    PositionKey,
+    STARTING_FEN,
+    fen_to_key,
+)
 from chess_opening_analyser.openings.opening import Opening
 from collections import defaultdict, Counter
 from itertools import chain
-from typing import Optional
+from types import MappingProxyType
+from typing import Callable, Collection, Iterable, Mapping, Optional
 from functools import reduce
 
 import json
@@ -24,90 +31,179 @@ class Tree:
     necessarily in the following move, but immediately in terms of openings. This means that the graph is
     __not__ a DAG, because cycles can occur.
 
+    Positions are keyed either by their FEN, or by their 64-bit Zobrist hash (`position_key="zobrist"`),
+    in which case the FEN is only kept as a display attribute on the `Opening`.
+
     Nodes:
-        - The nodes are dictionaries of the form `{fen: Opening}`
+        - The nodes are dictionaries of the form `{key: Opening}`
 
     Edges:
         - Edges is a dictionary of dictionaries of the form `{parent: {player_colour: {child: count}}`
         - The count is the number of times the child opening followed the parent opening
+        - `add_edge` is the only supported writer of the edges (besides assigning all of them): the
+          mapping is read-only, but its counters aren't, and writing to them directly bypasses the
+          reverse index below
+        - The reverse edges, `{child: {player_colour: parents}}`, are indexed for the parent lookups.
+          The index is kept in sync by `add_edge`, and rebuilt when `edges` is assigned.
+
+    With `aggregate=True`, the openings only keep the running aggregates of their occurrences (see
+    `Opening.aggregated`), so that the size of the tree doesn't grow with the number of games.
     """
 
-    def __init__(self):
-        self.nodes = {
-            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -": Opening(
-                fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -",
+    # the per-game attributes of the openings, which aren't kept in aggregate mode
+    OCCURRENCE_FIELDS = {
+        "colour",
+        "dates",
+        "results",
+        "following_moves",
+        "following_game_scores",
+        "score_in_n_moves",
+    }
+
+    def __init__(self, position_key: KeyMode = "fen", aggregate: bool = False):
+        self.position_key: KeyMode = position_key
+        self.aggregate = aggregate
+        self.root_key = fen_to_key(STARTING_FEN, position_key)
+        self.nodes: dict[PositionKey, Opening] = {
+            self.root_key: Opening.unvalidated(
+                fen=STARTING_FEN,
                 name="Root",
                 eco="ROOT",
                 num_moves=0,
                 index=-1,
+                zobrist=self.root_key if position_key == "zobrist" else None,  # type: ignore
             )
         }
-        self.edges: dict[str, dict[PlayerColour, Counter]] = defaultdict(initialiser)
+        if aggregate:
+            self.nodes[self.root_key] = self.root.aggregated()
+        self.edges: dict[PositionKey, dict[PlayerColour, Counter]] = defaultdict(
+            initialiser
+        )
+
+    @property
+    def edges(self) -> Mapping[PositionKey, dict[PlayerColour, Counter]]:
+        """The edges, to be read only: they're added to with `add_edge`, see `Tree`"""
+        return MappingProxyType(self._edges)
+
+    @edges.setter
+    def edges(self, edges: dict[PositionKey, dict[PlayerColour, Counter]]) -> None:
+        self._edges = edges
+        self._parents: dict[
+            PositionKey, dict[PlayerColour, dict[PositionKey, None]]
+        ] = {}
+        for parent, targets in edges.items():
+            for colour, children in targets.items():
+                for child in children:
+                    self._index_edge(parent, colour, child)
+
+    def _index_edge(
+        self, parent: PositionKey, colour: PlayerColour, child: PositionKey
+    ) -> None:
+        """Adds the edge to the reverse index, the parents of a child being kept in insertion order"""
+        self._parents.setdefault(child, {}).setdefault(colour, {})[parent] = None
+
+    def add_edge(
+        self,
+        parent: PositionKey,
+        colour: PlayerColour,
+        child: PositionKey,
+        count: int = 1,
+    ) -> None:
+        """Adds `count` times the child following the parent, keeping the reverse index in sync"""
+        targets = self._edges.get(parent)
+        if targets is None:
+            targets = self._edges[parent] = initialiser()
+        children = targets.get(colour)
+        if children is None:
+            children = targets[colour] = Counter()
+        children[child] += count
+        self._index_edge(parent, colour, child)
+
+    def key(self, opening: Opening) -> PositionKey:
+        """Returns the key of the opening in the tree"""
+        if self.position_key == "fen":
+            return opening.fen
+        if opening.zobrist is None:
+            return fen_to_key(opening.fen, "zobrist")
+        return opening.zobrist
 
     def __add__(self, other: "Tree") -> "Tree":
-        """Adds two trees together"""
-        tree = Tree()
-        tree.nodes = self._add_nodes(self.nodes, other.nodes)
-        tree.edges = self._add_edges(self.edges, other.edges)
-        return tree
+        """Adds two trees together, into a new tree which doesn't share the openings of either"""
+        return Tree.merge_many([self, other])
 
-    @staticmethod
-    def _add_nodes(
-        nodes_1: dict[str, Opening], nodes_2: dict[str, Opening]
-    ) -> dict[str, Opening]:
+    def __iadd__(self, other: "Tree") -> "Tree":
+        self.update(other)
+        return self
+
+    def update(self, other: "Tree") -> "Tree":
         """
-        Adds two nodes dictionaries together
+        Merges the other tree into this one in place
 
-        This utilises the `__add__` method of the `Opening` class.
+        The openings of this tree are extended with the occurrences of the other's, and the openings
+        only in the other are copied, so the other tree is left as it is and none of its openings are
+        shared. This walks the other tree once, so it's O(size of the other tree).
         """
-        return {
-            key: nodes_1.get(key) + nodes_2.get(key)  # type: ignore
-            for key in nodes_1.keys() | nodes_2.keys()
-        }
+        assert (
+            self.position_key == other.position_key
+        ), "The trees should be keyed the same way"
+        assert (
+            self.aggregate == other.aggregate
+        ), "The trees should both be aggregated or not"
+
+        for key, opening in other.nodes.items():
+            if key in self.nodes:
+                self.nodes[key] += opening
+            else:
+                self.nodes[key] = opening.copy()
 
-    def _add_edges(
-        self,
-        edges_1: dict[str, dict[PlayerColour, Counter]],
-        edges_2: dict[str, dict[PlayerColour, Counter]],
-    ) -> dict[str, dict[PlayerColour, Counter]]:
-        """Adds two edges dictionaries together"""
-        return {
-            key: self._construct_colour_dict_for_edges(
-                edges_1.get(key, {}), edges_2.get(key, {})
-            )
-            for key in edges_1.keys() | edges_2.keys()
-        }
+        for parent, targets in other.edges.items():
+            for colour, children in targets.items():
+                for child, count in children.items():
+                    self.add_edge(parent, colour, child, count)
 
-    @staticmethod
-    def _construct_colour_dict_for_edges(
-        dict_1: dict[PlayerColour, Counter], dict_2: dict[PlayerColour, Counter]
-    ) -> dict:
-        new_dict = defaultdict(Counter)
-        for colour in [PlayerColour.W, PlayerColour.B]:
-            if colour in dict_1 or colour in dict_2:
-                new_dict[colour] = dict_1.get(colour, Counter()) + dict_2.get(
-                    colour, Counter()
-                )
-        return new_dict
+        return self
+
+    @classmethod
+    def merge_many(cls, trees: Iterable["Tree"]) -> "Tree":
+        """
+        Merges the trees into a new tree, walking each of them once
+
+        The merge is associative, so large numbers of trees can be merged as a parallel reduction,
+        e.g. by merging groups of them in a `Pool`, and then merging the merged groups.
+        """
+        trees = iter(trees)
+        first = next(trees)
+        tree = cls(first.position_key, first.aggregate)
+        for other in chain([first], trees):
+            tree.update(other)
+        return tree
 
-    def filter_by_opening(self, opening_fen: str) -> "Tree":
+    def filter_by_opening(
+        self, opening_key: PositionKey, depth: Optional[int] = None
+    ) -> "Tree":
         """
         Filters the tree by a specific opening
 
         Only children and downwards as well as parents and upwards are kept.
-        """
-        parents = self._get_parents_recursively(opening_fen)
-        children = self._get_children_recursively(opening_fen)
 
-        all_fens_to_keep = set(
-            [opening_fen] + [o.fen for o in parents] + [o.fen for o in children]
+        Args:
+            opening_key (PositionKey): The key of the opening
+            depth (Optional[int], optional): The number of edges to go up and down from the opening.
+                If None, all the ancestors and descendants are kept. Defaults to None.
+        """
+        all_keys_to_keep = dict.fromkeys(
+            [opening_key]
+            + self._traverse(opening_key, self._parent_keys, depth)
+            + self._traverse(opening_key, self._child_keys, depth)
         )
 
-        nodes_to_keep = {k: v for k, v in self.nodes.items() if k in all_fens_to_keep}
-        edges_to_keep = {k: v for k, v in self.edges.items() if k in all_fens_to_keep}
-        edges_to_keep = self._prune_edges_by_target(all_fens_to_keep, edges_to_keep)
+        nodes_to_keep = {k: self.nodes[k] for k in all_keys_to_keep if k in self.nodes}
+        edges_to_keep = {k: self.edges[k] for k in all_keys_to_keep if k in self.edges}
+        edges_to_keep = self._prune_edges_by_target(
+            all_keys_to_keep.keys(), edges_to_keep
+        )
 
-        tree = Tree()
+        tree = Tree(self.position_key, self.aggregate)
         tree.nodes = nodes_to_keep
         tree.edges = edges_to_keep
 
@@ -115,8 +211,9 @@ class Tree:
 
     @staticmethod
     def _prune_edges_by_target(
-        nodes_to_keep: set[str], edges: dict[str, dict[PlayerColour, Counter]]
-    ) -> dict[str, dict[PlayerColour, Counter]]:
+        nodes_to_keep: Collection[PositionKey],
+        edges: dict[PositionKey, dict[PlayerColour, Counter]],
+    ) -> dict[PositionKey, dict[PlayerColour, Counter]]:
         """Prunes the edges by the target"""
         return {
             parent: {
@@ -132,26 +229,81 @@ class Tree:
             for parent, targets in edges.items()
         }
 
+    @staticmethod
+    def _traverse(
+        opening_key: PositionKey,
+        neighbours: Callable[
+            [PositionKey, Optional[PlayerColour]], Iterable[PositionKey]
+        ],
+        depth: Optional[int] = None,
+        colour: Optional[PlayerColour] = None,
+    ) -> list[PositionKey]:
+        """
+        Breadth-first traversal from the opening, returning the keys reached in the order of their distance
+
+        Each key is visited once, so the transpositions (and cycles) of the graph are traversed in O(V + E).
+        The opening itself is only included if it's on a cycle.
+        """
+        visited: dict[PositionKey, None] = {}
+        frontier = [opening_key]
+        distance = 0
+        while frontier and (depth is None or distance < depth):
+            next_frontier = []
+            for key in frontier:
+                for neighbour in neighbours(key, colour):
+                    if neighbour not in visited:
+                        visited[neighbour] = None
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+            distance += 1
+        return list(visited)
+
+    def _parent_keys(
+        self, opening_key: PositionKey, colour: Optional[PlayerColour] = None
+    ) -> Iterable[PositionKey]:
+        """Keys of the parents of the opening, from the reverse index"""
+        parents_by_colour = self._parents.get(opening_key, {})
+        if colour is None:
+            return dict.fromkeys(chain.from_iterable(parents_by_colour.values()))
+        return parents_by_colour.get(colour, {})
+
+    def _child_keys(
+        self, opening_key: PositionKey, colour: Optional[PlayerColour] = None
+    ) -> Iterable[PositionKey]:
+        """Keys of the children of the opening"""
+        if opening_key not in self.edges:
+            return []
+        children_by_colour = self.edges[opening_key]
+        if colour is None:
+            return dict.fromkeys(chain.from_iterable(children_by_colour.values()))
+        return children_by_colour.get(colour, {})
+
     def _get_parents_recursively(
-        self, opening_fen: str, colour: Optional[PlayerColour] = None
+        self,
+        opening_key: PositionKey,
+        colour: Optional[PlayerColour] = None,
+        depth: Optional[int] = None,
     ) -> list[Opening]:
-        """Retrieves the parents of an opening recursively up to the root"""
-        parents = self.parents(opening_fen, colour)
-        for parent in parents:
-            parents += self._get_parents_recursively(parent.fen, colour)
-        return parents
+        """Retrieves the parents of an opening recursively up to the root (or `depth` levels up)"""
+        return [
+            self.nodes[key]
+            for key in self._traverse(opening_key, self._parent_keys, depth, colour)
+        ]
 
     def _get_children_recursively(
-        self, opening_fen: str, colour: Optional[PlayerColour] = None
+        self,
+        opening_key: PositionKey,
+        colour: Optional[PlayerColour] = None,
+        depth: Optional[int] = None,
     ) -> list[Opening]:
-        """Retreives the children of an opening recursively down to the leaves"""
-        children = self.children(opening_fen, colour)
-        for child in children:
-            children += self._get_children_recursively(child.fen, colour)
-        return children
+        """Retreives the children of an opening recursively down to the leaves (or `depth` levels down)"""
+        return [
+            self.nodes[key]
+            for key in self._traverse(opening_key, self._child_keys, depth, colour)
+        ]
 
     def parents(
-        self, opening_fen: str, colour: Optional[PlayerColour] = None
+        self, opening_key: PositionKey, colour: Optional[PlayerColour] = None
     ) -> list[Opening]:
         """
         Returns the heads of the opening
@@ -160,47 +312,36 @@ class Tree:
         possibility of transpositions.
 
         Args:
-            opening_fen (str): The FEN of the opening
+            opening_key (PositionKey): The key of the opening
             colour (Optional[PlayerColour], optional): The colour to regard when searching for parents.
                 If None, all parents are returned. Defaults to None.
         """
-        parents = []
-
-        for fen, child_counter in self.edges.items():
-            if colour is None:
-                tmp_d = reduce(lambda a, b: a + b, child_counter.values())
-            else:
-                tmp_d = child_counter[colour]
-
-            if opening_fen in tmp_d:
-                parents.append(self.nodes[fen])
-
-        return parents
+        return [self.nodes[key] for key in self._parent_keys(opening_key, colour)]
 
     def children(
-        self, opening_fen: str, colour: Optional[PlayerColour] = None
+        self, opening_key: PositionKey, colour: Optional[PlayerColour] = None
     ) -> list[Opening]:
         """
         Returns the children of the opening
 
         Args:
-            opening_fen (str): The FEN of the opening
+            opening_key (PositionKey): The key of the opening
             colour (Optional[PlayerColour], optional): The colour to regard when searching for children.
                 If None, all children are returned. Defaults to None.
         """
-        if opening_fen not in self.edges:
+        if opening_key not in self.edges:
             return []
         if colour is None:
             return list(
                 chain.from_iterable(
                     [
-                        [self.nodes[f] for f in children]
-                        for children in self.edges[opening_fen].values()
+                        [self.nodes[k] for k in children]
+                        for children in self.edges[opening_key].values()
                     ]
                 )
             )
         else:
-            return [self.nodes[f] for f in self.edges[opening_fen][colour].keys()]
+            return [self.nodes[k] for k in self.edges[opening_key][colour].keys()]
 
     def __repr__(self):
         string_repr = ""
@@ -221,16 +362,13 @@ class Tree:
         Returns a tree with only the openings that are played by the given colour (from
         the perspective of the user).
         """
-        tree = Tree()
+        tree = Tree(self.position_key, self.aggregate)
 
-        tree.nodes = tree.nodes | {
-            k: v.partition_by_colour(colour)
-            for k, v in self.nodes.items()
-            if v.partition_by_colour(colour) is not None
-        }
+        partitions = {k: v.partition_by_colour(colour) for k, v in self.nodes.items()}
+        tree.nodes = tree.nodes | {k: v for k, v in partitions.items() if v is not None}
 
         tree.edges = {
-            parent: {colour: children[colour]}
+            parent: {colour: Counter(children.get(colour, ()))}
             for parent, children in self.edges.items()
         }
 
@@ -238,25 +376,34 @@ class Tree:
 
     def add_opening(self, opening: Opening, head: Opening, player_colour: PlayerColour):
         """Adds an opening to the tree"""
-        if opening.fen in self.nodes:
-            self.nodes[opening.fen] += opening
+        key = self.key(opening)
+        if key in self.nodes:
+            self.nodes[key] += opening
         else:
-            self.nodes[opening.fen] = opening
+            self.nodes[key] = opening.aggregated() if self.aggregate else opening
 
-        self.edges[head.fen][player_colour][opening.fen] += 1
+        self.add_edge(self.key(head), player_colour, key)
 
     def get_opening_by_name_and_move(self, name: str, move: int) -> Optional[Opening]:
         """Gets an opening by name and move"""
         name = re.sub(r"\[[^\]]*\]", "", name).strip()
+        # nodes that can look the opening up without materialising the others, e.g. `LazyNodes`
+        find = getattr(self.nodes, "find", None)
+        if find is not None:
+            key = find(name, move)
+            return None if key is None else self.nodes[key]
         for opening in self.nodes.values():
             if opening.name == name and opening.num_moves == move:
                 return opening
 
     def to_dict(self) -> dict:
         """Parses the object into a dict"""
+        exclude = self.OCCURRENCE_FIELDS if self.aggregate else {"aggregates"}
         return {
-            "nodes": {k: v.model_dump() for k, v in self.nodes.items()},
-            "edges": self.edges,
+            "position_key": self.position_key,
+            "aggregate": self.aggregate,
+            "nodes": {k: v.model_dump(exclude=exclude) for k, v in self.nodes.items()},
+            "edges": self._edges,
         }
 
     def to_json(self, path: str) -> None:
@@ -270,7 +417,11 @@ class Tree:
 
     @property
     def root(self):
-        return self.nodes["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"]
+        return self.nodes[self.root_key]
+
+    def _parse_key(self, key: str) -> PositionKey:
+        """Parses a key of the JSON object, where Zobrist keys are stringified"""
+        return int(key) if self.position_key == "zobrist" else key
 
     @classmethod
     def from_json(cls, path: str) -> "Tree":
@@ -278,19 +429,18 @@ class Tree:
         with open(path, "r") as f:
             json_dict = json.load(f)
 
-        tree = cls()
+        tree = cls(
+            json_dict.get("position_key", "fen"), json_dict.get("aggregate", False)
+        )
         tree.nodes = {
-            fen: Opening(
-                **{
-                    **opening,
-                    "dates": [datetime.fromisoformat(d) for d in opening["dates"]],
-                    "colour": [PlayerColour(c) for c in opening["colour"]],
-                }
-            )
-            for fen, opening in json_dict["nodes"].items()
+            tree._parse_key(key): Opening.from_dump(opening)
+            for key, opening in json_dict["nodes"].items()
         }
         tree.edges = {
-            parent: {PlayerColour(k): Counter(v) for k, v in targets.items()}
+            tree._parse_key(parent): {
+                PlayerColour(k): Counter({tree._parse_key(c): n for c, n in v.items()})
+                for k, v in targets.items()
+            }
             for parent, targets in json_dict["edges"].items()
         }
 
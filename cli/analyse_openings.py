@@ -1,65 +1,366 @@
-from functools import reduce
+from itertools import islice
 from multiprocessing import Pool
 from pathlib import Path
-from chess_opening_analyser.engine.stockfish import Stockfish
+from queue import Queue
+from chess import Board
+from chess_opening_analyser.engine import Evaluation
+from chess_opening_analyser.engine.cache import EvaluationCache
+from chess_opening_analyser.engine.pool import EnginePool
+from chess_opening_analyser.engine.precomputed import (
+    PositionCollector,
+    PrecomputedEngine,
+)
+from chess_opening_analyser.games import HighWaterMark
 from chess_opening_analyser.games.chess_com import ChessCom
+from chess_opening_analyser.openings.cube import OpeningCube
+from chess_opening_analyser.openings.snapshot import TreeSnapshot
 from chess_opening_analyser.openings.tree import Tree
 from chess_opening_analyser.games.processor import GameProcessor
 from chess_opening_analyser.opening_directory import EcoDB
+from chess_opening_analyser.openings import KeyMode, PositionKey
+from chess_opening_analyser.logger import logger
 
 from tqdm import tqdm
-from typing import Optional
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, TypeVar
 
 from dotenv import load_dotenv, find_dotenv
-from multiprocessing import Pool
 
 import click
+import json
 import os
+import tempfile
 
 
 load_dotenv(find_dotenv())
 
+EVALUATION_CACHE_PATH = "chess_opening_analyser/cache/evaluations.sqlite"
+TREE_CACHE_DIR = Path("chess_opening_analyser/cache/trees")
+GAMES_PER_BATCH = 64
+
+ResultT = TypeVar("ResultT")
+
+# the evaluations of the positions in a phase 3 worker, see `init_worker_evaluations`
+worker_evaluations: dict[PositionKey, Evaluation] = {}
+
 
-def process_games_slice(games_slice, player_id, stockfish_dir, eco_db_path):
-    tree = Tree()
-    stockfish = Stockfish(stockfish_dir)
+def collect_positions_slice(
+    games_slice, player_id, eco_db_path, position_key: KeyMode
+) -> PositionCollector:
+    """Phase 1: walks the games to collect the positions to analyse, with their frequencies"""
+    collector = PositionCollector()
     eco_db = EcoDB(eco_db_path)
-    game_processor = GameProcessor(tree, stockfish, eco_db, player_id)
+    game_processor = GameProcessor(Tree(position_key), collector, eco_db, player_id)
 
-    for game in tqdm(games_slice):
-        game_processor.process_game(game)
+    game_processor.submit_games(games_slice)
+    logger.debug(
+        f"Skipped {game_processor.skipped_per_game:.1f} engine calls per game "
+        "outside of the scoring window"
+    )
+
+    return collector
+
+
+def analyse_positions(
+    positions: PositionCollector,
+    stockfish_dir: str,
+    num_engines: int,
+    engine_threads: int = 1,
+    engine_hash: int = 16,
+) -> dict[PositionKey, Evaluation]:
+    """Phase 2: analyses each distinct position once, the most frequent first"""
+    evaluation_cache = EvaluationCache(EVALUATION_CACHE_PATH)
+    engine_pool = EnginePool(
+        stockfish_dir,
+        size=num_engines,
+        threads=engine_threads,
+        hash_mb=engine_hash,
+        cache=evaluation_cache,
+    )
 
-    stockfish.quit()
+    futures = {
+        key: engine_pool.submit(Board(epd), key)
+        for key, epd in positions.by_frequency()
+    }
+    evaluations = {key: future.result() for key, future in tqdm(futures.items())}
+
+    engine_pool.quit()
+    logger.info(
+        f"Analysed {len(evaluations)} distinct positions "
+        f"out of {positions.counts.total()} submitted"
+    )
+    logger.info(f"Evaluation cache: {evaluation_cache.stats}")
+    evaluation_cache.close()
+
+    return evaluations
+
+
+def process_games_slice(
+    games_slice,
+    player_id,
+    eco_db_path,
+    position_key: KeyMode,
+    aggregate: bool = False,
+) -> Tree:
+    """Phase 3: builds the tree of the games from the evaluations of their positions"""
+    tree = Tree(position_key, aggregate)
+    eco_db = EcoDB(eco_db_path)
+    game_processor = GameProcessor(
+        tree, PrecomputedEngine(worker_evaluations), eco_db, player_id
+    )
+
+    for game in games_slice:
+        game_processor.process_game(game)
 
     return game_processor.tree
 
 
-def run_analysis(player_id: str, num_workers: int, limit: Optional[int] = None):
-    if Path(f"chess_opening_analyser/cache/trees/{player_id}.json").exists():
-        return Tree.from_json(f"chess_opening_analyser/cache/trees/{player_id}.json")
-    else:
-        chess_com = ChessCom()
-        games = chess_com.get_all_games(player_id)
-        stockfish_dir = os.environ["STOCKFISH_DIR"]
-        eco_db_path = "eco/openings.json"
+def init_worker_evaluations(evaluations: dict[PositionKey, Evaluation]) -> None:
+    """Initialiser of the phase 3 workers, so that the evaluations are sent once per worker"""
+    global worker_evaluations
+    worker_evaluations = evaluations
+
+
+def batched(games: Iterable[str], size: int) -> Iterator[list[str]]:
+    """Splits the games into lists of `size` games, the last one possibly shorter"""
+    games = iter(games)
+    while batch := list(islice(games, size)):
+        yield batch
+
+
+def spooled(games: Iterable[str], spool: IO[str]) -> Iterator[str]:
+    """Yields the games, writing each of them to the spool to be replayed by `replayed`"""
+    for game in games:
+        spool.write(json.dumps(game) + "\n")
+        yield game
+
+
+def replayed(spool: IO[str]) -> Iterator[str]:
+    """Yields the games written to the spool by `spooled`, in the same order"""
+    spool.flush()
+    spool.seek(0)
+    for line in spool:
+        yield json.loads(line)
+
+
+def imap_unordered_bounded(
+    pool: Pool, func: Callable[..., ResultT], args: Iterable[tuple], max_pending: int
+) -> Iterator[tuple[tuple, ResultT]]:
+    """
+    Applies the function to the arguments in the pool, yielding them with their results as they complete
+
+    Each task is picked up by whichever worker is free, so a slow task only holds up its own worker.
+    Unlike `Pool.imap_unordered`, which consumes its input as fast as it can, the arguments are only
+    taken from the iterable when fewer than `max_pending` tasks are in flight.
+    """
+    done: Queue[tuple[tuple, bool, Any]] = Queue()
+    args = iter(args)
+    pending = 0
+    while True:
+        while pending < max_pending and (arg := next(args, None)) is not None:
+            pool.apply_async(
+                func,
+                arg,
+                callback=lambda result, arg=arg: done.put((arg, True, result)),
+                error_callback=lambda error, arg=arg: done.put((arg, False, error)),
+            )
+            pending += 1
+        if not pending:
+            return
+
+        arg, succeeded, result = done.get()
+        pending -= 1
+        if not succeeded:
+            raise result
+        yield arg, result
+
+
+def build_tree(
+    games: Iterable[str],
+    player_id: str,
+    num_workers: int,
+    position_key: KeyMode = "fen",
+    engines_per_worker: int = 1,
+    engine_threads: int = 1,
+    engine_hash: int = 16,
+    aggregate: bool = False,
+    batch_size: int = GAMES_PER_BATCH,
+) -> tuple[Tree, Optional[HighWaterMark]]:
+    """
+    Analyses the games of the player into their opening tree
+
+    The games are processed in three phases, so that the engine cost is proportional to the number
+    of distinct positions rather than the number of plies: the workers first collect the positions
+    to analyse, these are then analysed once each by a pool of `num_workers * engines_per_worker`
+    engines, and finally the workers build the tree from the evaluations.
+
+    The games are read once, streamed through the first phase of the workers and spooled to a
+    temporary file, which is replayed through the last one. Both phases see the same games even if
+    the retriever would yield more of them by then (e.g. a game of the current month ending during
+    the analysis), and the high-water mark is that of the games merged into the tree. The games are
+    dispatched in batches of `batch_size` to whichever worker is free, with at most two batches per
+    worker in flight, and the results are merged as they complete, so that the memory is bounded by
+    the batches and the tree, rather than the number of games.
+
+    With `aggregate`, the tree only keeps the running aggregates of the occurrences of the openings.
+
+    Returns:
+        tuple[Tree, Optional[HighWaterMark]]: the tree, and the high-water mark of the games, None if
+            there were no games
+    """
+    stockfish_dir = os.environ["STOCKFISH_DIR"]
+    eco_db_path = EcoDB.compiled("eco/openings.json")
+    tree = Tree(position_key, aggregate)
+    mark = None
+    positions = PositionCollector()
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        with Pool(processes=num_workers) as pool, tqdm(
+            desc="Collecting the positions", unit="game"
+        ) as progress:
+            for (batch, *_), collector in imap_unordered_bounded(
+                pool,
+                collect_positions_slice,
+                (
+                    (batch, player_id, eco_db_path, position_key)
+                    for batch in batched(spooled(games, spool), batch_size)
+                ),
+                2 * num_workers,
+            ):
+                positions.update(collector)
+                progress.update(len(batch))
+
+        if not spool.tell():
+            return tree, None
 
-        if limit is not None:
-            games = games[:limit]
+        evaluations = analyse_positions(
+            positions,
+            stockfish_dir,
+            num_workers * engines_per_worker,
+            engine_threads,
+            engine_hash,
+        )
 
-        games_chunks = [games[i::num_workers] for i in range(num_workers)]
+        with Pool(
+            processes=num_workers,
+            initializer=init_worker_evaluations,
+            initargs=(evaluations,),
+        ) as pool, tqdm(desc="Building the tree", unit="game") as progress:
+            for (batch, *_), batch_tree in imap_unordered_bounded(
+                pool,
+                process_games_slice,
+                (
+                    (batch, player_id, eco_db_path, position_key, aggregate)
+                    for batch in batched(replayed(spool), batch_size)
+                ),
+                2 * num_workers,
+            ):
+                tree.update(batch_tree)
+                mark = HighWaterMark.of(batch, mark)
+                progress.update(len(batch))
 
-        with Pool(processes=num_workers) as pool:
-            process_args = [
-                (games_chunk, player_id, stockfish_dir, eco_db_path)
-                for games_chunk in games_chunks
-            ]
+    return tree, mark
 
-            trees = pool.starmap(process_games_slice, process_args)
 
-        tree = reduce(lambda x, y: x + y, trees)
-        tree.to_json(f"chess_opening_analyser/cache/trees/{player_id}.json")
+def tree_path(player_id: str) -> Path:
+    """Path of the cached snapshot of the tree of the player"""
+    return TREE_CACHE_DIR / f"{player_id}.tree"
 
+
+def cube_path(player_id: str) -> Path:
+    """Path of the cached cube of the tree of the player, see `OpeningCube`"""
+    return TREE_CACHE_DIR / f"{player_id}.cube.npz"
+
+
+def load_cached_tree(player_id: str) -> Optional[Tree]:
+    """
+    Loads the cached tree of the player, if any
+
+    A tree cached as JSON by an earlier version is converted into a snapshot as it's loaded.
+    """
+    json_path = TREE_CACHE_DIR / f"{player_id}.json"
+    if tree_path(player_id).exists():
+        return TreeSnapshot.load(tree_path(player_id)).to_tree()
+    if json_path.exists():
+        tree = Tree.from_json(str(json_path))
+        save_tree(tree, player_id)
         return tree
+    return None
+
+
+def save_tree(tree: Tree, player_id: str) -> None:
+    """Caches the tree of the player as a snapshot, alongside its cube"""
+    TREE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    TreeSnapshot.of(tree).save(tree_path(player_id))
+    OpeningCube.of(tree).save(cube_path(player_id))
+
+
+def run_analysis(
+    player_id: str,
+    num_workers: int,
+    limit: Optional[int] = None,
+    position_key: KeyMode = "fen",
+    engines_per_worker: int = 1,
+    engine_threads: int = 1,
+    engine_hash: int = 16,
+    aggregate: bool = False,
+    update: bool = False,
+    batch_size: int = GAMES_PER_BATCH,
+) -> Tree:
+    """
+    Analyses the games of the player into their opening tree, or loads the tree if it's been cached
+
+    The high-water mark of the games analysed (the end of the latest one) is saved with the tree. With
+    `update`, only the games played since are retrieved and analysed, and their tree is merged into
+    the cached one, which keeps its position key and aggregate mode. See `build_tree` for the rest
+    of the arguments.
+    """
+    mark_path = TREE_CACHE_DIR / f"{player_id}.mark.json"
+    chess_com = ChessCom()
+    tree = load_cached_tree(player_id)
+
+    if tree is not None and update and not mark_path.exists():
+        logger.warning(f"No high-water mark for {player_id}, rebuilding the tree")
+    elif tree is not None:
+        if not update:
+            return tree
+
+        mark = HighWaterMark.from_json(mark_path)
+        new_tree, new_mark = build_tree(
+            islice(chess_com.iter_new_games(player_id, mark), limit),
+            player_id,
+            num_workers,
+            tree.position_key,
+            engines_per_worker,
+            engine_threads,
+            engine_hash,
+            tree.aggregate,
+            batch_size,
+        )
+        if new_mark is None:
+            logger.info(f"No new games of {player_id} since {mark.end_time}")
+            return tree
+
+        tree.update(new_tree)
+        save_tree(tree, player_id)
+        new_mark.to_json(mark_path)
+
+        return tree
+
+    tree, mark = build_tree(
+        islice(chess_com.iter_games(player_id), limit),
+        player_id,
+        num_workers,
+        position_key,
+        engines_per_worker,
+        engine_threads,
+        engine_hash,
+        aggregate,
+        batch_size,
+    )
+    save_tree(tree, player_id)
+    if mark is not None:
+        mark.to_json(mark_path)
+
+    return tree
 
 
 @click.command()
@@ -71,8 +372,67 @@ def run_analysis(player_id: str, num_workers: int, limit: Optional[int] = None):
     type=int,
 )
 @click.option("--limit", default=None, help="Number of games to process", type=int)
-def create_tree(player_id: str, num_workers: int, limit: Optional[int]) -> Tree:
-    return run_analysis(player_id, num_workers=num_workers, limit=limit)
+@click.option(
+    "--position-key",
+    default="fen",
+    help="Whether to key positions by their FEN or their Zobrist hash",
+    type=click.Choice(["fen", "zobrist"]),
+)
+@click.option(
+    "--engines-per-worker",
+    default=1,
+    help="Number of Stockfish processes per worker analysing the positions",
+    type=int,
+)
+@click.option(
+    "--engine-threads", default=1, help="Search threads of each Stockfish", type=int
+)
+@click.option(
+    "--engine-hash",
+    default=16,
+    help="Hash table size of each Stockfish in MB",
+    type=int,
+)
+@click.option(
+    "--aggregate",
+    is_flag=True,
+    help="Keep the running aggregates of the openings instead of their games",
+)
+@click.option(
+    "--update",
+    is_flag=True,
+    help="Update the cached tree with the games played since it was built",
+)
+@click.option(
+    "--batch-size",
+    default=GAMES_PER_BATCH,
+    help="Number of games per batch dispatched to the workers",
+    type=int,
+)
+def create_tree(
+    player_id: str,
+    num_workers: int,
+    limit: Optional[int],
+    position_key: KeyMode,
+    engines_per_worker: int,
+    engine_threads: int,
+    engine_hash: int,
+    aggregate: bool,
+    update: bool,
+    batch_size: int,
+) -> Tree:
+    return run_analysis(
+        player_id,
+        num_workers=num_workers,
+        limit=limit,
+        position_key=position_key,
+        engines_per_worker=engines_per_worker,
+        engine_threads=engine_threads,
+        engine_hash=engine_hash,
+        aggregate=aggregate,
+        update=update,
+        batch_size=batch_size,
+    )
 
 
 if __name__ == "__main__":
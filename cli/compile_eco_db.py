@@ -0,0 +1,16 @@
+from chess_opening_analyser.opening_directory import EcoDB
+
+import click
+
+
+@click.command()
+@click.option("--db-path", default="eco/openings.json", help="Path to the JSON ECO DB")
+@click.option(
+    "--index-path", default="eco/openings.bin", help="Path of the compiled index"
+)
+def compile_eco_db(db_path: str, index_path: str):
+    EcoDB.compile(db_path, index_path)
+
+
+if __name__ == "__main__":
+    compile_eco_db()
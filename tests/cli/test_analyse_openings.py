@@ -0,0 +1,44 @@
+from tests.games.data_loader import load_game
+from chess_opening_analyser.engine import Evaluation
+from chess_opening_analyser.games import HighWaterMark
+
+from cli import analyse_openings
+
+
+LATER_GAME = (
+    '[Event "Live Chess"]\n[Site "Chess.com"]\n[Date "2023.06.02"]\n[White "matyasj"]\n'
+    '[Black "juliusoliveros"]\n[Result "1-0"]\n[EndDate "2023.06.02"]\n[EndTime "08:00:00"]\n'
+    '[Link "https://www.chess.com/game/live/79342280599"]\n\n1. d4 d5 2. c4 e6 3. Nc3 Nf6 1-0\n'
+)
+
+
+class GrowingGames:
+    """The games of a month, one more of which has ended on each later read"""
+
+    def __init__(self, games: list[str], later_games: list[str]):
+        self.games = games
+        self.later_games = later_games
+        self.reads = 0
+
+    def __iter__(self):
+        games = self.games + self.later_games[: self.reads]
+        self.reads += 1
+        return iter(games)
+
+
+def test_build_tree_reads_the_games_once(mocker, monkeypatch):
+    monkeypatch.setenv("STOCKFISH_DIR", "")
+    mocker.patch.object(
+        analyse_openings,
+        "analyse_positions",
+        lambda positions, *_: {
+            key: Evaluation(0, 1000, 0, "d2d4") for key, _ in positions.by_frequency()
+        },
+    )
+    games = GrowingGames([load_game()], [LATER_GAME])
+
+    tree, mark = analyse_openings.build_tree(games, "matyasj", num_workers=1)
+
+    assert games.reads == 1
+    assert mark == HighWaterMark.of([load_game()])
+    assert sum(sum(c.values()) for c in tree.edges[tree.root_key].values()) == 1
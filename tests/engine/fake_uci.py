@@ -0,0 +1,34 @@
+"""Minimal UCI engine answering every search with the first legal move, to test the engine pool"""
+from chess import Board
+
+import sys
+
+
+def main():
+    board = Board()
+    for line in sys.stdin:
+        command, *args = line.split()
+        if command == "uci":
+            print("id name FakeFish")
+            print("option name Threads type spin default 1 min 1 max 512")
+            print("option name Hash type spin default 16 min 1 max 33554432")
+            print("uciok")
+        elif command == "isready":
+            print("readyok")
+        elif command == "position":
+            fen = " ".join(args[1:7]) if args[0] == "fen" else Board.starting_fen
+            board = Board(fen)
+            if "moves" in args:
+                for move in args[args.index("moves") + 1 :]:
+                    board.push_uci(move)
+        elif command == "go":
+            move = next(iter(board.legal_moves)).uci()
+            print(f"info depth 1 score cp 0 pv {move}")
+            print(f"bestmove {move}")
+        elif command == "quit":
+            break
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
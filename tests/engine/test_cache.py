@@ -0,0 +1,62 @@
+from chess_opening_analyser.engine.cache import EvaluationCache
+from chess_opening_analyser.engine.stockfish import Stockfish
+from chess_opening_analyser.games import PlayerColour
+from chess import Board, Move, WHITE, engine
+
+import pytest
+
+
+def test_evaluation_cache(tmp_path):
+    cache = EvaluationCache(tmp_path / "evaluations.sqlite")
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq -"
+
+    assert cache.get(fen, 10, "Stockfish 16") is None
+    cache.put(fen, 10, "Stockfish 16", 40, 920, 40, "e7e5")
+
+    other_process = EvaluationCache(tmp_path / "evaluations.sqlite")
+    assert other_process.get(fen, 10, "Stockfish 16") == (40, 920, 40, "e7e5")
+    assert other_process.get(fen, 12, "Stockfish 16") is None
+    assert other_process.get(fen, 10, "Stockfish 15") is None
+
+    assert cache.stats == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+    assert other_process.stats["hits"] == 1
+    assert len(other_process) == 1
+
+
+def test_persistent_cache(tmp_path, mocker):
+    simple_engine = mocker.MagicMock()
+    simple_engine.id = {"name": "Stockfish 16"}
+    simple_engine.analyse.return_value = {
+        "score": engine.PovScore(engine.Cp(30), WHITE),
+        "pv": [Move.from_uci("e7e5")],
+    }
+    mocker.patch("chess.engine.SimpleEngine.popen_uci", return_value=simple_engine)
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+    first_run = Stockfish("stockfish", cache=EvaluationCache(tmp_path / "e.sqlite"))
+    white = first_run.get_best_move(fen, PlayerColour.W)
+    second_run = Stockfish("stockfish", cache=EvaluationCache(tmp_path / "e.sqlite"))
+    black = second_run.get_best_move(fen, PlayerColour.B)
+
+    assert simple_engine.analyse.call_count == 1
+    assert second_run.cache is not None and second_run.cache.stats["hits"] == 1
+    assert black["best_move"] == white["best_move"] == "e7e5"
+    assert black["score"] == pytest.approx(1 - white["score"])
+
+
+def test_colour_independent_cache(mocker):
+    simple_engine = mocker.MagicMock()
+    simple_engine.analyse.return_value = {
+        "score": engine.PovScore(engine.Cp(-50), WHITE),
+        "pv": [Move.from_uci("d2d4")],
+    }
+    mocker.patch("chess.engine.SimpleEngine.popen_uci", return_value=simple_engine)
+    board = Board("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2")
+
+    stockfish = Stockfish("stockfish")
+    white = stockfish.get_best_move_for_board(board, PlayerColour.W, "key")
+    black = stockfish.get_best_move_for_board(board, PlayerColour.B, "key")
+
+    assert simple_engine.analyse.call_count == 1
+    assert white["score"] < 0.5 < black["score"]
+    assert white["score"] + black["score"] == pytest.approx(1.0)
@@ -0,0 +1,52 @@
+from tests.games.data_loader import load_game
+from chess_opening_analyser.engine import Evaluation
+from chess_opening_analyser.engine.cache import EvaluationCache
+from chess_opening_analyser.engine.pool import EnginePool
+from chess_opening_analyser.games.processor import GameProcessor
+from chess_opening_analyser.openings.tree import Tree
+from chess_opening_analyser.opening_directory import EcoDB
+from chess import Board
+from pathlib import Path
+
+import sys
+
+FAKE_ENGINE = [sys.executable, str(Path(__file__).parent / "fake_uci.py")]
+
+
+def test_engine_pool_evaluation():
+    pool = EnginePool(FAKE_ENGINE, size=2, threads=2, hash_mb=32)
+    board = Board()
+
+    first = pool.submit(board, board.epd())
+    board.push_uci("e2e4")  # the queued position is a copy
+    assert pool.submit(Board(), Board().epd()) is first
+    assert first.result().best_move == "g1h3"
+    assert first.result().wins == first.result().losses  # an even score
+
+    mate = Board("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+    assert pool.submit(mate, mate.epd()).result() == Evaluation(0, 0, 1000, "")
+    pool.quit()
+
+
+def test_engine_pool_processing(tmp_path):
+    cache = EvaluationCache(tmp_path / "evaluations.sqlite")
+    pool = EnginePool(FAKE_ENGINE, size=2, cache=cache)
+    eco_db = EcoDB("eco/openings.json")
+
+    pooled = GameProcessor(Tree(), pool, eco_db, "matyasj")
+    games = [load_game()] * 3
+    pooled.submit_games(games)  # queues the positions while the games are walked
+    for game in games:
+        pooled.process_game(game)
+    pool.quit()
+
+    assert len(cache) == cache.stats["misses"] > 0
+
+    cached_pool = EnginePool(FAKE_ENGINE, size=1, cache=cache)
+    sequential = GameProcessor(Tree(), cached_pool, eco_db, "matyasj")
+    for _ in range(3):
+        sequential.process_game(load_game())
+    cached_pool.quit()
+
+    assert cache.stats["hits"] == len(cache)
+    assert pooled.tree.to_dict() == sequential.tree.to_dict()
@@ -0,0 +1,38 @@
+from tests.games.data_loader import load_game
+from tests.games.test_processor import process_with_mock_engine
+from chess_opening_analyser.engine import Evaluation
+from chess_opening_analyser.engine.precomputed import (
+    PositionCollector,
+    PrecomputedEngine,
+)
+from chess_opening_analyser.games.processor import GameProcessor
+from chess_opening_analyser.openings.tree import Tree
+from chess_opening_analyser.opening_directory import EcoDB
+from chess import Board
+
+
+def test_precomputed_evaluations():
+    eco_db = EcoDB("eco/openings.json")
+    collector = PositionCollector()
+    GameProcessor(Tree(), collector, eco_db, "matyasj").submit_games([load_game()])
+    other_worker = PositionCollector()
+    GameProcessor(Tree(), other_worker, eco_db, "matyasj").submit_games(
+        [load_game()] * 2
+    )
+    collector.update(other_worker)
+
+    assert set(collector.counts.values()) == {3}
+    assert all(
+        GameProcessor._fen_parser(Board(epd).fen()) == key
+        for key, epd in collector.by_frequency()
+    )
+
+    evaluations = {
+        key: Evaluation(0, 1000, 0, "d2d4") for key, _ in collector.by_frequency()
+    }
+    game_processor = GameProcessor(
+        Tree(), PrecomputedEngine(evaluations), eco_db, "matyasj"
+    )
+    game_processor.process_game(load_game())
+
+    assert game_processor.tree.to_dict() == process_with_mock_engine("fen").to_dict()
@@ -0,0 +1,50 @@
+from chess_opening_analyser.games.pgn import scan_game
+from chess.pgn import GameBuilder, read_game
+from .data_loader import load_game
+
+import io
+
+
+def test_scan_game():
+    game_str = load_game()
+
+    scanned = scan_game(game_str, GameBuilder())
+    game = read_game(io.StringIO(game_str))
+
+    assert game is not None
+    assert dict(scanned.headers) == dict(game.headers)
+    assert list(scanned.mainline_moves()) == list(game.mainline_moves())
+
+
+def test_scan_game_skips_variations_and_comments():
+    game_str = (
+        '[Event "?"]\n[White "a"]\n[Black "b"]\n\n'
+        "1. e4 {[%clk 0:03:00]} e5 (1... c5 2. Nf3 {Sicilian}) 2. Nf3! $1 Nc6?! ; comment\n"
+        "3. Bb5 a6 1-0\n"
+    )
+
+    scanned = scan_game(game_str, GameBuilder())
+
+    assert scanned.headers["White"] == "a"
+    assert [m.uci() for m in scanned.mainline_moves()] == [
+        "e2e4",
+        "e7e5",
+        "g1f3",
+        "b8c6",
+        "f1b5",
+        "a7a6",
+    ]
+
+
+def test_scan_game_castling_with_zeros():
+    game_str = (
+        '[Event "?"]\n[White "a"]\n[Black "b"]\n\n'
+        "1. e4 e5 2. Nf3 Nf6 3. Bc4 Bc5 4. 0-0 0-0 *\n"
+    )
+
+    scanned = scan_game(game_str, GameBuilder())
+    game = read_game(io.StringIO(game_str))
+
+    assert game is not None
+    assert len(list(scanned.mainline_moves())) == 8
+    assert list(scanned.mainline_moves()) == list(game.mainline_moves())
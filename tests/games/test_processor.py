@@ -3,11 +3,31 @@ from chess_opening_analyser.games.processor import GameProcessor
 from chess_opening_analyser.openings.tree import Tree
 from chess_opening_analyser.engine.stockfish import Stockfish
 from chess_opening_analyser.opening_directory import EcoDB
+from chess_opening_analyser.games import PlayerColour
 
+from chess_opening_analyser.engine import Evaluation
+
+from concurrent.futures import Future
 from unittest.mock import MagicMock
 from datetime import datetime
 
 
+def evaluated(evaluation: Evaluation) -> Future:
+    future = Future()
+    future.set_result(evaluation)
+    return future
+
+
+def process_with_mock_engine(position_key) -> Tree:
+    stockfish = MagicMock(spec=Stockfish)
+    stockfish.submit.return_value = evaluated(Evaluation(0, 1000, 0, "d2d4"))
+    eco_db = EcoDB("eco/openings.json")
+
+    game_processor = GameProcessor(Tree(position_key), stockfish, eco_db, "matyasj")
+    game_processor.process_game(load_game())
+    return game_processor.tree
+
+
 def test_game_processing_results(mocker):
     game_str = load_game()
 
@@ -21,3 +41,50 @@ def test_game_processing_results(mocker):
     assert isinstance(metadata["date"], datetime)
     assert metadata["result"] == 0.5
     assert metadata["date"].year == 2023
+
+
+def test_zobrist_keyed_processing():
+    fen_tree = process_with_mock_engine("fen")
+    zobrist_tree = process_with_mock_engine("zobrist")
+
+    assert len(fen_tree.nodes) > 1
+    assert all(isinstance(key, int) for key in zobrist_tree.nodes)
+    assert {o.fen: o.score_in_n_moves for o in fen_tree.nodes.values()} == {
+        o.fen: o.score_in_n_moves for o in zobrist_tree.nodes.values()
+    }
+    assert sum(zobrist_tree.edges[zobrist_tree.root_key][PlayerColour.W].values()) == 1
+
+
+def test_processing_stops_after_openings(mocker):
+    stockfish = MagicMock(spec=Stockfish)
+    stockfish.submit.return_value = evaluated(Evaluation(0, 1000, 0, "d2d4"))
+    eco_db = EcoDB("eco/openings.json")
+    lookup = mocker.spy(eco_db, "lookup")
+
+    game_processor = GameProcessor(Tree(), stockfish, eco_db, "matyasj")
+    game_processor.process_game(load_game().replace("62. Kd4", "62. Zz9"))
+
+    assert lookup.call_count == 8 + GameProcessor.MOVE_DELAY + 1
+    assert (
+        game_processor.tree.nodes.keys() == process_with_mock_engine("fen").nodes.keys()
+    )
+
+
+def test_processing_skips_unused_evaluations(mocker):
+    stockfish = MagicMock(spec=Stockfish)
+    stockfish.submit.return_value = evaluated(Evaluation(0, 1000, 0, "d2d4"))
+    eco_db = EcoDB("eco/openings.json")
+    lookup = mocker.spy(eco_db, "lookup")
+
+    game_processor = GameProcessor(Tree(), stockfish, eco_db, "matyasj")
+    game_processor.process_game(load_game())
+
+    assert game_processor.stats["engine_calls"] == stockfish.submit.call_count
+    assert (
+        game_processor.stats["skipped"]
+        == lookup.call_count - stockfish.submit.call_count
+    )
+    assert game_processor.skipped_per_game > 0
+    assert all(
+        None not in node.score_in_n_moves for node in game_processor.tree.nodes.values()
+    )
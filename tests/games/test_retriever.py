@@ -0,0 +1,212 @@
+from chess_opening_analyser.games import HighWaterMark
+from chess_opening_analyser.games.chess_com import ChessCom
+from chess import pgn
+from .data_loader import load_game
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Optional
+
+import io
+import json
+
+
+def test_new_games(mocker):
+    game_str = load_game()
+    later_game = game_str.replace('[EndTime "07:13:51"]', '[EndTime "07:20:00"]')
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_games_in_month",
+        return_value=([game_str, later_game], {}),
+    )
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_monthly_archive",
+        return_value=[
+            "https://api.chess.com/pub/player/matyasj/games/2023/05",
+            "https://api.chess.com/pub/player/matyasj/games/2023/06",
+        ],
+    )
+    games_api = ChessCom()
+
+    mark = HighWaterMark.of([game_str])
+    assert mark == HighWaterMark(
+        datetime(2023, 6, 1, 7, 13, 51),
+        "https://www.chess.com/game/live/79342280511",
+    )
+    assert games_api.get_new_games("matyasj", mark, caching=False) == [later_game]
+    assert ChessCom._get_games_in_month.call_count == 1  # type: ignore
+
+    mark = HighWaterMark.of([later_game], mark)
+    assert games_api.get_new_games("matyasj", mark, caching=False) == []
+
+
+def test_mark_order():
+    game_str = load_game()
+    mark = HighWaterMark.of([game_str])
+    assert mark is not None
+
+    same_second = game_str.replace("79342280511", "79342280500")
+    assert not mark.precedes(same_second)
+    assert mark.precedes(game_str.replace("79342280511", "79342280600"))
+    assert HighWaterMark.of([same_second], mark) == mark
+
+    undated = game_str.replace('[Date "2023.06.01"]\n', "").replace(
+        '[EndDate "2023.06.01"]\n', ""
+    )
+    assert HighWaterMark.game_end(undated) is None
+    assert not mark.precedes(undated)
+    assert HighWaterMark.of([undated], mark) == mark
+    assert HighWaterMark.of([undated]) is None
+
+
+def test_monthly_cache(mocker, tmp_path):
+    game_str = load_game()
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_games_in_month",
+        return_value=([game_str], {}),
+    )
+    current_month = datetime.now(timezone.utc).strftime("%Y/%m")
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_monthly_archive",
+        return_value=[
+            "https://api.chess.com/pub/player/matyasj/games/2023/06",
+            f"https://api.chess.com/pub/player/matyasj/games/{current_month}",
+        ],
+    )
+    games_api = ChessCom()
+    games_api.CACHE_DIR = tmp_path
+
+    assert games_api.get_all_games("matyasj") == [game_str, game_str]
+    assert (tmp_path / "games" / "matyasj" / "2023-06.json").exists()
+
+    # only the current month is retrieved again
+    assert games_api.get_all_games("matyasj") == [game_str, game_str]
+    assert ChessCom._get_games_in_month.call_count == 3  # type: ignore
+
+    # a truncated month is retrieved again, and its cache repaired
+    month_path = tmp_path / "games" / "matyasj" / "2023-06.json"
+    month_path.write_text(month_path.read_text()[:20])
+    assert games_api.get_all_games("matyasj") == [game_str, game_str]
+    assert ChessCom._get_games_in_month.call_count == 5  # type: ignore
+    assert json.loads(month_path.read_text())["complete"]
+    assert sorted(p.name for p in month_path.parent.iterdir()) == [
+        "2023-06.json",
+        f"{current_month.replace('/', '-')}.json",
+    ]
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Stand-in for the archives of chess.com, rate limiting the first request of each month"""
+
+    requests: list[tuple[str, int]] = []
+    limited: set[str] = set()
+
+    def do_GET(self):
+        if self.path.endswith("/games/archives"):
+            months = ["2023/05", "2023/06", "2023/07"]
+            url = f"http://localhost:{self.server.server_port}/matyasj/games"
+            self._respond(200, {"archives": [f"{url}/{m}" for m in months]})
+        elif self.path not in self.limited:
+            self.limited.add(self.path)
+            self._respond(429, {}, {"Retry-After": "0"})
+        elif self.headers.get("If-None-Match") == '"v1"':
+            self._respond(304)
+        else:
+            games = [{"pgn": load_game()}, {"pgn": ""}]
+            self._respond(200, {"games": games}, {"ETag": '"v1"'})
+
+    def _respond(self, status: int, body=None, headers: Optional[dict] = None):
+        self.requests.append((self.path, status))
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if body is None:
+            self.end_headers()
+            return
+        data = json.dumps(body).encode()
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_archive_server(mocker, tmp_path):
+    server = ThreadingHTTPServer(("localhost", 0), ArchiveHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    mocker.patch(
+        "chess_opening_analyser.games.datetime", wraps=datetime
+    ).now.return_value = datetime(2023, 7, 15, tzinfo=timezone.utc)
+
+    games_api = ChessCom()
+    games_api.CACHE_DIR = tmp_path
+    games_api.ARCHIVE_URL = f"http://localhost:{server.server_port}"
+    try:
+        assert games_api.get_all_games("matyasj") == [load_game()] * 3
+        assert [s for _, s in ArchiveHandler.requests].count(429) == 3
+
+        # the past months are cached, and the current one hasn't been modified
+        ArchiveHandler.requests.clear()
+        assert games_api.get_all_games("matyasj") == [load_game()] * 3
+        assert [s for _, s in ArchiveHandler.requests] == [200, 304]
+    finally:
+        server.shutdown()
+
+
+def test_iter_games(mocker):
+    game_str = load_game()
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_games_in_month",
+        return_value=([game_str], {}),
+    )
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_monthly_archive",
+        return_value=[
+            f"https://api.chess.com/pub/player/matyasj/games/20{y}/{m:02d}"
+            for y in range(10, 20)
+            for m in range(1, 13)
+        ],
+    )
+    games_api = ChessCom()
+
+    games = games_api.iter_games("matyasj", caching=False)
+    assert next(games) == game_str
+    # the months are only retrieved a few ahead of the games consumed
+    assert ChessCom._get_games_in_month.call_count <= ChessCom.MAX_WORKERS + 1  # type: ignore
+    assert len(list(games)) == 119
+
+
+def test_chess_com(mocker):
+    game_str = load_game()
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_games_in_month",
+        return_value=([game_str], {}),
+    )
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_monthly_archive",
+        return_value=["https://api.chess.com/pub/player/matyasj/games/2023/06"],
+    )
+    games_api = ChessCom()
+    games = games_api._get_games("matyasj", months=["2023/06"])
+    assert isinstance(games, list)
+    assert isinstance(games[0], str)
+    game = pgn.read_game(io.StringIO(games[0]))
+    assert isinstance(game, pgn.Game)
+
+
+def test_all_games(mocker):
+    game_str = load_game()
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_games_in_month",
+        return_value=([game_str], {}),
+    )
+    mocker.patch(
+        "chess_opening_analyser.games.chess_com.ChessCom._get_monthly_archive",
+        return_value=["https://api.chess.com/pub/player/matyasj/games/2023/06"],
+    )
+    games_api = ChessCom()
+    games = games_api.get_all_games("matyasj", caching=False)
+    assert isinstance(games, list)
+    assert isinstance(games[0], str)
+    game = pgn.read_game(io.StringIO(games[0]))
+    assert isinstance(game, pgn.Game)
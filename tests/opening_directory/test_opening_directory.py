@@ -1,4 +1,5 @@
 from chess_opening_analyser.opening_directory import EcoDB
+from chess_opening_analyser.openings import fen_to_key
 
 
 def test_eco_db():
@@ -11,3 +12,41 @@ def test_eco_db():
     assert opening["eco"] == "B18"
     assert opening["name"] == "Caro-Kann Defense: Classical Variation"
     assert opening["moves"] == "e2e4 c7c6 d2d4 d7d5 b1d2 d5e4 d2e4 c8f5"
+
+
+def test_eco_db_index():
+    eco_db = EcoDB("eco/openings.json")
+
+    opening = eco_db.lookup("rn1qkbnr/pp2pppp/2p5/5b2/3PN3/8/PPP2PPP/R1BQKBNR w KQkq -")
+
+    assert opening["num_moves"] == 8
+    assert opening is eco_db.lookup(
+        "rn1qkbnr/pp2pppp/2p5/5b2/3PN3/8/PPP2PPP/R1BQKBNR w KQkq -"
+    )
+    assert eco_db.lookup("8/8/8/8/8/8/8/8 w - -") == {}
+
+
+def test_eco_db_binary(tmp_path):
+    index_path = tmp_path / "openings.bin"
+    EcoDB.compile("eco/openings.json", index_path)
+    assert list(tmp_path.iterdir()) == [index_path]
+
+    eco_db = EcoDB(index_path)
+    json_db = EcoDB("eco/openings.json")
+
+    assert len(eco_db.index) == len(json_db.index)
+    for fen in list(json_db.index)[::50]:
+        assert eco_db.lookup(fen) == json_db.lookup(fen)
+    assert eco_db.lookup("8/8/8/8/8/8/8/8 w - -") == {}
+
+
+def test_eco_db_zobrist(tmp_path):
+    fen = "rn1qkbnr/pp2pppp/2p5/5b2/3PN3/8/PPP2PPP/R1BQKBNR w KQkq -"
+    key = fen_to_key(fen, "zobrist")
+    index_path = tmp_path / "openings.bin"
+    EcoDB.compile("eco/openings.json", index_path)
+
+    for eco_db in [EcoDB("eco/openings.json"), EcoDB(index_path)]:
+        assert eco_db.lookup(key) == eco_db.lookup(fen)
+        assert eco_db.lookup(key)["eco"] == "B18"
+        assert eco_db.lookup(0) == {}
@@ -0,0 +1,70 @@
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.aggregates import Aggregates
+from chess_opening_analyser.openings.occurrences import Occurrences
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+
+def assert_same_moves(aggregates: dict, rows: dict):
+    assert aggregates.keys() == rows.keys()
+    for move, statistics in rows.items():
+        assert aggregates[move] == pytest.approx(statistics)
+
+
+def load_occurrences() -> Occurrences:
+    occurrences = Occurrences()
+    for i in range(20):
+        occurrences.append(
+            PlayerColour.W if i % 3 else PlayerColour.B,
+            datetime(2023, 1, 1 + i, 12, 30),
+            i % 2,
+            ["g1f3", "e2e4", None][i % 3],
+            i / 20,
+        )
+        if i < 15:
+            occurrences.append_score_in_n_moves(-i / 20)
+    return occurrences
+
+
+def test_aggregates():
+    occurrences = load_occurrences()
+    aggregates = Aggregates.of(occurrences)
+
+    assert len(aggregates) == 20
+    for colour in [PlayerColour.W, PlayerColour.B]:
+        partition = aggregates.partition(colour)
+        rows = occurrences.partition(colour)
+        assert partition.occurrence == rows.occurrence
+        assert partition.mean_results == pytest.approx(rows.mean_results)
+        assert partition.mean_score_in_n_moves == pytest.approx(
+            rows.mean_score_in_n_moves
+        )
+        assert_same_moves(partition.by_move(), rows.by_move())
+
+    # the scores of the last 5 occurrences are still to come
+    for i in range(15, 20):
+        occurrences.append_score_in_n_moves(-i / 20)
+        aggregates.append_score_in_n_moves(-i / 20)
+    assert_same_moves(aggregates.by_move(), occurrences.by_move())
+    assert np.array_equal(
+        aggregates.dates,
+        occurrences.dates.astype("datetime64[D]").astype("datetime64[us]"),
+    )
+
+
+def test_aggregates_merge():
+    occurrences = load_occurrences()
+    merged = Aggregates.of(occurrences)
+    merged.extend(Aggregates.from_dict(Aggregates.of(occurrences).to_dict()))
+    occurrences.extend(load_occurrences())
+
+    assert len(merged) == 40
+    assert sorted(merged.following_moves, key=str) == sorted(
+        occurrences.following_moves, key=str
+    )
+    assert merged.mean_following_game_scores == pytest.approx(
+        occurrences.mean_following_game_scores
+    )
+    assert len(merged._pending) == 10
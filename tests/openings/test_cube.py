@@ -0,0 +1,43 @@
+from chess_opening_analyser.openings.cube import OpeningCube
+from chess_opening_analyser.openings.transformers import Transformer
+from tests.openings.test_transformers import load_tree
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("aggregate", [False, True])
+def test_cube_views(tmp_path, aggregate):
+    tree = load_tree(aggregate)
+    OpeningCube.of(tree).save(tmp_path / "tree.cube.npz")
+    cube = OpeningCube.load(tmp_path / "tree.cube.npz")
+
+    for unique_names in [True, False]:
+        pd.testing.assert_frame_equal(
+            cube.opening_strength(unique_names),
+            Transformer.tree_to_opening_strength(tree, unique_names),
+        )
+    for resample_interval in ["W", "M", "Y"]:
+        pd.testing.assert_frame_equal(
+            cube.timeline(resample_interval, occurrence_threshold=0).sort_index(),
+            Transformer.tree_to_timeline(tree, resample_interval).sort_index(),
+        )
+
+
+def test_cube_periods():
+    cube = OpeningCube.of(load_tree())
+    years = cube.data[
+        (cube.data["interval"] == "Y") & (cube.data["name"] == "Neo-Grünfeld Defense")
+    ].set_index(["colour", "period"])
+
+    black_2022 = years.loc[("Black", pd.Timestamp(2022, 12, 31))]
+    assert black_2022["occurrence"] == 2
+    assert black_2022["mean_results"] == 0.5
+    assert black_2022["mean_following_game_scores"] == pytest.approx(0.31)
+    assert years.loc[("White", pd.Timestamp(2023, 12, 31)), "mean_results"] == 0.5
+
+    aggregated = OpeningCube.of(load_tree(aggregate=True))
+    periods = aggregated.data[aggregated.data["interval"] == "Y"]
+    assert periods["occurrence"].sum() == 5
+    assert np.isnan(periods["mean_results"]).all()
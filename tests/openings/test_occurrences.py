@@ -0,0 +1,99 @@
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.occurrences import (
+    Occurrences,
+    decode_move,
+    encode_move,
+)
+from chess_opening_analyser.openings.opening import Opening
+from datetime import datetime
+
+import pickle
+
+
+def test_move_codes():
+    for move in ["e2e4", "e7e8q", "a2a1n", "h7g8r", None]:
+        assert decode_move(encode_move(move)) == move
+
+
+def test_occurrences():
+    occurrences = Occurrences()
+    for i in range(20):
+        occurrences.append(
+            PlayerColour.W if i % 3 else PlayerColour.B,
+            datetime(2023, 1, 1 + i, 12, 30, 15, 123456),
+            i % 2,
+            "g1f3" if i % 5 else None,
+            i / 20,
+        )
+        occurrences.append_score_in_n_moves(-i / 20)
+
+    assert len(occurrences) == 20
+    assert occurrences.dates[19].item() == datetime(2023, 1, 20, 12, 30, 15, 123456)
+
+    black = occurrences.select(occurrences.colour_mask(PlayerColour.B))
+    assert len(black) == 7
+    assert black.following_moves[:2] == [None, "g1f3"]
+    assert black.score_in_n_moves.tolist() == [-i / 20 for i in range(0, 20, 3)]
+
+    unpickled = pickle.loads(pickle.dumps(occurrences))
+    unpickled.extend(black)
+    assert len(unpickled) == 27
+    assert unpickled.following_game_scores[20:].tolist() == [
+        i / 20 for i in range(0, 20, 3)
+    ]
+
+
+def test_opening_dump():
+    op = Opening(
+        eco="D70",
+        fen="rnbqkb1r/ppp1pp1p/5np1/3p4/2PP4/6P1/PP2PP1P/RNBQKBNR w KQkq -",
+        name="Neo-Grünfeld Defense",
+        num_moves=6,
+        index=1,
+        colour=[PlayerColour.W, PlayerColour.B],
+        dates=[datetime(2023, 1, 1), datetime(2023, 1, 2)],
+        results=[0, 0.5],
+        following_moves=["c4d5", None],
+        following_game_scores=[0.41, 0.21],
+        score_in_n_moves=[-0.1, 0.1],
+    )
+
+    dumped = op.model_dump()
+    assert dumped["occurrence"] == 2
+    assert dumped["following_moves"] == ("c4d5", None)
+    assert Opening(**dumped).model_dump() == dumped
+
+
+def test_colour_partition_view():
+    op = Opening(
+        eco="D70",
+        fen="rnbqkb1r/ppp1pp1p/5np1/3p4/2PP4/6P1/PP2PP1P/RNBQKBNR w KQkq -",
+        name="Neo-Grünfeld Defense",
+        num_moves=6,
+        index=1,
+        colour=[PlayerColour.W, PlayerColour.B, PlayerColour.W],
+        dates=[datetime(2023, 1, 1), datetime(2023, 1, 2), datetime(2023, 1, 3)],
+        results=[0, 0.5, 1],
+        following_moves=["c4d5", None, "f1g2"],
+        following_game_scores=[0.41, 0.21, 0.6],
+        score_in_n_moves=[-0.1, 0.1],
+    )
+
+    white_op = op.partition_by_colour(PlayerColour.W)
+    assert white_op is not None
+    assert white_op.occurrences.rows.tolist() == [0, 2]
+    assert white_op.following_moves == ("c4d5", "f1g2")
+    assert white_op.score_in_n_moves == (-0.1,)
+    assert white_op.partition_by_colour(PlayerColour.B) is None
+
+    op.add_score_in_n_moves(0.3)
+    op.update_opening(PlayerColour.W, datetime(2023, 1, 4), 1, "e2e4", 0.5, "e2e4")
+    assert white_op.occurrence == 3
+    assert white_op.score_in_n_moves == (-0.1, 0.3)
+    assert white_op.results == (0, 1, 1)
+
+    doubled = op + op
+    assert doubled.partition_by_colour(PlayerColour.B).dates == (  # type: ignore
+        datetime(2023, 1, 2),
+        datetime(2023, 1, 2),
+    )
@@ -2,6 +2,11 @@ from chess_opening_analyser.games import PlayerColour
 from chess_opening_analyser.openings.opening import Opening
 from datetime import datetime
 
+import copy
+import json
+import pickle
+import pytest
+
 
 def test_init_opening():
     op = Opening(
@@ -21,10 +26,10 @@ def test_init_opening():
         best_move="c4d5",
     )
 
-    assert isinstance(op.following_moves, list)
-    assert op.following_moves == ["c4d5"]
+    assert isinstance(op.following_moves, tuple)
+    assert op.following_moves == ("c4d5",)
     assert op.occurrence == 1
-    assert op.following_game_scores == [0.21]
+    assert op.following_game_scores == (0.21,)
 
 
 def test_partitioning():
@@ -47,11 +52,11 @@ def test_partitioning():
     black_op = op.partition_by_colour(PlayerColour.B)
 
     assert isinstance(black_op, Opening)
-    assert black_op.colour == [PlayerColour.B]
-    assert black_op.results == [1]
+    assert black_op.colour == (PlayerColour.B,)
+    assert black_op.results == (1,)
     assert black_op.occurrence == 1
-    assert black_op.following_moves == ["c4d5"]
-    assert black_op.following_game_scores == [0.21]
+    assert black_op.following_moves == ("c4d5",)
+    assert black_op.following_game_scores == (0.21,)
 
 
 def test_add():
@@ -77,10 +82,56 @@ def test_add():
 
     op_3 = op + op
 
-    assert op_3.colour == [
+    assert op_3.colour == (
         PlayerColour.W,
         PlayerColour.B,
         PlayerColour.W,
         PlayerColour.B,
-    ]
-    assert op_3.results == [0, 1, 0, 1]
+    )
+    assert op_3.results == (0, 1, 0, 1)
+
+
+def test_unvalidated():
+    fields = {
+        "eco": "D70",
+        "fen": "rnbqkb1r/ppp1pp1p/5np1/3p4/2PP4/6P1/PP2PP1P/RNBQKBNR w KQkq -",
+        "name": "Neo-Grünfeld Defense",
+        "num_moves": 6,
+        "index": 1,
+    }
+    op = Opening.unvalidated(**fields, moves="1. d4 Nf6 2. c4 g6 3. g3 d5")
+    assert op.model_dump() == Opening(**fields).model_dump()
+
+    op.update_opening(PlayerColour.B, datetime(2023, 1, 2), 1, "c4d5", 0.21, "c4d5")
+    op.add_score_in_n_moves(0.1)
+    assert op.best_next_move == "c4d5"
+    assert op.model_copy().results == (1,)
+
+    dumped = json.loads(json.dumps(op.model_dump(), default=str))
+    assert Opening.from_dump(dumped).model_dump() == op.model_dump()
+    assert pickle.loads(pickle.dumps(op)).model_dump() == op.model_dump()
+
+
+def test_copies_dont_alias():
+    op = Opening(
+        eco="D70",
+        fen="rnbqkb1r/ppp1pp1p/5np1/3p4/2PP4/6P1/PP2PP1P/RNBQKBNR w KQkq -",
+        name="Neo-Grünfeld Defense",
+        num_moves=6,
+        index=1,
+        colour=[PlayerColour.W],
+        dates=[datetime(2023, 1, 1)],
+        results=[0],
+        following_moves=["c4d5"],
+        following_game_scores=[0.41],
+        score_in_n_moves=[-0.1],
+    )
+
+    with pytest.raises(AttributeError):
+        op.results.append(1)  # type: ignore
+
+    copies = [op.model_copy(), copy.copy(op), op.copy()]
+    op.update_opening(PlayerColour.B, datetime(2023, 1, 2), 1, "c4d5", 0.21, "c4d5")
+
+    assert op.results == (0, 1)
+    assert all(c.results == (0,) for c in copies)
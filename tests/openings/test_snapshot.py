@@ -0,0 +1,82 @@
+from chess_opening_analyser.games import PlayerColour
+from chess_opening_analyser.openings.snapshot import TreeSnapshot
+from chess_opening_analyser.openings.tree import Tree
+from tests.openings.test_transformers import load_tree
+from tests.openings.test_tree import load_tree_2
+
+import pytest
+
+
+def zobrist_tree(aggregate: bool = False) -> Tree:
+    tree = Tree(position_key="zobrist", aggregate=aggregate)
+    for opening in load_tree().nodes.values():
+        if opening.index != -1:
+            tree.add_opening(opening, head=tree.root, player_colour=PlayerColour.B)
+    return tree
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_snapshot_round_trip(tmp_path, compress):
+    tree_2 = load_tree_2()
+    tree_2.nodes[tree_2.root_key].add_score_in_n_moves(0.5)  # no occurrences
+    for tree in [
+        load_tree(),
+        load_tree(aggregate=True),
+        tree_2,
+        zobrist_tree(),
+        zobrist_tree(aggregate=True),
+        tree_2.partition_by_colour(PlayerColour.W),
+    ]:
+        tree.add_opening(tree.root, head=tree.root, player_colour=PlayerColour.W)
+        tree.to_json(str(tmp_path / "tree.json"))
+        TreeSnapshot.of(tree).save(tmp_path / "tree.snapshot", compress)
+
+        from_json = Tree.from_json(str(tmp_path / "tree.json"))
+        loaded = TreeSnapshot.load(tmp_path / "tree.snapshot").to_tree()
+
+        assert loaded.to_dict() == from_json.to_dict()
+        assert list(loaded.nodes) == list(tree.nodes)
+        assert loaded.parents(tree.root_key) == [loaded.root]
+
+
+def test_snapshot_version(tmp_path):
+    path = tmp_path / "tree.snapshot"
+    TreeSnapshot.of(load_tree()).save(path)
+    with open(path, "r+b") as f:
+        f.write(TreeSnapshot.HEADER.pack(TreeSnapshot.MAGIC, 0, 0))
+
+    with pytest.raises(ValueError):
+        TreeSnapshot.load(path)
+
+
+def test_lazy_tree(tmp_path):
+    tree = load_tree_2()
+    TreeSnapshot.of(tree).save(tmp_path / "tree.snapshot")
+
+    lazy = TreeSnapshot.load(tmp_path / "tree.snapshot").to_lazy_tree()
+    assert lazy.nodes.materialised == 0  # type: ignore
+    sicilian = "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2"
+    assert lazy.nodes[sicilian].occurrence == 3
+    assert lazy.nodes[sicilian] is lazy.nodes[sicilian]
+    assert lazy.nodes.materialised == 1  # type: ignore
+
+    assert (
+        lazy.filter_by_opening(sicilian).to_dict()
+        == tree.filter_by_opening(sicilian).to_dict()
+    )
+    assert lazy.to_dict() == tree.to_dict()
+
+
+def test_lazy_tree_lookup_by_name(tmp_path):
+    tree = load_tree_2()
+    TreeSnapshot.of(tree).save(tmp_path / "tree.snapshot")
+    lazy = TreeSnapshot.load(tmp_path / "tree.snapshot").to_lazy_tree()
+
+    opening = lazy.get_opening_by_name_and_move("Sicilian Defense [2]", 2)
+    assert opening is not None
+    assert opening.model_dump() == tree.nodes[tree.key(opening)].model_dump()
+    assert lazy.nodes.materialised == 1  # type: ignore
+
+    assert lazy.get_opening_by_name_and_move("Sicilian Defense", 3) is None
+    assert lazy.get_opening_by_name_and_move("Unknown Defense", 2) is None
+    assert lazy.nodes.materialised == 1  # type: ignore
@@ -7,8 +7,8 @@ from chess_opening_analyser.openings.tree import Tree
 import pandas as pd
 
 
-def load_tree():
-    tree = Tree()
+def load_tree(aggregate: bool = False):
+    tree = Tree(aggregate=aggregate)
     first_opening = Opening(
         fen="rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1",
         eco="C20",
@@ -125,3 +125,16 @@ def test_tree_to_opening_strength_2():
         opening_strength.loc[(("Neo-Grünfeld Defense", 6, "Black"))]["mean_results"]
         == 0.50
     )
+
+
+def test_tree_to_opening_strength_aggregated(tmp_path):
+    tree = load_tree(aggregate=True)
+    tree.to_json(str(tmp_path / "tree.json"))
+    loaded = Tree.from_json(str(tmp_path / "tree.json"))
+
+    assert loaded.aggregate
+    assert loaded.nodes[loaded.root_key].occurrence == 0
+    pd.testing.assert_frame_equal(
+        Transformer.tree_to_opening_strength(loaded, unique_names=True),
+        Transformer.tree_to_opening_strength(load_tree(), unique_names=True),
+    )
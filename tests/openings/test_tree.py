@@ -3,6 +3,9 @@ from datetime import datetime
 from chess_opening_analyser.games import PlayerColour
 from chess_opening_analyser.openings.tree import Tree
 from chess_opening_analyser.openings.opening import Opening
+from tests.openings import test_transformers
+
+import pytest
 
 
 def load_tree():
@@ -90,25 +93,18 @@ def load_tree_2():
         score_in_n_moves=[0.04, 0.14, 0.43],
         best_next_move="d2d4",
     )
+    king_pawn, sicilian, scandinavian = (
+        tree.key(o) for o in [first_opening, second_opening, third_opening]
+    )
+
+    # the openings above only hold a sample of the games of their edges
     tree.add_opening(first_opening, head=tree.root, player_colour=PlayerColour.W)
+    tree.add_edge(king_pawn, PlayerColour.W, sicilian)
+    tree.add_edge(king_pawn, PlayerColour.W, scandinavian)
     tree.add_opening(second_opening, head=first_opening, player_colour=PlayerColour.B)
     tree.add_opening(third_opening, head=first_opening, player_colour=PlayerColour.W)
-
-    # need to overwrite because of how the tree is created here
-    tree.edges["rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"] = {
-        PlayerColour.W: Counter(
-            {
-                "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2": 1,
-                "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2": 2,
-            }
-        ),
-        PlayerColour.B: Counter(
-            {
-                "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2": 2,
-                "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2": 1,
-            }
-        ),
-    }
+    tree.add_edge(king_pawn, PlayerColour.B, sicilian)
+    tree.add_edge(king_pawn, PlayerColour.B, scandinavian)
 
     return tree
 
@@ -124,7 +120,7 @@ def test_tree_add():
     assert tree.nodes[fen_1].occurrence == 2
     assert tree.edges[fen_1][PlayerColour.W][fen_2] == 4
     assert (
-        tree.nodes[fen_2].colour == [PlayerColour.B, PlayerColour.W, PlayerColour.W] * 2
+        tree.nodes[fen_2].colour == (PlayerColour.B, PlayerColour.W, PlayerColour.W) * 2
     )
 
 
@@ -191,6 +187,54 @@ def test_partition_by_colour():
     assert PlayerColour.B not in white_tree.edges[tree.root.fen].keys()
 
 
+def test_update_partitioned_tree():
+    tree = load_tree_2()
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    white_tree = tree.partition_by_colour(PlayerColour.W)
+
+    white_tree.update(load_tree_2())
+    white_tree.nodes[fen].add_score_in_n_moves(0.2)
+
+    assert white_tree.nodes[fen].occurrence == 2
+    assert tree.edges[fen][PlayerColour.W] == load_tree_2().edges[fen][PlayerColour.W]
+    assert white_tree.nodes[fen].score_in_n_moves == (-0.1, -0.1, 0.2)
+    assert tree.nodes[fen].occurrence == 1
+    assert tree.nodes[fen].score_in_n_moves == (-0.1,)
+    assert (white_tree + load_tree_2()).nodes[fen].occurrence == 3
+
+
+def test_update_aggregated_partitions():
+    opening = (
+        load_tree_2()
+        .nodes["rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2"]
+        .aggregated()
+    )
+    white = opening.partition_by_colour(PlayerColour.W)
+    assert white is not None
+
+    white += opening.partition_by_colour(PlayerColour.W)
+    white.update_opening(PlayerColour.W, datetime(2023, 1, 2), 1, "d2d4", 0.5, "d2d4")
+
+    assert white.occurrence == 5
+    assert white.colour == (PlayerColour.W,) * 5
+    assert opening.occurrence == 3
+
+
+def test_add_aggregated_partitions():
+    tree = test_transformers.load_tree(aggregate=True)
+
+    merged = tree.partition_by_colour(PlayerColour.W) + tree.partition_by_colour(
+        PlayerColour.B
+    )
+
+    assert {k: o.occurrence for k, o in merged.nodes.items()} == {
+        k: o.occurrence for k, o in tree.nodes.items()
+    }
+    assert {k: sorted(o.dates) for k, o in merged.nodes.items()} == {
+        k: sorted(o.dates) for k, o in tree.nodes.items()
+    }
+
+
 def test_children():
     tree = load_tree_2()
 
@@ -240,3 +284,95 @@ def test_parents():
         ].fen
         == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
     )
+
+
+def test_zobrist_tree_json(tmp_path):
+    tree = Tree(position_key="zobrist")
+    for opening in load_tree().nodes.values():
+        if opening.index != -1:
+            tree.add_opening(opening, head=tree.root, player_colour=PlayerColour.W)
+    tree.to_json(str(tmp_path / "tree.json"))
+
+    loaded = Tree.from_json(str(tmp_path / "tree.json"))
+
+    assert loaded.position_key == "zobrist"
+    assert loaded.nodes.keys() == tree.nodes.keys()
+    assert all(isinstance(key, int) for key in loaded.nodes)
+    assert loaded.edges[loaded.root_key][PlayerColour.W] == Counter(
+        {key: 1 for key in tree.nodes if key != tree.root_key}
+    )
+
+
+def test_parents_index(tmp_path):
+    tree = load_tree_2()
+    tree.to_json(str(tmp_path / "tree.json"))
+
+    for loaded in [
+        tree,
+        tree + load_tree_2(),
+        Tree.from_json(str(tmp_path / "tree.json")),
+    ]:
+        for key in loaded.nodes:
+            for colour in [None, PlayerColour.W, PlayerColour.B]:
+                expected = {
+                    parent
+                    for parent, targets in loaded.edges.items()
+                    for c, children in targets.items()
+                    if key in children and colour in (None, c)
+                }
+                assert {loaded.key(o) for o in loaded.parents(key, colour)} == expected
+
+
+def test_filter_by_opening_with_cycles():
+    tree = load_tree_2()
+    fens = list(tree.nodes)
+    root, king_pawn, sicilian, scandinavian = fens
+    tree.add_opening(
+        tree.nodes[king_pawn], head=tree.nodes[sicilian], player_colour=PlayerColour.W
+    )  # a cycle, through a transposition
+
+    filtered = tree.filter_by_opening(sicilian)
+    assert set(filtered.nodes) == {root, king_pawn, sicilian, scandinavian}
+    assert filtered.edges[king_pawn][PlayerColour.W][sicilian] == 1
+    assert [o.fen for o in tree._get_parents_recursively(sicilian)] == [
+        king_pawn,
+        root,
+        sicilian,
+    ]
+
+    assert set(tree.filter_by_opening(scandinavian, depth=1).nodes) == {
+        king_pawn,
+        scandinavian,
+    }
+
+
+def test_tree_merge_doesnt_alias():
+    fen_1 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    fen_2 = "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2"
+    trees = [load_tree_2() for _ in range(3)]
+
+    merged = Tree.merge_many(trees)
+    assert merged.nodes[fen_2].occurrence == 9
+    assert merged.edges[fen_1][PlayerColour.W][fen_2] == 6
+    assert merged.parents(fen_2, PlayerColour.B) == [merged.nodes[fen_1]]
+    assert all(tree.nodes[fen_2].occurrence == 3 for tree in trees)
+    assert all(tree.edges[fen_1][PlayerColour.W][fen_2] == 2 for tree in trees)
+
+    # merging is associative, so it can be done in parallel groups
+    grouped = Tree.merge_many([trees[0] + trees[1], Tree.merge_many(trees[2:])])
+    assert grouped.to_dict() == merged.to_dict()
+
+    merged.update(trees[0])
+    assert merged.nodes[fen_2].occurrence == 12
+    assert trees[0].nodes[fen_2].occurrence == 3
+
+
+def test_edges_are_read_only():
+    tree = load_tree_2()
+
+    with pytest.raises(TypeError):
+        tree.edges[tree.root_key] = {}  # type: ignore
+
+    tree.add_edge(tree.root_key, PlayerColour.B, "child", 2)
+    assert tree.edges[tree.root_key][PlayerColour.B]["child"] == 2
+    assert tree.parents("child", PlayerColour.B) == [tree.root]